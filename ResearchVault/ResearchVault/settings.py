@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its timings cover the rest of the stack (see core/middleware.py)
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,13 +76,59 @@ WSGI_APPLICATION = 'ResearchVault.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# DATABASE_ENGINE selects the profile: 'sqlite' (default) or 'postgresql'.
+# Compare them under a concurrent import with the load_test_database command.
+
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'researchvault'),
+            'USER': os.environ.get('DATABASE_USER', ''),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', ''),
+            'PORT': os.environ.get('DATABASE_PORT', ''),
+            # Keep connections open across requests rather than connecting for
+            # each one, and check them before reuse after a database restart
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            # Set DATABASE_POOLER=pgbouncer behind PgBouncer in transaction
+            # pooling mode, which cannot keep the server-side cursors that
+            # QuerySet.iterator() (e.g. the exports) would otherwise use
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DATABASE_POOLER') == 'pgbouncer',
+        }
     }
-}
+elif DATABASE_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                # Seconds to wait for a lock before "database is locked"
+                'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20)),
+            },
+        }
+    }
+else:
+    raise ValueError(f"Unknown DATABASE_ENGINE {DATABASE_ENGINE!r}: use 'sqlite' or 'postgresql'")
+
+# Applied to every SQLite connection (see core/db.py). SQLITE_TUNING=0 goes
+# back to SQLite's defaults, e.g. to compare with them; the journal mode is
+# stored in the database file, so it is switched back explicitly.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power loss may lose the last commits, but not corrupt the database
+    'synchronous': 'NORMAL',
+    # Negative sizes are in KiB: 64 MiB per connection
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+} if os.environ.get('SQLITE_TUNING', '1') != '0' else {'journal_mode': 'DELETE'}
 
 
 # Password validation
@@ -127,3 +176,80 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Cache for rendered pages, fragments and counters (see core/caching.py).
+# Entries are invalidated through a version key, so the cache must be shared
+# by all worker processes: Redis when REDIS_URL is set, files otherwise.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache',
+        }
+    }
+
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Seconds browsers, proxies and CDNs may reuse a public page before they
+# revalidate it with a conditional GET (see core/caching.py)
+
+PAGE_MAX_AGE = int(os.environ.get('PAGE_MAX_AGE', 5 * 60))
+
+# Page the publication and dissertation lists by cursor instead of page number,
+# with an estimated result count (see core/pagination.py)
+
+KEYSET_PAGINATION = os.environ.get('KEYSET_PAGINATION', '') == '1'
+KEYSET_PAGINATION_COUNT = True
+
+# HTTP response cache used by the import commands (see core/http_client.py)
+
+HTTP_CACHE_PATH = BASE_DIR / 'http_cache.sqlite3'
+HTTP_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Outgoing API requests made by the import commands
+
+HTTP_TIMEOUT = (5, 30)
+HTTP_MAX_RETRIES = 5
+CROSSREF_MAILTO = os.environ.get('CROSSREF_MAILTO', '')
+NCBI_API_KEY = os.environ.get('NCBI_API_KEY', '')
+
+# Record API responses to, or replay them from, fixture files instead of the
+# network: '', 'record' or 'replay' (see core/http_fixtures.py)
+
+HTTP_FIXTURES_MODE = os.environ.get('HTTP_FIXTURES_MODE', '')
+HTTP_FIXTURES_PATH = BASE_DIR / 'http_fixtures'
+
+# Per-request query count and timing (see core/middleware.py). Requests over
+# one of the thresholds are logged at WARNING level. The Server-Timing header
+# shows the figures to anyone, so it is only sent in development by default.
+
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_SERVER_TIMING = os.environ.get('REQUEST_METRICS_SERVER_TIMING', '1' if DEBUG else '0') == '1'
+REQUEST_METRICS_SLOW_REQUEST_MS = int(os.environ.get('REQUEST_METRICS_SLOW_REQUEST_MS', 500))
+REQUEST_METRICS_MAX_QUERIES = int(os.environ.get('REQUEST_METRICS_MAX_QUERIES', 50))
+REQUEST_METRICS_MAX_REPEATED_QUERIES = int(os.environ.get('REQUEST_METRICS_MAX_REPEATED_QUERIES', 10))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
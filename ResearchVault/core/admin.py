@@ -1,11 +1,12 @@
 from django.contrib import admin
-from django.db import models, transaction
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.urls import path
 from django.http import HttpResponseRedirect
 
+from . import merge
 from .models import Publication, Person, AuthorOrder, Dissertation
+from .templatetags.publication_tags import strip_author_markers
 
 # Inline for AuthorOrder to manage in the Publication admin
 class AuthorOrderInline(admin.TabularInline):
@@ -19,64 +20,21 @@ class AuthorOrderInline(admin.TabularInline):
 def merge_people(modeladmin, request, queryset):
     """
     Admin action to merge multiple Person objects into one.
-    Handles:
-    - AuthorOrder relationships
-    - corresponding_author relationships in Publication
+    See core.merge.merge_people for what is moved to the primary record.
     """
     if 'apply' in request.POST:
         try:
-            with transaction.atomic():
-                primary_id = int(request.POST.get('primary_record'))
-                primary_person = Person.objects.get(id=primary_id)
-                persons_to_merge = queryset.exclude(id=primary_id)
-                
-                # Update corresponding_author relationships
-                for person in persons_to_merge:
-                    Publication.objects.filter(corresponding_author=person).update(
-                        corresponding_author=primary_person
-                    )
-                
-                # Handle AuthorOrder relationships
-                for person in persons_to_merge:
-                    # For each publication where the person is an author
-                    for author_order in AuthorOrder.objects.filter(person=person):
-                        # Check if primary person already has an entry for this publication
-                        existing_order = AuthorOrder.objects.filter(
-                            person=primary_person,
-                            publication=author_order.publication
-                        ).first()
-                        
-                        if existing_order:
-                            # Primary person is already an author, keep the earlier order position
-                            if existing_order.order > author_order.order:
-                                # Shift other authors down
-                                AuthorOrder.objects.filter(
-                                    publication=author_order.publication,
-                                    order__gte=author_order.order,
-                                    order__lt=existing_order.order
-                                ).update(order=models.F('order') + 1)
-                                
-                                # Update primary person's order
-                                existing_order.order = author_order.order
-                                existing_order.save()
-                            
-                            # Delete the duplicate author entry
-                            author_order.delete()
-                        else:
-                            # Primary person isn't an author, reassign the entry
-                            author_order.person = primary_person
-                            author_order.save()
-                
-                # Delete the merged persons
-                persons_to_merge.delete()
-                
-                modeladmin.message_user(
-                    request,
-                    f"Successfully merged {persons_to_merge.count()} records into {primary_person}",
-                    messages.SUCCESS
-                )
-                
-                return HttpResponseRedirect(request.get_full_path())
+            primary_id = int(request.POST.get('primary_record'))
+            primary_person = Person.objects.get(id=primary_id)
+            merged = merge.merge_people(primary_person, queryset.exclude(id=primary_id).values_list('pk', flat=True))
+            
+            modeladmin.message_user(
+                request,
+                f"Successfully merged {merged} records into {primary_person}",
+                messages.SUCCESS
+            )
+            
+            return HttpResponseRedirect(request.get_full_path())
         except Exception as e:
             modeladmin.message_user(
                 request,
@@ -97,6 +55,30 @@ def merge_people(modeladmin, request, queryset):
 
 merge_people.short_description = "Merge selected people records"
 
+class PublicationYearListFilter(admin.SimpleListFilter):
+    """
+    Filter author orders by the year of their publication.
+    
+    Replaces a filter on the publication itself, which listed every
+    publication title in the sidebar.
+    """
+    title = 'publication year'
+    parameter_name = 'publication_year'
+    
+    def lookups(self, request, model_admin):
+        years = (
+            Publication.objects.exclude(publication_year=None)
+            .order_by('-publication_year')
+            .values_list('publication_year', flat=True)
+            .distinct()
+        )
+        return [(year, year) for year in years]
+    
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(publication__publication_year=int(self.value()))
+        return queryset
+
 # Register your models here.
 @admin.register(Person)
 class PersonAdmin(admin.ModelAdmin):
@@ -105,6 +87,7 @@ class PersonAdmin(admin.ModelAdmin):
     list_filter = ('affiliation',)
     actions = [merge_people]
     ordering = ['last_name', 'first_name']
+    show_full_result_count = False
 
 @admin.register(Publication)
 class PublicationAdmin(admin.ModelAdmin):
@@ -114,9 +97,11 @@ class PublicationAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     inlines = [AuthorOrderInline]
     autocomplete_fields = ['corresponding_author']
+    # Skip the unfiltered COUNT(*) on every filtered or searched changelist
+    show_full_result_count = False
     
     def get_authors(self, obj):
-        return ", ".join([str(author) for author in obj.get_ordered_authors()])
+        return strip_author_markers(obj.authors_display)
     get_authors.short_description = 'Authors'
     
     fieldsets = (
@@ -151,10 +136,12 @@ class PublicationAdmin(admin.ModelAdmin):
 @admin.register(AuthorOrder)
 class AuthorOrderAdmin(admin.ModelAdmin):
     list_display = ('publication', 'person', 'order', 'contribution_type')
-    list_filter = ('publication', 'contribution_type')
+    list_select_related = ('publication', 'person')
+    list_filter = (PublicationYearListFilter, 'contribution_type')
     search_fields = ('publication__title', 'person__first_name', 'person__last_name')
     ordering = ('publication', 'order')
     autocomplete_fields = ['person', 'publication']
+    show_full_result_count = False
 
 # Register the Dissertation model
 class CoPromoterInline(admin.TabularInline):
@@ -167,6 +154,7 @@ class CoPromoterInline(admin.TabularInline):
 @admin.register(Dissertation)
 class DissertationAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'promoter', 'degree', 'defense_date', 'institution')
+    list_select_related = ('author', 'promoter')
     list_filter = ('degree', 'defense_date', 'institution', 'department')
     search_fields = ('title', 'abstract', 'keywords', 'author__first_name', 'author__last_name', 
                     'promoter__first_name', 'promoter__last_name')
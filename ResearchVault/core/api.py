@@ -0,0 +1,340 @@
+"""
+Read-only JSON API for publications, people and dissertations (version 1).
+
+Every list endpoint accepts:
+    fields: comma-separated fields to return (default: all); id is always returned
+    include: comma-separated relations whose people are added under "included"
+    ids: comma-separated primary keys to fetch in one request instead of a page
+    cursor: the cursor of the page to return, from links.next or links.previous
+    page_size: objects per page (default: API_DEFAULT_PAGE_SIZE, at most API_MAX_PAGE_SIZE)
+
+Pages are cursor-paginated on the same keys as the HTML lists (see
+core/pagination.py). A response takes a fixed number of queries whatever its
+size: one for the objects, one per many-valued relation (publication authors,
+dissertation copromoters) and one for all included people.
+"""
+from django.http import Http404, JsonResponse
+from django.db.models import FileField, ForeignKey
+
+from . import caching
+from .models import AuthorOrder, Dissertation, Person, Publication, normalize_doi
+from .pagination import InvalidCursor, KeysetPaginator
+
+API_DEFAULT_PAGE_SIZE = 25
+API_MAX_PAGE_SIZE = 100
+API_MAX_BATCH = 100
+
+
+class BadRequest(Exception):
+    """An invalid query parameter, answered with HTTP 400."""
+
+
+def _csv(request, name):
+    """Return the comma-separated values of a (possibly repeated) query parameter."""
+    return [
+        value.strip()
+        for param in request.GET.getlist(name)
+        for value in param.split(',')
+        if value.strip()
+    ]
+
+
+def _int(value, name):
+    if not value.isdigit():
+        raise BadRequest(f"{name} must be a positive integer, not {value!r}")
+    return int(value)
+
+
+class Resource:
+    """
+    How a model is exposed through the API.
+
+    Attributes:
+        model: The model
+        ordering: The keyset the lists are paginated on
+        columns: API field names of model fields, read from the object itself
+        relations: API field names computed for a whole page with one query (see load_relations)
+        includes: {include name: API field holding the person id(s) to include}
+        filters: {query parameter: lookup}, for person ids or integers
+    """
+    model = None
+    ordering = []
+    columns = []
+    relations = []
+    includes = {}
+    filters = {}
+
+    @property
+    def fields(self):
+        return [*self.columns, *self.relations]
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def filter(self, queryset, request):
+        for param, lookup in self.filters.items():
+            value = request.GET.get(param)
+            if value:
+                queryset = queryset.filter(**{lookup: _int(value, param)})
+        return queryset
+
+    def selected_fields(self, request):
+        """Return the fields asked for with ?fields=, or all of them."""
+        fields = _csv(request, 'fields')
+        if not fields:
+            return self.fields
+        unknown = [name for name in fields if name not in self.fields and name != 'id']
+        if unknown:
+            raise BadRequest(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(self.fields)})")
+        return [name for name in self.fields if name in fields]
+
+    def selected_includes(self, request):
+        includes = _csv(request, 'include')
+        unknown = [name for name in includes if name not in self.includes]
+        if unknown:
+            choices = ', '.join(self.includes) or 'none'
+            raise BadRequest(f"Unknown includes: {', '.join(unknown)} (choose from {choices})")
+        return includes
+
+    def only(self, queryset, fields, *extra):
+        """Load just the columns that are serialized or paginated on, and extra."""
+        names = {name for name in fields if name in self.columns} | set(extra)
+        names.update(name.lstrip('-') for name in self.ordering)
+        return queryset.only(*names)
+
+    def load_relations(self, objects, names):
+        """Return {relation: {pk: value}} for the relations in names."""
+        return {}
+
+    def value(self, obj, name):
+        if name == 'keywords':
+            return obj.get_keywords_list()
+        field = self.model._meta.get_field(name)
+        if isinstance(field, ForeignKey):
+            return getattr(obj, field.attname)
+        value = getattr(obj, name)
+        if isinstance(field, FileField):
+            return value.url if value else None
+        return value
+
+    def serialize(self, objects, fields, includes=()):
+        """Return the objects as dicts with the given fields, and the ids of the people to include."""
+        # Included people are found through their relation, even when it is not returned
+        names = [name for name in self.relations if name in fields or name in {self.includes[i] for i in includes}]
+        relations = self.load_relations(objects, names)
+        data = []
+        people = set()
+        for obj in objects:
+            item = {'id': obj.pk}
+            for name in fields:
+                item[name] = relations[name][obj.pk] if name in relations else self.value(obj, name)
+            for include in includes:
+                name = self.includes[include]
+                value = relations[name][obj.pk] if name in relations else self.value(obj, name)
+                people.update(self.person_ids(name, value))
+            data.append(item)
+        return data, people
+
+    def person_ids(self, name, value):
+        """Return the person ids in the value of a field named in includes."""
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+
+class PublicationResource(Resource):
+    model = Publication
+    ordering = Publication._meta.ordering
+    columns = [
+        'title', 'abstract', 'journal', 'conference', 'volume', 'issue', 'pages',
+        'publication_date', 'publication_year', 'doi', 'pmid', 'arxiv_id', 'isbn', 'url',
+        'pdf_file', 'supplementary_materials', 'keywords', 'research_field',
+        'citation_count', 'impact_factor', 'notes', 'authors_display',
+        'corresponding_author', 'created_at', 'updated_at',
+    ]
+    relations = ['authors']
+    includes = {'authors': 'authors', 'corresponding_author': 'corresponding_author'}
+    filters = {'year': 'publication_year', 'author': 'authors__id'}
+
+    def load_relations(self, objects, names):
+        if 'authors' not in names:
+            return {}
+        authors = {obj.pk: [] for obj in objects}
+        rows = (
+            AuthorOrder.objects.filter(publication_id__in=authors)
+            .order_by('publication_id', 'order')
+            .values_list('publication_id', 'person_id', 'order', 'contribution_type')
+        )
+        for publication_id, person_id, order, contribution_type in rows:
+            authors[publication_id].append(
+                {'person': person_id, 'order': order, 'contribution_type': contribution_type}
+            )
+        return {'authors': authors}
+
+    def person_ids(self, name, value):
+        if name == 'authors':
+            return [author['person'] for author in value]
+        return super().person_ids(name, value)
+
+
+class PersonResource(Resource):
+    model = Person
+    ordering = Person._meta.ordering
+    # Email addresses are not shown on the public pages either
+    columns = ['first_name', 'last_name', 'orcid', 'affiliation']
+
+
+class DissertationResource(Resource):
+    model = Dissertation
+    ordering = Dissertation._meta.ordering
+    columns = [
+        'title', 'author', 'promoter', 'supervisor', 'degree', 'start_date', 'defense_date',
+        'abstract', 'institution', 'department', 'url', 'pdf_file', 'keywords', 'notes',
+        'created_at', 'updated_at',
+    ]
+    relations = ['copromoters']
+    includes = {
+        'author': 'author', 'promoter': 'promoter',
+        'copromoters': 'copromoters', 'supervisor': 'supervisor',
+    }
+    filters = {'author': 'author_id', 'promoter': 'promoter_id'}
+
+    def filter(self, queryset, request):
+        degree = request.GET.get('degree')
+        if degree:
+            queryset = queryset.filter(degree=degree)
+        return super().filter(queryset, request)
+
+    def load_relations(self, objects, names):
+        if 'copromoters' not in names:
+            return {}
+        copromoters = {obj.pk: [] for obj in objects}
+        through = Dissertation.copromoters.through
+        rows = (
+            through.objects.filter(dissertation_id__in=copromoters)
+            .order_by('pk')
+            .values_list('dissertation_id', 'person_id')
+        )
+        for dissertation_id, person_id in rows:
+            copromoters[dissertation_id].append(person_id)
+        return {'copromoters': copromoters}
+
+
+def _included(people_ids):
+    """Return the included people, fetched with one query."""
+    if not people_ids:
+        return []
+    resource = PersonResource()
+    people = resource.only(Person.objects.filter(pk__in=people_ids), resource.fields)
+    return resource.serialize(list(people), resource.fields)[0]
+
+
+def _page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def _batch(resource, queryset, request, fields, includes):
+    """Return the response for ?ids= (and for publications ?doi=), in the order asked for."""
+    ids = [_int(value, 'ids') for value in _csv(request, 'ids')]
+    # DOIs may contain commas, so they are only separated by repeating ?doi=
+    dois = [doi for doi in request.GET.getlist('doi') if doi.strip()] if resource.model is Publication else []
+    if len(ids) + len(dois) > API_MAX_BATCH:
+        raise BadRequest(f"At most {API_MAX_BATCH} ids and DOIs can be fetched at once")
+
+    objects = {}
+    if ids:
+        objects.update((obj.pk, obj) for obj in resource.only(queryset, fields).filter(pk__in=ids))
+    keys = [(normalize_doi(doi), doi) for doi in dois]
+    by_doi = {}
+    if keys:
+        narrowed = resource.only(queryset, fields, 'doi_normalized')
+        for obj in narrowed.filter(doi_normalized__in=[key for key, _ in keys if key]):
+            by_doi[obj.doi_normalized] = obj.pk
+            objects[obj.pk] = obj
+
+    found = []
+    missing = []
+    for pk in ids:
+        (found if pk in objects else missing).append(pk)
+    for key, doi in keys:
+        if key in by_doi:
+            found.append(by_doi[key])
+        else:
+            missing.append(doi)
+    found = list(dict.fromkeys(found))
+
+    data, people = resource.serialize([objects[pk] for pk in found], fields, includes)
+    response = {'data': data, 'meta': {'missing': missing}}
+    if includes:
+        response['included'] = {'people': _included(people)}
+    return response
+
+
+def _list(resource, request):
+    fields = resource.selected_fields(request)
+    includes = resource.selected_includes(request)
+    queryset = resource.filter(resource.get_queryset(), request)
+
+    if 'ids' in request.GET or 'doi' in request.GET:
+        return _batch(resource, queryset, request, fields, includes)
+
+    page_size = request.GET.get('page_size', '')
+    page_size = min(_int(page_size, 'page_size'), API_MAX_PAGE_SIZE) if page_size else API_DEFAULT_PAGE_SIZE
+    paginator = KeysetPaginator(resource.only(queryset, fields), max(1, page_size), resource.ordering)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise BadRequest("Invalid cursor")
+
+    data, people = resource.serialize(page.object_list, fields, includes)
+    response = {
+        'data': data,
+        'links': {
+            'next': _page_link(request, page.next_cursor),
+            'previous': _page_link(request, page.previous_cursor),
+        },
+        'meta': {'count': paginator.count},
+    }
+    if includes:
+        response['included'] = {'people': _included(people)}
+    return response
+
+
+def _detail(resource, request, pk):
+    fields = resource.selected_fields(request)
+    includes = resource.selected_includes(request)
+    obj = resource.only(resource.get_queryset(), fields).filter(pk=pk).first()
+    if obj is None:
+        raise Http404
+    data, people = resource.serialize([obj], fields, includes)
+    response = {'data': data[0]}
+    if includes:
+        response['included'] = {'people': _included(people)}
+    return response
+
+
+def _endpoint(resource, handler):
+    """Return a view answering GET requests with handler's JSON, and errors as JSON."""
+    @caching.cache_public_page
+    def view(request, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'error': 'Method not allowed'}, status=405, headers={'Allow': 'GET, HEAD'})
+        try:
+            return JsonResponse(handler(resource, request, **kwargs))
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Not found'}, status=404)
+    return view
+
+
+publication_list = _endpoint(PublicationResource(), _list)
+publication_detail = _endpoint(PublicationResource(), _detail)
+person_list = _endpoint(PersonResource(), _list)
+person_detail = _endpoint(PersonResource(), _detail)
+dissertation_list = _endpoint(DissertationResource(), _list)
+dissertation_detail = _endpoint(DissertationResource(), _detail)
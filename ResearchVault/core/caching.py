@@ -0,0 +1,168 @@
+"""
+Caching of the public pages and of the data they are built from.
+
+Cached pages and values are keyed on a content version, which is bumped
+whenever publications, people or dissertations change (by the signal
+handlers once the transaction commits, see ``signals._flush``, and by
+commands that write in bulk). Nothing has to be deleted one entry at a
+time: after a bump the old entries are simply never read again and expire.
+
+Publication cards are cached as template fragments keyed on the
+publication's pk and ``updated_at`` instead, so that after an import only
+the cards of changed publications are rendered again.
+
+Pages also answer conditional GETs: ``conditional_page`` sets ETag and
+Last-Modified from validators that are cheap to compute (and cached in turn),
+answers a matching If-None-Match or If-Modified-Since with 304 Not Modified
+without running the view, and sets Cache-Control so that browsers, proxies
+and CDNs can keep the pages too.
+
+Settings:
+    PAGE_CACHE_TIMEOUT: seconds a rendered page is kept, 0 to disable page caching (default: 1 day)
+    PAGE_MAX_AGE: seconds browsers and shared caches may reuse a page without asking (default: 5 minutes)
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+CONTENT_VERSION_KEY = 'core:content-version'
+CONTENT_CHANGED_KEY = 'core:content-changed'
+
+DEFAULT_PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+DEFAULT_PAGE_MAX_AGE = 5 * 60
+
+# Fragments are keyed on updated_at, so they only expire to free space
+FRAGMENT_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def content_version():
+    """Return the current content version."""
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        # Start from the clock rather than 1, so that entries of an earlier
+        # version that outlived an evicted version key are not read again
+        cache.add(CONTENT_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def bump_content_version():
+    """Make every versioned cache entry stale."""
+    try:
+        cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        # The key was evicted; a new clock-based version is newer than any before
+        cache.set(CONTENT_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+    cache.set(CONTENT_CHANGED_KEY, timezone.now(), timeout=None)
+
+
+def content_changed_at():
+    """Return when the content version was last bumped, or None if that is not known."""
+    return cache.get(CONTENT_CHANGED_KEY)
+
+
+def cached(name, compute, timeout=None):
+    """Return the value cached under name for the current content version, computing it if needed."""
+    key = f"core:{name}:{content_version()}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout if timeout is not None else _page_cache_timeout())
+    return value
+
+
+def _page_cache_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', DEFAULT_PAGE_CACHE_TIMEOUT)
+
+
+def _anonymous_request(request):
+    # Visitors with a session may see per-user content, e.g. messages
+    return request.method in ('GET', 'HEAD') and settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def _cacheable_request(request):
+    return _anonymous_request(request) and _page_cache_timeout() > 0
+
+
+def cache_public_page(view):
+    """
+    Serve a view's rendered page from the cache for visitors without a session.
+
+    Pages are keyed on the content version and the full URL, so they are
+    invalidated by ``bump_content_version``. A hit does no database queries.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        url = request.build_absolute_uri()
+        key = f"core:page:{content_version()}:{hashlib.md5(url.encode()).hexdigest()}"
+        entry = cache.get(key)
+        if entry is not None:
+            content, content_type = entry
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, (response.content, response['Content-Type']), _page_cache_timeout())
+
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+    return wrapper
+
+
+def conditional_page(validators):
+    """
+    Answer conditional GETs of a view for visitors without a session, and set Cache-Control.
+
+    Args:
+        validators: function of the view's arguments returning (etag, last_modified),
+            either of which may be None; it should be cheaper than the view
+
+    A request whose If-None-Match or If-Modified-Since matches gets 304 Not
+    Modified without the view being run. Requests with a session are always
+    answered in full and marked private.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _anonymous_request(request):
+                response = view(request, *args, **kwargs)
+                if request.method in ('GET', 'HEAD'):
+                    patch_cache_control(response, private=True)
+                return response
+
+            etag, last_modified = validators(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag else None
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                # A 304 repeats the validators, so caches can refresh their stored copy
+                if etag and not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                if timestamp and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(timestamp)
+                patch_cache_control(response, public=True, max_age=getattr(settings, 'PAGE_MAX_AGE', DEFAULT_PAGE_MAX_AGE))
+            # Visitors who log in must not be served the anonymous page from a shared cache
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        return wrapper
+
+    return decorator
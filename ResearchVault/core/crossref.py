@@ -0,0 +1,123 @@
+"""
+Conversion of Crossref work records into publications.
+
+Used by ``add_doi`` (single works from /works/{doi}) and by the Crossref
+harvester in ``fetch_publications`` (pages of /works search results).
+"""
+from django.utils import timezone
+
+from .models import Publication
+
+
+def publication_from_crossref(item):
+    """
+    Build an unsaved Publication and its author list from a Crossref work.
+    
+    Authors are returned as dicts for ``core.importing.save_publication_batch``,
+    with first/last/corresponding contribution types derived from their
+    position and Crossref's ``sequence`` and ``corresponding-author-id``.
+    Values are truncated to the model's max_length, as a single overlong
+    value would otherwise fail the whole batch insert.
+    
+    Returns:
+        tuple: (Publication, list of author dicts), or None if the work has no title
+    """
+    # Extract basic info
+    title = (item.get('title') or [''])[0]
+    if not title:
+        return None
+    
+    pub = Publication()
+    pub.title = title[:500]
+    pub.doi = item.get('DOI', '')[:100]
+    
+    # Get publication date
+    published_date = item.get('published-print', item.get('published-online'))
+    if published_date:
+        date_parts = published_date.get('date-parts', [[]])[0]
+        if len(date_parts) >= 1:
+            pub.publication_year = date_parts[0]
+            
+            # Create full date if we have all parts
+            if len(date_parts) >= 3:
+                try:
+                    pub.publication_date = timezone.datetime(
+                        date_parts[0], date_parts[1], date_parts[2]
+                    ).date()
+                except (ValueError, TypeError):
+                    pub.publication_date = None
+    
+    # Set journal info
+    container = (item.get('container-title') or [''])[0]
+    if container:
+        pub.journal = container[:255]
+        
+    # Set page info
+    if 'page' in item:
+        pub.pages = item['page'][:50]
+        
+    # Set volume/issue
+    if 'volume' in item:
+        pub.volume = item['volume'][:50]
+    if 'issue' in item:
+        pub.issue = item['issue'][:50]
+        
+    # Set abstract if available
+    if 'abstract' in item:
+        pub.abstract = item['abstract']
+        
+    # Set URL
+    if 'URL' in item and len(item['URL']) <= 200:
+        pub.url = item['URL']
+    
+    # Get affiliations map to use later
+    affiliations = {}
+    if 'institution' in item:
+        for inst in item.get('institution', []):
+            if 'id' in inst and 'name' in inst:
+                affiliations[inst['id']] = inst['name']
+    
+    # Add authors
+    authors = []
+    authors_data = item.get('author', [])
+    for i, author_data in enumerate(authors_data):
+        given = author_data.get('given', '')
+        family = author_data.get('family', '')
+        
+        if not family:  # Skip if no family name
+            continue
+            
+        # Get affiliation for this author
+        affiliation = ''
+        if 'affiliation' in author_data and author_data['affiliation']:
+            if isinstance(author_data['affiliation'], list) and author_data['affiliation']:
+                # Direct name in first affiliation
+                if 'name' in author_data['affiliation'][0]:
+                    affiliation = author_data['affiliation'][0]['name']
+                # Reference to institution
+                elif 'id' in author_data['affiliation'][0] and author_data['affiliation'][0]['id'] in affiliations:
+                    affiliation = affiliations[author_data['affiliation'][0]['id']]
+        
+        # Determine contribution type based on position
+        contribution_type = 'normal'
+        if i == 0:
+            contribution_type = 'first'
+        elif i == len(authors_data) - 1:
+            contribution_type = 'last'
+            
+        # Check for corresponding author
+        corresponding = author_data.get('sequence') == 'first' or 'corresponding-author-id' in author_data
+        if corresponding:
+            # If this is also the first or last author, we'll mark them as corresponding in the AuthorOrder
+            if i == 0 or i == len(authors_data) - 1:
+                contribution_type = 'corresponding'
+        
+        authors.append({
+            'first_name': given[:100],
+            'last_name': family[:100],
+            'affiliation': affiliation[:255],
+            'contribution_type': contribution_type,
+            'corresponding': corresponding,
+        })
+    
+    return pub, authors
@@ -0,0 +1,37 @@
+"""
+Per-connection database tuning.
+
+SQLite is configured through PRAGMAs that only last as long as a
+connection, so they are applied to every new connection here. The
+defaults in settings.SQLITE_PRAGMAS switch to write-ahead logging, in
+which readers no longer wait for a writer (such as fetch_publications)
+to commit, and give each connection a larger page cache and memory-mapped
+reads.
+
+Settings:
+    SQLITE_PRAGMAS: {pragma: value} applied to every SQLite connection (default: none)
+"""
+import logging
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+            if name == 'journal_mode':
+                # In-memory databases (e.g. for tests) cannot use WAL and keep "memory"
+                mode = cursor.fetchone()[0]
+                if mode.lower() != str(value).lower() and mode != 'memory':
+                    logger.warning("SQLite journal_mode is %s instead of %s", mode, value)
@@ -0,0 +1,255 @@
+"""
+Streaming export of publications to BibTeX, RIS, CSL-JSON and CSV.
+
+Publications are read with ``QuerySet.iterator(chunk_size=...)``, which
+prefetches the ordered authors of each chunk with one more query, and every
+record is formatted as soon as it is read. Memory use therefore does not
+grow with the number of publications, and the first bytes can be sent
+before the last record is read. Used by the publication_export view and the
+export_publications command.
+"""
+import csv
+import json
+import re
+from typing import Callable, NamedTuple
+
+# Memory use is about proportional to the authors of one chunk
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _authors(publication):
+    """Return the (first name, last name) of the authors in order, from the prefetched rows."""
+    return [(ao.person.first_name, ao.person.last_name) for ao in publication.authororder_set.all()]
+
+
+def _clean(value):
+    """Return a field value on a single line."""
+    return ' '.join(str(value).split()) if value not in (None, '') else ''
+
+
+def _year(publication):
+    if publication.publication_year:
+        return publication.publication_year
+    return publication.publication_date.year if publication.publication_date else None
+
+
+# BibTeX
+
+BIBTEX_ESCAPES = {
+    '\\': r'\textbackslash{}', '{': r'\{', '}': r'\}', '&': r'\&', '%': r'\%',
+    '$': r'\$', '#': r'\#', '_': r'\_', '~': r'\textasciitilde{}', '^': r'\textasciicircum{}',
+}
+BIBTEX_SPECIAL = re.compile('|'.join(re.escape(char) for char in BIBTEX_ESCAPES))
+
+
+def _bibtex_escape(value):
+    return BIBTEX_SPECIAL.sub(lambda match: BIBTEX_ESCAPES[match.group()], _clean(value))
+
+
+def _bibtex_key(publication, authors):
+    last_name = authors[0][1] if authors else 'anonymous'
+    last_name = re.sub(r'[^A-Za-z]', '', last_name).lower() or 'anonymous'
+    # The primary key keeps keys unique without remembering earlier ones
+    return f"{last_name}{_year(publication) or ''}_{publication.pk}"
+
+
+def bibtex_entry(publication):
+    """Return a publication as a BibTeX entry."""
+    authors = _authors(publication)
+    if publication.journal:
+        entry_type, container = 'article', ('journal', publication.journal)
+    elif publication.conference:
+        entry_type, container = 'inproceedings', ('booktitle', publication.conference)
+    elif publication.isbn:
+        entry_type, container = 'book', None
+    else:
+        entry_type, container = 'misc', None
+
+    fields = [
+        ('author', ' and '.join(
+            f"{_bibtex_escape(last)}, {_bibtex_escape(first)}" if first else _bibtex_escape(last)
+            for first, last in authors
+        )),
+        # Double braces keep the capitalization of the title
+        ('title', f"{{{_bibtex_escape(publication.title)}}}"),
+    ]
+    if container:
+        fields.append((container[0], _bibtex_escape(container[1])))
+    fields += [
+        ('year', _year(publication) or ''),
+        ('volume', _bibtex_escape(publication.volume)),
+        ('number', _bibtex_escape(publication.issue)),
+        ('pages', re.sub(r'\s*-+\s*', '--', _bibtex_escape(publication.pages))),
+        ('doi', _bibtex_escape(publication.doi)),
+        ('isbn', _bibtex_escape(publication.isbn)),
+        ('pmid', _bibtex_escape(publication.pmid)),
+        ('eprint', _bibtex_escape(publication.arxiv_id)),
+        ('url', _bibtex_escape(publication.url)),
+        ('keywords', _bibtex_escape(publication.keywords)),
+        ('abstract', _bibtex_escape(publication.abstract)),
+    ]
+    if publication.arxiv_id:
+        fields.append(('archiveprefix', 'arXiv'))
+
+    lines = [f"@{entry_type}{{{_bibtex_key(publication, authors)},"]
+    lines += [f"  {name} = {{{value}}}," for name, value in fields if value not in ('', None)]
+    lines.append('}\n\n')
+    return '\n'.join(lines)
+
+
+def render_bibtex(publications):
+    for publication in publications:
+        yield bibtex_entry(publication)
+
+
+# RIS
+
+def ris_record(publication):
+    """Return a publication as a RIS record."""
+    if publication.journal:
+        record_type = 'JOUR'
+    elif publication.conference:
+        record_type = 'CPAPER'
+    elif publication.isbn:
+        record_type = 'BOOK'
+    else:
+        record_type = 'GEN'
+
+    tags = [('TY', record_type)]
+    tags += [('AU', f"{last}, {first}" if first else last) for first, last in _authors(publication)]
+    tags += [
+        ('TI', publication.title),
+        ('JO', publication.journal),
+        ('T2', publication.conference),
+        ('PY', _year(publication) or ''),
+        ('DA', publication.publication_date.strftime('%Y/%m/%d') if publication.publication_date else ''),
+        ('VL', publication.volume),
+        ('IS', publication.issue),
+    ]
+    start, _, end = (publication.pages or '').partition('-')
+    tags += [('SP', start.strip()), ('EP', end.strip('- '))]
+    tags += [
+        ('DO', publication.doi),
+        ('SN', publication.isbn),
+        ('UR', publication.url),
+        ('AB', publication.abstract),
+    ]
+    tags += [('KW', keyword) for keyword in publication.get_keywords_list()]
+    lines = [f"{tag}  - {_clean(value)}" for tag, value in tags if _clean(value)]
+    lines.append('ER  - ')
+    return '\n'.join(lines) + '\n\n'
+
+
+def render_ris(publications):
+    for publication in publications:
+        yield ris_record(publication)
+
+
+# CSL-JSON
+
+def csl_item(publication):
+    """Return a publication as a CSL-JSON item (a dict)."""
+    if publication.journal:
+        item_type, container = 'article-journal', publication.journal
+    elif publication.conference:
+        item_type, container = 'paper-conference', publication.conference
+    elif publication.isbn:
+        item_type, container = 'book', ''
+    else:
+        item_type, container = 'article', ''
+
+    item = {
+        'id': str(publication.pk),
+        'type': item_type,
+        'title': publication.title,
+        'author': [
+            {'family': last, 'given': first} if first else {'literal': last}
+            for first, last in _authors(publication)
+        ],
+    }
+    if publication.publication_date:
+        date = publication.publication_date
+        item['issued'] = {'date-parts': [[date.year, date.month, date.day]]}
+    elif publication.publication_year:
+        item['issued'] = {'date-parts': [[publication.publication_year]]}
+    optional = {
+        'container-title': container,
+        'volume': publication.volume,
+        'issue': publication.issue,
+        'page': publication.pages,
+        'DOI': publication.doi,
+        'PMID': publication.pmid,
+        'ISBN': publication.isbn,
+        'URL': publication.url,
+        'abstract': publication.abstract,
+        'keyword': ', '.join(publication.get_keywords_list()),
+    }
+    item.update((name, value) for name, value in optional.items() if value)
+    return item
+
+
+def render_csl_json(publications):
+    # A JSON array, written one item at a time
+    separator = '[\n'
+    for publication in publications:
+        yield separator + json.dumps(csl_item(publication), ensure_ascii=False)
+        separator = ',\n'
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+# CSV
+
+CSV_COLUMNS = [
+    'id', 'title', 'authors', 'publication_year', 'publication_date', 'journal', 'conference',
+    'volume', 'issue', 'pages', 'doi', 'pmid', 'arxiv_id', 'isbn', 'url', 'keywords',
+    'research_field', 'citation_count',
+]
+
+
+class _Echo:
+    """A file-like object whose write returns what was written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(publications):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for publication in publications:
+        row = {
+            'id': publication.pk,
+            'authors': '; '.join(f"{first} {last}".strip() for first, last in _authors(publication)),
+            'publication_year': _year(publication) or '',
+        }
+        yield writer.writerow([
+            row[column] if column in row else (getattr(publication, column) or '')
+            for column in CSV_COLUMNS
+        ])
+
+
+class ExportFormat(NamedTuple):
+    content_type: str
+    extension: str
+    render: Callable
+
+
+FORMATS = {
+    'bibtex': ExportFormat('application/x-bibtex; charset=utf-8', 'bib', render_bibtex),
+    'ris': ExportFormat('application/x-research-info-systems; charset=utf-8', 'ris', render_ris),
+    'csl-json': ExportFormat('application/vnd.citationstyles.csl+json; charset=utf-8', 'json', render_csl_json),
+    'csv': ExportFormat('text/csv; charset=utf-8', 'csv', render_csv),
+}
+
+
+def export_publications(queryset, format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the publications of a queryset as text in an export format.
+
+    Args:
+        queryset: Publication queryset; its ordering is kept
+        format: A key of FORMATS
+        chunk_size: Publications read (and authors prefetched) per query
+    """
+    publications = queryset.with_authors().iterator(chunk_size=chunk_size)
+    yield from FORMATS[format].render(publications)
@@ -0,0 +1,70 @@
+"""
+Filters of the publication and dissertation lists from query parameters,
+shared by the list views, their conditional GET validators and the exports,
+so that they all see the same objects.
+"""
+from . import search as search_index
+
+
+def filter_publications(queryset, params):
+    """
+    Restrict a Publication queryset to the list filters in params.
+
+    Args:
+        queryset: Publication queryset
+        params: mapping such as request.GET with any of:
+            year: publication year
+            author: id of a Person among the authors
+            search: search text; results are then ordered by relevance
+    """
+    # Filter by year if provided
+    year = params.get('year')
+    if year and str(year).isdigit():
+        queryset = queryset.filter(publication_year=int(year))
+
+    # Filter by author if provided
+    author_id = params.get('author')
+    if author_id and str(author_id).isdigit():
+        queryset = queryset.filter(authors__id=int(author_id))
+
+    # Filter by search term if provided, ranking results by relevance
+    search = params.get('search')
+    if search:
+        queryset = search_index.filter_queryset(queryset, search_index.PUBLICATION, search)
+
+    return queryset
+
+
+def filter_dissertations(queryset, params):
+    """
+    Restrict a Dissertation queryset to the list filters in params.
+
+    Args:
+        queryset: Dissertation queryset
+        params: mapping such as request.GET with any of:
+            degree: a Degree value
+            author: id of the author
+            promoter: id of the promoter
+            search: search text; results are then ordered by relevance
+    """
+    # Filter by degree if provided
+    degree = params.get('degree')
+    if degree:
+        queryset = queryset.filter(degree=degree)
+
+    # Filter by author if provided
+    author_id = params.get('author')
+    if author_id and str(author_id).isdigit():
+        queryset = queryset.filter(author__id=int(author_id))
+
+    # Filter by promoter if provided
+    promoter_id = params.get('promoter')
+    if promoter_id and str(promoter_id).isdigit():
+        queryset = queryset.filter(promoter__id=int(promoter_id))
+
+    # Filter by search term if provided, ranking results by relevance
+    search = params.get('search')
+    if search:
+        queryset = search_index.filter_queryset(queryset, search_index.DISSERTATION, search)
+
+    return queryset
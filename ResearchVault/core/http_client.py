@@ -0,0 +1,330 @@
+"""
+HTTP client shared by the import commands.
+
+All requests go through one pooled ``requests.Session`` with explicit
+timeouts. Each API host has a token bucket so concurrent workers stay within
+its published rate limit, and 429/5xx responses or connection errors are
+retried with exponential backoff, honouring ``Retry-After``.
+
+Responses to GET requests are kept in a small SQLite database so re-running
+an import, or retrying one that failed half-way, does not download every
+ORCID work and Crossref record again. Entries younger than the TTL are served
+without a request; older ones are revalidated with ETag/Last-Modified when
+the server sent them.
+
+Settings:
+    HTTP_CACHE_PATH: path of the cache database (default: BASE_DIR / 'http_cache.sqlite3')
+    HTTP_CACHE_TTL: seconds a response is used without revalidation (default: 7 days)
+    HTTP_TIMEOUT: (connect, read) timeout in seconds (default: (5, 30))
+    HTTP_MAX_RETRIES: attempts after the first one for retryable failures (default: 5)
+    CROSSREF_MAILTO: contact address that puts Crossref requests in the polite pool
+    NCBI_API_KEY: E-utilities key, raising the NCBI limit from 3 to 10 requests/s
+    HTTP_FIXTURES_MODE: record responses to, or replay them from, fixture files (see core/http_fixtures.py)
+"""
+import email.utils
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_MAX_RETRIES = 5
+POOL_SIZE = 32
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+USER_AGENT = 'ResearchVault/1.0'
+
+# Headers that describe the transfer rather than the decoded body we store
+_TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+def cache_key(url, params=None, headers=None):
+    """Return the cache key for a GET request: URL, sorted params and Accept header."""
+    if params:
+        url = f"{url}?{urlencode(sorted(params.items()), doseq=True)}"
+    accept = (headers or {}).get('Accept', '')
+    return hashlib.sha256(f"GET {url} {accept}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed store of response bodies and headers, safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, body BLOB, stored_at REAL)"
+            )
+            self._connection.commit()
+
+    def get(self, key):
+        """Return (status, headers, body, stored_at) for a key, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, stored_at = row
+        return status, json.loads(headers), body, stored_at
+
+    def set(self, key, url, response):
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in _TRANSFER_HEADERS
+        }
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, json.dumps(headers), response.content, time.time()),
+            )
+            self._connection.commit()
+
+    def touch(self, key):
+        """Mark a revalidated entry as fresh again."""
+        with self._lock:
+            self._connection.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate, burst=None):
+        with self._lock:
+            self.rate = float(rate)
+            self.capacity = float(burst or rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def default_rate_limits():
+    """Return {host: (requests per second, burst)} for the APIs we import from."""
+    crossref_rate = 10 if getattr(settings, 'CROSSREF_MAILTO', '') else 5
+    ncbi_rate = 10 if getattr(settings, 'NCBI_API_KEY', '') else 3
+    return {
+        'pub.orcid.org': (24, 40),
+        'api.crossref.org': (crossref_rate, crossref_rate),
+        'eutils.ncbi.nlm.nih.gov': (ncbi_rate, ncbi_rate),
+    }
+
+
+# Token buckets are shared by every client in the process, so separate
+# commands or thread pools still respect one limit per host.
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket_for(host):
+    with _buckets_lock:
+        if host not in _buckets:
+            limit = default_rate_limits().get(host)
+            _buckets[host] = TokenBucket(*limit) if limit else None
+        return _buckets[host]
+
+
+def _retry_after(response):
+    """Return the delay requested by a Retry-After header in seconds, or None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _cached_response(url, status, headers, body):
+    """Rebuild a requests.Response from a cache entry."""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+class HttpClient:
+    """
+    Make GET requests through the response cache.
+
+    Args:
+        use_cache: read and write the cache at all (``--no-cache`` disables it)
+        refresh: revalidate or re-download every response even if fresh (``--refresh``)
+        ttl: seconds a cached response is used without contacting the server
+        cache_path: location of the cache database
+        timeout: (connect, read) timeout passed to every request
+        max_retries: attempts after the first one for retryable failures
+        transport: requests adapter to send requests through instead of the
+            network (default: the one selected by HTTP_FIXTURES_MODE, if any)
+    """
+
+    def __init__(self, use_cache=True, refresh=False, ttl=None, cache_path=None, timeout=None, max_retries=None,
+                 transport=None):
+        self.refresh = refresh
+        self.ttl = ttl if ttl is not None else getattr(settings, 'HTTP_CACHE_TTL', DEFAULT_CACHE_TTL)
+        self.timeout = timeout or getattr(settings, 'HTTP_TIMEOUT', DEFAULT_TIMEOUT)
+        self.max_retries = max_retries if max_retries is not None else getattr(
+            settings, 'HTTP_MAX_RETRIES', DEFAULT_MAX_RETRIES
+        )
+        self.cache = None
+        if use_cache:
+            path = cache_path or getattr(settings, 'HTTP_CACHE_PATH', settings.BASE_DIR / 'http_cache.sqlite3')
+            self.cache = ResponseCache(path)
+
+        self.session = requests.Session()
+        if transport is None:
+            from .http_fixtures import transport_from_settings
+            transport = transport_from_settings(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.transport = transport or HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', self.transport)
+        self.session.mount('http://', self.transport)
+        mailto = getattr(settings, 'CROSSREF_MAILTO', '')
+        self.session.headers['User-Agent'] = f"{USER_AGENT} (mailto:{mailto})" if mailto else USER_AGENT
+
+    def _host_params(self, host, params):
+        """Add credentials that must not become part of the cache key."""
+        api_key = getattr(settings, 'NCBI_API_KEY', '')
+        if host == 'eutils.ncbi.nlm.nih.gov' and api_key:
+            return {**(params or {}), 'api_key': api_key}
+        return params
+
+    def _update_rate_limit(self, host, response, bucket):
+        """Follow the limit Crossref announces in X-Rate-Limit-* headers."""
+        limit = response.headers.get('X-Rate-Limit-Limit')
+        interval = response.headers.get('X-Rate-Limit-Interval', '1s')
+        if not limit or not limit.isdigit() or not interval.endswith('s') or not interval[:-1].isdigit():
+            return
+        rate = int(limit) / max(1, int(interval[:-1]))
+        if rate != bucket.rate:
+            logger.info("Rate limit for %s is now %.1f requests/s", host, rate)
+            bucket.set_rate(rate, int(limit))
+
+    def send(self, url, params=None, headers=None, **kwargs):
+        """
+        Send a GET request without the cache, applying rate limits and retries.
+
+        Connection errors, timeouts and 429/5xx responses are retried up to
+        max_retries times; the last response or exception is returned/raised.
+        A Retry-After header longer than BACKOFF_MAX is not waited for: the
+        response is returned at once.
+        """
+        host = urlsplit(url).hostname
+        bucket = _bucket_for(host)
+        params = self._host_params(host, params)
+
+        for attempt in range(self.max_retries + 1):
+            if bucket:
+                bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning("%s for %s, retrying in %.1fs", e.__class__.__name__, url, delay)
+                time.sleep(delay)
+                continue
+
+            if bucket:
+                self._update_rate_limit(host, response, bucket)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            delay = _retry_after(response)
+            if delay is None:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            elif delay > BACKOFF_MAX:
+                # Retrying sooner would be refused again, and waiting could stall an import for hours
+                logger.warning(
+                    "HTTP %s for %s, giving up: Retry-After of %.0fs is over %.0fs",
+                    response.status_code, url, delay, BACKOFF_MAX,
+                )
+                return response
+            logger.warning("HTTP %s for %s, retrying in %.1fs", response.status_code, url, delay)
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, params=None, headers=None):
+        """Return the response for a GET request, from the cache when possible."""
+        if self.cache is None:
+            return self.send(url, params=params, headers=headers)
+
+        key = cache_key(url, params, headers)
+        entry = self.cache.get(key)
+        request_headers = dict(headers or {})
+
+        if entry is not None:
+            status, cached_headers, body, stored_at = entry
+            if not self.refresh and time.time() - stored_at < self.ttl:
+                return _cached_response(url, status, cached_headers, body)
+
+            # Stale: ask the server whether our copy is still current
+            validators = CaseInsensitiveDict(cached_headers)
+            if 'ETag' in validators:
+                request_headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                request_headers['If-Modified-Since'] = validators['Last-Modified']
+
+        response = self.send(url, params=params, headers=request_headers)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            status, cached_headers, body, _ = entry
+            return _cached_response(url, status, cached_headers, body)
+
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            self.cache.set(key, response.url or url, response)
+        return response
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
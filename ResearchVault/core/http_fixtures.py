@@ -0,0 +1,236 @@
+"""
+Recorded HTTP fixtures for running the importers offline.
+
+``RecordingAdapter`` is a requests transport adapter that passes requests on
+to the network and appends every response to a fixture directory, one JSON
+line per response in a file per host. ``ReplayAdapter`` answers requests from
+those files instead of the network, after a configurable latency, and
+answers with HTTP 429 when a host's simulated rate limit is exceeded, so the
+importers' concurrency, batching and retry logic can be measured
+reproducibly (see the benchmark_importers command).
+
+``HttpClient`` mounts one of them when ``HTTP_FIXTURES_MODE`` is set:
+
+    HTTP_FIXTURES_MODE: '' (use the network), 'record' or 'replay'
+    HTTP_FIXTURES_PATH: fixture directory (default: BASE_DIR / 'http_fixtures')
+    HTTP_REPLAY_LATENCY: seconds added to every replayed response (default: 0)
+    HTTP_REPLAY_JITTER: random extra seconds on top of the latency (default: 0)
+    HTTP_REPLAY_RATE_LIMITS: {host: requests per second} enforced by the replay (default: none)
+
+Record with the response cache disabled (``--no-cache``) so that every
+request reaches the network and ends up in the fixtures.
+"""
+import base64
+import io
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+from .http_client import _TRANSFER_HEADERS
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that differ between machines but not in the response
+IGNORED_PARAMS = {'api_key'}
+
+
+def _without_ignored_params(url):
+    """Return url without the IGNORED_PARAMS, e.g. to store or log it."""
+    parts = urlsplit(url)
+    params = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+              if name not in IGNORED_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+def fixture_key(method, url, accept=''):
+    """Return the key under which a request is recorded: method, URL with sorted params, and Accept."""
+    parts = urlsplit(url)
+    params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if name not in IGNORED_PARAMS)
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(params), ''))
+    return f"{method} {url} {accept or ''}"
+
+
+def _build_response(adapter, request, status, headers, body):
+    """Return a requests.Response whose raw stream reads body, as if it came from the network."""
+    raw = HTTPResponse(
+        body=io.BytesIO(body),
+        headers=headers,
+        status=status,
+        preload_content=False,
+        decode_content=False,
+    )
+    return adapter.build_response(request, raw)
+
+
+class FixtureStore:
+    """Responses recorded in a directory, one JSON-lines file per host."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _file(self, host):
+        return self.path / f"{host}.jsonl"
+
+    def load(self):
+        """Return {key: (status, headers, body)}; later recordings of a request win."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = {}
+                for fixture in sorted(self.path.glob('*.jsonl')):
+                    with open(fixture, 'r', encoding='utf-8') as lines:
+                        for line in lines:
+                            if line.strip():
+                                entry = json.loads(line)
+                                body = entry['body']
+                                body = base64.b64decode(body) if entry.get('base64') else body.encode('utf-8')
+                                self._entries[entry['key']] = (entry['status'], entry['headers'], body)
+            return self._entries
+
+    def add(self, key, url, status, headers, body):
+        entry = {'key': key, 'url': url, 'status': status, 'headers': headers}
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body'] = base64.b64encode(body).decode('ascii')
+            entry['base64'] = True
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self._file(urlsplit(url).hostname), 'a', encoding='utf-8') as lines:
+                lines.write(json.dumps(entry) + '\n')
+            if self._entries is not None:
+                self._entries[key] = (status, headers, body)
+
+
+class TransportStats:
+    """Counters of what a fixture adapter did, safe to update from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+        self.throttled = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self):
+        return {'requests': self.requests, 'misses': self.misses, 'throttled': self.throttled}
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Send requests to the network and record the responses."""
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.stats = TransportStats()
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # Read the decoded body, then hand back a fresh stream over it so
+        # callers that stream the response (efetch) still can
+        body = response.content
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in _TRANSFER_HEADERS
+        }
+        key = fixture_key(request.method, request.url, request.headers.get('Accept'))
+        # Fixtures are committed, so the stored URL must not carry the API key either
+        self.store.add(key, _without_ignored_params(request.url), response.status_code, headers, body)
+        self.stats.add(requests=1)
+        return _build_response(self, request, response.status_code, headers, body)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Answer requests from recorded fixtures instead of the network.
+
+    Args:
+        store: FixtureStore to replay
+        latency: seconds every response takes
+        jitter: random extra seconds, from 0 to jitter, per response
+        rate_limits: {host: requests per second}; more requests than that
+            within one second are answered with 429 and Retry-After
+    """
+
+    def __init__(self, store, latency=0.0, jitter=0.0, rate_limits=None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = rate_limits or {}
+        self.stats = TransportStats()
+        self._recent = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def _over_limit(self, host):
+        """Record a request to host and return whether it exceeds the host's rate limit."""
+        limit = self.rate_limits.get(host)
+        if not limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            recent = self._recent[host]
+            while recent and now - recent[0] >= 1.0:
+                recent.popleft()
+            if len(recent) >= limit:
+                return True
+            recent.append(now)
+            return False
+
+    def send(self, request, **kwargs):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        self.stats.add(requests=1)
+
+        host = urlsplit(request.url).hostname
+        if self._over_limit(host):
+            self.stats.add(throttled=1)
+            return _build_response(self, request, 429, {'Retry-After': '1'}, b'Too Many Requests')
+
+        entry = self.store.load().get(fixture_key(request.method, request.url, request.headers.get('Accept')))
+        if entry is None:
+            self.stats.add(misses=1)
+            logger.warning("No recorded response for %s %s", request.method, _without_ignored_params(request.url))
+            return _build_response(self, request, 404, {'Content-Type': 'text/plain'}, b'No recorded response')
+
+        status, headers, body = entry
+        return _build_response(self, request, status, headers, body)
+
+
+def transport_from_settings(**kwargs):
+    """
+    Return the adapter selected by HTTP_FIXTURES_MODE, or None to use the network.
+
+    Keyword arguments (pool sizes) are passed on to the adapter.
+    """
+    mode = getattr(settings, 'HTTP_FIXTURES_MODE', '')
+    if not mode:
+        return None
+    store = FixtureStore(getattr(settings, 'HTTP_FIXTURES_PATH', settings.BASE_DIR / 'http_fixtures'))
+    if mode == 'record':
+        return RecordingAdapter(store, **kwargs)
+    if mode == 'replay':
+        return ReplayAdapter(
+            store,
+            latency=getattr(settings, 'HTTP_REPLAY_LATENCY', 0.0),
+            jitter=getattr(settings, 'HTTP_REPLAY_JITTER', 0.0),
+            rate_limits=getattr(settings, 'HTTP_REPLAY_RATE_LIMITS', None),
+            **kwargs,
+        )
+    raise ValueError(f"Unknown HTTP_FIXTURES_MODE {mode!r}: use '', 'record' or 'replay'")
@@ -0,0 +1,259 @@
+"""
+Helpers shared by the import management commands.
+
+Importers build unsaved ``Publication`` objects together with a list of
+author dicts and hand them to ``save_publication_batch``, which writes a
+whole batch with a fixed number of queries instead of one round-trip per
+author.
+
+An author dict has the keys ``first_name``, ``last_name`` and optionally
+``orcid``, ``affiliation``, ``contribution_type`` and ``corresponding``.
+"""
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import signals
+from .models import AuthorOrder, Person, Publication, author_cache_values, normalize_doi
+
+
+def normalize_name(first_name, last_name):
+    """
+    Return the key under which a name is matched against existing people.
+
+    Case, accents, dots and repeated whitespace are ignored, so "J. Smith"
+    and "j  smith" resolve to the same person.
+    """
+    def clean(value):
+        value = unicodedata.normalize('NFKD', value or '')
+        value = ''.join(char for char in value if not unicodedata.combining(char))
+        return ' '.join(value.replace('.', ' ').casefold().split())
+
+    return clean(first_name), clean(last_name)
+
+
+# Values per IN (...) lookup, well below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def _chunks(values):
+    """Split values into sorted lists of at most LOOKUP_CHUNK_SIZE."""
+    values = sorted(values)
+    return [values[start:start + LOOKUP_CHUNK_SIZE] for start in range(0, len(values), LOOKUP_CHUNK_SIZE)]
+
+
+def title_key(title):
+    """Return the key under which publication titles are compared."""
+    return title.casefold()
+
+
+def existing_titles(titles):
+    """
+    Return the title keys among titles that already belong to a publication.
+
+    The comparison is case-insensitive and done with LOWER() on both sides,
+    so it is answered from the lower-cased title index.
+    """
+    titles = list({title for title in titles if title})
+    existing = set()
+    for start in range(0, len(titles), LOOKUP_CHUNK_SIZE):
+        chunk = titles[start:start + LOOKUP_CHUNK_SIZE]
+        matches = (
+            Publication.objects.annotate(title_lower=Lower('title'))
+            .filter(title_lower__in=[Lower(Value(title)) for title in chunk])
+            .values_list('title', flat=True)
+        )
+        existing.update(title_key(title) for title in matches)
+    return existing
+
+
+class PersonResolver:
+    """
+    Resolve author dicts to Person rows for the length of an import.
+
+    Candidates are loaded by ORCID and by lower-cased last name (which uses
+    the name index on Person), LOOKUP_CHUNK_SIZE values per query, and kept
+    in memory so later batches only query for names not seen before.
+    Existing people are therefore found when their last name equals the
+    imported one, also when only the case differs (ASCII letters only on
+    SQLite, whose LOWER() does not fold other letters). Authors with an
+    ORCID are matched on it, the others on their normalized name. Missing
+    people are created with a single bulk_create per batch.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything loaded so far, e.g. after a rolled-back batch."""
+        self.by_orcid = {}
+        self.by_name = {}
+        self._loaded_orcids = set()
+        self._loaded_last_names = set()
+
+    def _remember(self, person):
+        if person.orcid:
+            self.by_orcid.setdefault(person.orcid, person)
+        self.by_name.setdefault(normalize_name(person.first_name, person.last_name), person)
+
+    def _load(self, authors):
+        orcids = {a['orcid'] for a in authors if a.get('orcid')} - self._loaded_orcids
+        last_names = {a['last_name'] for a in authors} - self._loaded_last_names
+        if not orcids and not last_names:
+            return
+
+        # Last names are lower-cased by the database on both sides, as its
+        # LOWER() may fold fewer letters than Python's
+        lookups = [Q(orcid__in=chunk) for chunk in _chunks(orcids)]
+        lookups += [
+            Q(last_name_lower__in=[Lower(Value(name)) for name in chunk]) for chunk in _chunks(last_names)
+        ]
+        # Earlier rows win in _remember, so candidates are remembered by primary key
+        candidates = {}
+        for lookup in lookups:
+            people = Person.objects.annotate(last_name_lower=Lower('last_name')).filter(lookup)
+            candidates.update((person.pk, person) for person in people)
+        for pk in sorted(candidates):
+            self._remember(candidates[pk])
+        self._loaded_orcids |= orcids
+        self._loaded_last_names |= last_names
+
+    def _find(self, author):
+        if author.get('orcid'):
+            return self.by_orcid.get(author['orcid'])
+        return self.by_name.get(normalize_name(author['first_name'], author['last_name']))
+
+    def resolve(self, authors):
+        """
+        Return the Person for each author dict, in the same order.
+
+        People created here are remembered; if the surrounding transaction
+        rolls back, call ``reset`` so they are not handed out again.
+        """
+        self._load(authors)
+
+        missing = {}
+        for author in authors:
+            if self._find(author) is not None:
+                continue
+            key = author.get('orcid') or normalize_name(author['first_name'], author['last_name'])
+            missing.setdefault(key, Person(
+                first_name=author['first_name'],
+                last_name=author['last_name'],
+                orcid=author.get('orcid') or '',
+                affiliation=author.get('affiliation') or '',
+            ))
+        for person in Person.objects.bulk_create(list(missing.values())):
+            self._remember(person)
+
+        return [self._find(author) for author in authors]
+
+
+def save_publication_batch(records, people=None):
+    """
+    Save a batch of (publication, authors) records in one transaction.
+
+    Publications whose DOI is already in the database, or earlier in the
+    batch, are skipped by the unique doi_normalized constraint rather than by
+    a separate lookup, so concurrent imports cannot insert the same DOI twice.
+    Author order follows the list order. A person listed twice on the same
+    publication is only linked once. Bulk inserts skip model signals, so the
+    search index and page cache are updated explicitly for the new publications.
+
+    Args:
+        records: List of (unsaved Publication, list of author dicts)
+        people: PersonResolver to reuse across batches of one import
+
+    Returns:
+        list: The publications that were inserted
+    """
+    if not records:
+        return []
+    people = people or PersonResolver()
+    try:
+        publications = _save_records(records, people)
+    except Exception:
+        # People created in the failed transaction no longer exist
+        people.reset()
+        raise
+    return publications
+
+
+def _insert_publications(publications):
+    """
+    Insert publications, ignoring DOIs that already exist, and return the inserted ones.
+
+    Rows skipped by ON CONFLICT DO NOTHING get no primary key back, so the
+    inserted ones are found again by DOI key and a created_at marker shared
+    by this batch only.
+    """
+    marker = timezone.now()
+    for publication in publications:
+        publication.doi_normalized = normalize_doi(publication.doi) or None
+        publication.created_at = marker
+
+    without_doi = [publication for publication in publications if not publication.doi_normalized]
+    with_doi = {}
+    for publication in publications:
+        if publication.doi_normalized:
+            with_doi.setdefault(publication.doi_normalized, publication)
+
+    Publication.objects.bulk_create(without_doi)
+    Publication.objects.bulk_create(list(with_doi.values()), ignore_conflicts=True)
+
+    # Unsaved model instances are unhashable, so track them by identity
+    inserted = {id(publication) for publication in without_doi}
+    keys = list(with_doi)
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        rows = Publication.objects.filter(
+            doi_normalized__in=keys[start:start + LOOKUP_CHUNK_SIZE], created_at=marker,
+        ).values_list('doi_normalized', 'pk')
+        for key, pk in rows:
+            with_doi[key].pk = pk
+            inserted.add(id(with_doi[key]))
+    return [publication for publication in publications if id(publication) in inserted]
+
+
+def _save_records(records, people):
+    with transaction.atomic():
+        inserted = {id(publication) for publication in _insert_publications([pub for pub, _ in records])}
+        records = [(publication, authors) for publication, authors in records if id(publication) in inserted]
+
+        persons = iter(people.resolve([author for _, authors in records for author in authors]))
+        resolved = [[(author, next(persons)) for author in authors] for _, authors in records]
+
+        author_orders = []
+        for (publication, _), authors in zip(records, resolved):
+            linked = set()
+            publication_orders = []
+            for order, (author, person) in enumerate(authors):
+                if author.get('corresponding'):
+                    publication.corresponding_author = person
+                if person.pk in linked:
+                    continue
+                linked.add(person.pk)
+                publication_orders.append(AuthorOrder(
+                    publication=publication,
+                    person=person,
+                    order=order,
+                    contribution_type=author.get('contribution_type', 'normal'),
+                ))
+            publication.authors_display, publication.author_flags = author_cache_values(
+                (str(ao.person), ao.contribution_type) for ao in publication_orders
+            )
+            author_orders.extend(publication_orders)
+        AuthorOrder.objects.bulk_create(author_orders)
+
+        # Authors are resolved after the insert so that skipped duplicates do
+        # not create people, hence the author fields are a second write
+        Publication.objects.bulk_update(
+            [publication for publication, _ in records],
+            ['corresponding_author', 'authors_display', 'author_flags'],
+        )
+
+        signals.schedule_publications([publication.pk for publication, _ in records])
+
+    return [publication for publication, _ in records]
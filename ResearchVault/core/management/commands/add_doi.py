@@ -1,14 +1,19 @@
-import requests
 import logging
 import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from core.models import Publication, Person, AuthorOrder
-from django.db import transaction
+from core.crossref import publication_from_crossref
+from core.importing import LOOKUP_CHUNK_SIZE, PersonResolver, save_publication_batch
+from core.http_client import HttpClient
+from core.models import Publication, normalize_doi
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 100
+
 class Command(BaseCommand):
     help = 'Add publications to the database by DOI or from a CSV file containing DOIs'
 
@@ -29,11 +34,35 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be imported without actually importing'
         )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Do not read or write the HTTP response cache'
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Revalidate cached HTTP responses even if they are still fresh'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f'Number of concurrent Crossref requests when importing a CSV (default: {DEFAULT_WORKERS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of publications written per transaction when importing a CSV (default: {DEFAULT_BATCH_SIZE})'
+        )
 
     def handle(self, *args, **options):
         doi = options.get('doi')
         csv_path = options.get('csv')
         dry_run = options.get('dry_run')
+        self.http = HttpClient(use_cache=not options.get('no_cache'), refresh=options.get('refresh'))
+        self.people = PersonResolver()
         
         if dry_run:
             self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made to the database"))
@@ -42,38 +71,152 @@ class Command(BaseCommand):
             self.stdout.write(self.style.NOTICE(f"Fetching publication with DOI: {doi}"))
             self.add_by_doi(doi, dry_run)
         elif csv_path:
-            self.import_from_csv(csv_path, dry_run)
+            self.import_from_csv(csv_path, dry_run, options['workers'], options['batch_size'])
     
-    def import_from_csv(self, csv_path, dry_run=False):
+    def read_csv_dois(self, csv_path):
+        """
+        Return the normalized DOIs in a CSV file's 'doi' column, without duplicates
+        
+        Returns:
+            list: The DOIs in file order, or None if the file has no 'doi' column
+        """
+        with open(csv_path, 'r', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            
+            if not reader.fieldnames or 'doi' not in reader.fieldnames:
+                self.stdout.write(self.style.ERROR(f"CSV file must contain a column named 'doi'"))
+                return None
+            
+            dois = {}
+            for row in reader:
+                doi = normalize_doi(row.get('doi'))
+                if doi:
+                    dois[doi] = None
+            return list(dois)
+    
+    def existing_dois(self, dois):
+        """Return the subset of normalized DOIs already in the database, in as few queries as possible."""
+        existing = set()
+        for start in range(0, len(dois), LOOKUP_CHUNK_SIZE):
+            chunk = dois[start:start + LOOKUP_CHUNK_SIZE]
+            existing.update(
+                Publication.objects.filter(doi_normalized__in=chunk).values_list('doi_normalized', flat=True)
+            )
+        return existing
+    
+    def import_from_csv(self, csv_path, dry_run=False, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE):
         """
         Import DOIs from a CSV file with a column named 'doi'
+        
+        DOIs already in the database are dropped up front with one lookup per
+        LOOKUP_CHUNK_SIZE DOIs, which saves fetching them; DOIs inserted by a
+        concurrent import in the meantime are skipped by the database.
+        Crossref metadata is fetched on a pool of worker threads while the
+        previous batch is written to the database.
         """
         try:
-            with open(csv_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
+            dois = self.read_csv_dois(csv_path)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error reading CSV file {csv_path}: {str(e)}"))
+            return
+        if dois is None:
+            return
+        
+        started = time.monotonic()
+        existing = self.existing_dois(dois)
+        new_dois = [doi for doi in dois if doi not in existing]
+        self.stdout.write(self.style.NOTICE(
+            f"Found {len(dois)} unique DOIs in CSV file, {len(existing)} already in the database"
+        ))
+        
+        batch_size = max(1, batch_size)
+        batches = [new_dois[start:start + batch_size] for start in range(0, len(new_dois), batch_size)]
+        imported = 0
+        duplicates = 0
+        failed = 0
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            pending = [executor.submit(self.fetch_crossref_item, doi) for doi in batches[0]] if batches else []
+            for index in range(len(batches)):
+                results = [future.result() for future in pending]
                 
-                if 'doi' not in reader.fieldnames:
-                    self.stdout.write(self.style.ERROR(f"CSV file must contain a column named 'doi'"))
-                    return
+                # Start fetching the next batch while this one is written
+                if index + 1 < len(batches):
+                    pending = [executor.submit(self.fetch_crossref_item, doi) for doi in batches[index + 1]]
                 
-                doi_count = 0
-                success_count = 0
+                records = []
+                for doi, item, error in results:
+                    if error:
+                        self.stdout.write(self.style.ERROR(f"Error adding DOI {doi}: {error}"))
+                        failed += 1
+                        continue
+                    record = self.build_publication(doi, item)
+                    if record is None:
+                        failed += 1
+                        continue
+                    if dry_run:
+                        self.stdout.write(f"Would import: {record[0].title}")
+                    records.append(record)
                 
-                for row in reader:
-                    doi = row.get('doi', '').strip()
-                    if doi:
-                        doi_count += 1
-                        self.stdout.write(self.style.NOTICE(f"Processing DOI {doi_count}: {doi}"))
-                        try:
-                            result = self.add_by_doi(doi, dry_run)
-                            if result:
-                                success_count += 1
-                        except Exception as e:
-                            self.stdout.write(self.style.ERROR(f"Error adding DOI {doi}: {str(e)}"))
+                if not dry_run:
+                    try:
+                        saved = save_publication_batch(records, self.people)
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f"Error saving batch {index + 1}: {str(e)}"))
+                        failed += len(records)
+                        continue
+                    duplicates += len(records) - len(saved)
+                    records = saved
+                imported += len(records)
                 
-                self.stdout.write(self.style.SUCCESS(f"Processed {doi_count} DOIs from CSV file. Successfully imported {success_count} publications."))
+                elapsed = time.monotonic() - started
+                self.stdout.write(self.style.NOTICE(
+                    f"Batch {index + 1}/{len(batches)}: {imported} imported, {failed} failed "
+                    f"({imported / elapsed:.1f} publications/s)"
+                ))
+        
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(dois)} DOIs from CSV file in {elapsed:.1f}s. "
+            f"Successfully imported {imported} publications, skipped {len(existing) + duplicates} existing, "
+            f"{failed} failed ({len(new_dois) / elapsed if elapsed else 0:.1f} DOIs/s)."
+        ))
+    
+    def fetch_crossref_item(self, doi):
+        """
+        Fetch the Crossref record for a DOI
+        
+        Returns:
+            tuple: (doi, Crossref message or None, error message or None)
+        """
+        try:
+            url = f"https://api.crossref.org/works/{doi}"
+            response = self.http.get(url)
+            response.raise_for_status()
+            return doi, response.json().get('message', {}), None
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error reading CSV file {csv_path}: {str(e)}"))
+            return doi, None, str(e)
+    
+    def build_publication(self, doi, item):
+        """
+        Build an unsaved Publication and its author list from a Crossref record
+        
+        Returns:
+            tuple: (Publication, list of author dicts), or None if the record is unusable
+        """
+        if not item:
+            self.stdout.write(self.style.ERROR(f"No data found for DOI: {doi}"))
+            return None
+        
+        record = publication_from_crossref(item)
+        if record is None:
+            self.stdout.write(self.style.ERROR(f"No title found for DOI: {doi}"))
+            return None
+        
+        # Prefer the DOI as registered with Crossref over the one given
+        if not record[0].doi:
+            record[0].doi = doi
+        return record
     
     def add_by_doi(self, doi, dry_run=False):
         """
@@ -84,153 +227,38 @@ class Command(BaseCommand):
         """
         try:
             # Clean up DOI
-            cleaned_doi = doi.strip()
+            cleaned_doi = normalize_doi(doi)
             
             # Check if publication already exists
-            if Publication.objects.filter(doi=cleaned_doi).exists():
+            if Publication.objects.filter(doi_normalized=cleaned_doi).exists():
                 self.stdout.write(self.style.WARNING(f"Publication with DOI {cleaned_doi} already exists"))
                 return False
             
             # Fetch from Crossref API
             self.stdout.write(f"Fetching metadata from Crossref for DOI: {cleaned_doi}")
-            url = f"https://api.crossref.org/works/{cleaned_doi}"
+            _, item, error = self.fetch_crossref_item(cleaned_doi)
+            if error:
+                raise Exception(error)
             
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            item = data.get('message', {})
-            
-            if not item:
-                self.stdout.write(self.style.ERROR(f"No data found for DOI: {cleaned_doi}"))
-                return False
-                
-            # Extract basic info
-            title = item.get('title', [''])[0]
-            if not title:
-                self.stdout.write(self.style.ERROR(f"No title found for DOI: {cleaned_doi}"))
+            record = self.build_publication(cleaned_doi, item)
+            if record is None:
                 return False
+            pub, authors = record
                 
             if dry_run:
-                self.stdout.write(f"Would import: {title}")
-                self.stdout.write(f"Authors: {', '.join([author.get('given', '') + ' ' + author.get('family', '') for author in item.get('author', [])])}")
+                self.stdout.write(f"Would import: {pub.title}")
+                self.stdout.write(f"Authors: {', '.join([author['first_name'] + ' ' + author['last_name'] for author in authors])}")
                 return True
             
             # Create publication
-            with transaction.atomic():
-                pub = Publication()
-                pub.title = title
-                pub.doi = cleaned_doi
-                
-                # Get publication date
-                published_date = item.get('published-print', item.get('published-online'))
-                if published_date:
-                    date_parts = published_date.get('date-parts', [[]])[0]
-                    if len(date_parts) >= 1:
-                        pub.publication_year = date_parts[0]
-                        
-                        # Create full date if we have all parts
-                        if len(date_parts) >= 3:
-                            try:
-                                pub.publication_date = timezone.datetime(
-                                    date_parts[0], date_parts[1], date_parts[2]
-                                ).date()
-                            except (ValueError, TypeError):
-                                pub.publication_date = None
-                
-                # Set journal info
-                container = item.get('container-title', [''])[0]
-                if container:
-                    pub.journal = container
-                    
-                # Set page info
-                if 'page' in item:
-                    pub.pages = item['page']
-                    
-                # Set volume/issue
-                if 'volume' in item:
-                    pub.volume = item['volume']
-                if 'issue' in item:
-                    pub.issue = item['issue']
-                    
-                # Set abstract if available
-                if 'abstract' in item:
-                    pub.abstract = item['abstract']
-                    
-                # Set URL
-                if 'URL' in item:
-                    pub.url = item['URL']
-                    
-                # Save the publication
-                pub.save()
-                
-                # Get affiliations map to use later
-                affiliations = {}
-                if 'institution' in item:
-                    for inst in item.get('institution', []):
-                        if 'id' in inst and 'name' in inst:
-                            affiliations[inst['id']] = inst['name']
-                
-                # Add authors
-                authors_data = item.get('author', [])
-                for i, author_data in enumerate(authors_data):
-                    given = author_data.get('given', '')
-                    family = author_data.get('family', '')
-                    
-                    if not family:  # Skip if no family name
-                        continue
-                        
-                    # Get affiliation for this author
-                    affiliation = ''
-                    if 'affiliation' in author_data and author_data['affiliation']:
-                        if isinstance(author_data['affiliation'], list) and author_data['affiliation']:
-                            # Direct name in first affiliation
-                            if 'name' in author_data['affiliation'][0]:
-                                affiliation = author_data['affiliation'][0]['name']
-                            # Reference to institution
-                            elif 'id' in author_data['affiliation'][0] and author_data['affiliation'][0]['id'] in affiliations:
-                                affiliation = affiliations[author_data['affiliation'][0]['id']]
-                    
-                    # Try to match existing Person or create new one
-                    try:
-                        person, created = Person.objects.get_or_create(
-                            first_name=given,
-                            last_name=family,
-                            defaults={'affiliation': affiliation}
-                        )
-                        
-                        # Determine contribution type based on position
-                        contribution_type = 'normal'
-                        if i == 0:
-                            contribution_type = 'first'
-                        elif i == len(authors_data) - 1:
-                            contribution_type = 'last'
-                            
-                        # Check for corresponding author
-                        if author_data.get('sequence') == 'first' or 'corresponding-author-id' in author_data:
-                            pub.corresponding_author = person
-                            
-                            # If this is also the first or last author, we'll mark them as corresponding in the AuthorOrder
-                            if i == 0 or i == len(authors_data) - 1:
-                                contribution_type = 'corresponding'
-                            
-                        # Create author order with position and contribution type
-                        AuthorOrder.objects.create(
-                            publication=pub,
-                            person=person,
-                            order=i,
-                            contribution_type=contribution_type
-                        )
-                        
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f"Error adding author {given} {family}: {str(e)}"))
-                
-                pub.save()
-                self.stdout.write(self.style.SUCCESS(f"Added publication: {title}"))
-                return True
+            if not save_publication_batch([record], self.people):
+                self.stdout.write(self.style.WARNING(f"Publication with DOI {cleaned_doi} already exists"))
+                return False
+            self.stdout.write(self.style.SUCCESS(f"Added publication: {pub.title}"))
+            return True
         
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error adding publication with DOI {doi}: {str(e)}"))
             import traceback
             self.stdout.write(self.style.ERROR(traceback.format_exc()))
-            return False
\ No newline at end of file
+            return False
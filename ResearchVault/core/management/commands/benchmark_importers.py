@@ -0,0 +1,215 @@
+import io
+import json
+import time
+from itertools import product
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+
+from core.http_fixtures import FixtureStore
+from core.management.commands import add_doi, fetch_publications
+from core.middleware import QueryRecorder
+from core.models import Publication
+
+DEFAULT_LATENCY_MS = 100
+DEFAULT_REPEAT = 1
+
+
+class Rollback(Exception):
+    """Raised to discard what an import run wrote."""
+
+
+def parse_rate_limit(value):
+    """Parse HOST=RATE into (host, requests per second)."""
+    host, _, rate = value.partition('=')
+    try:
+        return host, float(rate)
+    except ValueError:
+        raise CommandError(f"Invalid rate limit {value!r}: use HOST=REQUESTS_PER_SECOND")
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the throughput (works/s, queries/work) of fetch_publications and add_doi '
+        'against recorded HTTP fixtures, replayed with simulated latency and rate limits. '
+        'Record fixtures first by running the imports with HTTP_FIXTURES_MODE=record and '
+        '--no-cache. Every run is rolled back, so search indexing on commit is not included.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixtures',
+            type=str,
+            help='Fixture directory (default: the HTTP_FIXTURES_PATH setting)',
+        )
+        parser.add_argument('--orcid', type=str, help='ORCID iD to import from the ORCID fixtures')
+        parser.add_argument('--author', type=str, help='Author name to import from the PubMed and Crossref fixtures')
+        parser.add_argument('--csv', type=str, help='CSV file of DOIs to import with add_doi')
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=DEFAULT_LATENCY_MS,
+            help=f'Milliseconds every replayed response takes (default: {DEFAULT_LATENCY_MS})',
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0,
+            help='Random extra milliseconds per response, from 0 up to this value (default: 0)',
+        )
+        parser.add_argument(
+            '--rate-limit',
+            action='append',
+            default=[],
+            metavar='HOST=RATE',
+            help='Answer requests to HOST beyond RATE per second with 429 (repeatable)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[fetch_publications.DEFAULT_CONCURRENCY],
+            help=(
+                'Concurrent requests (ORCID --concurrency, add_doi --workers) to try '
+                f'(default: {fetch_publications.DEFAULT_CONCURRENCY})'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            nargs='+',
+            help='Batch sizes to try (default: each command\'s own default)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=DEFAULT_REPEAT,
+            help=f'Runs per combination; the fastest one is reported (default: {DEFAULT_REPEAT})',
+        )
+        parser.add_argument('--output', type=str, help='Path of a JSON report to write')
+
+    def handle(self, *args, **options):
+        fixtures = options['fixtures'] or getattr(settings, 'HTTP_FIXTURES_PATH', settings.BASE_DIR / 'http_fixtures')
+        if not FixtureStore(fixtures).load():
+            raise CommandError(f"No recorded responses in {fixtures}; record some with HTTP_FIXTURES_MODE=record")
+
+        scenarios = self.scenarios(options)
+        if not scenarios:
+            raise CommandError("Nothing to benchmark: pass --orcid, --author and/or --csv")
+
+        replay_settings = {
+            'HTTP_FIXTURES_MODE': 'replay',
+            'HTTP_FIXTURES_PATH': fixtures,
+            'HTTP_REPLAY_LATENCY': max(0.0, options['latency']) / 1000,
+            'HTTP_REPLAY_JITTER': max(0.0, options['jitter']) / 1000,
+            'HTTP_REPLAY_RATE_LIMITS': dict(parse_rate_limit(value) for value in options['rate_limit']),
+        }
+        self.verbose = options['verbosity'] > 1
+
+        results = []
+        with override_settings(**replay_settings):
+            for name, command_class, arguments, concurrency, batch_size in scenarios:
+                runs = [self.run(command_class, arguments) for _ in range(max(1, options['repeat']))]
+                result = {
+                    'scenario': name,
+                    'concurrency': concurrency,
+                    'batch_size': batch_size,
+                    **min(runs, key=lambda run: run['seconds']),
+                }
+                results.append(result)
+                self.stdout.write(self.format_result(result))
+
+        if options['output']:
+            report = {
+                'settings': {
+                    'latency_ms': options['latency'],
+                    'jitter_ms': options['jitter'],
+                    'rate_limits': replay_settings['HTTP_REPLAY_RATE_LIMITS'],
+                    'database': connection.vendor,
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def scenarios(self, options):
+        """Return (name, command class, arguments, concurrency, batch size) for every run to make."""
+        concurrencies = options['concurrency']
+        scenarios = []
+        if options['orcid']:
+            batch_sizes = options['batch_size'] or [fetch_publications.DEFAULT_BATCH_SIZE]
+            for concurrency, batch_size in product(concurrencies, batch_sizes):
+                scenarios.append(('fetch_publications orcid', fetch_publications.Command, {
+                    'source': 'orcid', 'orcid': options['orcid'],
+                    'concurrency': concurrency, 'batch_size': batch_size,
+                }, concurrency, batch_size))
+        if options['author']:
+            # PubMed and Crossref are paged sequentially, so only the batch size matters
+            batch_sizes = options['batch_size'] or [fetch_publications.DEFAULT_BATCH_SIZE]
+            for source, batch_size in product(('pubmed', 'crossref'), batch_sizes):
+                scenarios.append((f'fetch_publications {source}', fetch_publications.Command, {
+                    'source': source, 'author': options['author'], 'batch_size': batch_size,
+                }, None, batch_size))
+        if options['csv']:
+            batch_sizes = options['batch_size'] or [add_doi.DEFAULT_BATCH_SIZE]
+            for concurrency, batch_size in product(concurrencies, batch_sizes):
+                scenarios.append(('add_doi csv', add_doi.Command, {
+                    'csv': options['csv'], 'workers': concurrency, 'batch_size': batch_size,
+                }, concurrency, batch_size))
+        return scenarios
+
+    def run(self, command_class, arguments):
+        """Run one import, measure it and roll it back."""
+        command = command_class()
+        output = io.StringIO()
+        recorder = QueryRecorder()
+        try:
+            with transaction.atomic():
+                before = Publication.objects.count()
+                with connection.execute_wrapper(recorder):
+                    start = time.perf_counter()
+                    # The response cache would hide the replayed latency
+                    call_command(command, no_cache=True, stdout=output, stderr=output, **arguments)
+                    seconds = time.perf_counter() - start
+                works = Publication.objects.count() - before
+                raise Rollback
+        except Rollback:
+            pass
+
+        if self.verbose:
+            self.stdout.write(output.getvalue())
+        http = command.http.transport.stats.as_dict()
+        # Per-work and per-batch errors are printed indented under their heading
+        errors = [line.strip() for line in output.getvalue().splitlines() if line.strip().startswith('Error')]
+        return {
+            'seconds': round(seconds, 3),
+            'works': works,
+            'works_per_second': round(works / seconds, 1) if seconds else None,
+            'queries': recorder.count,
+            'queries_per_work': round(recorder.count / works, 2) if works else None,
+            'db_seconds': round(recorder.duration, 3),
+            'http_requests': http['requests'],
+            'http_misses': http['misses'],
+            'http_throttled': http['throttled'],
+            'errors': errors,
+        }
+
+    def format_result(self, result):
+        options = []
+        if result['concurrency'] is not None:
+            options.append(f"concurrency {result['concurrency']}")
+        options.append(f"batch {result['batch_size']}")
+        line = (
+            f"{result['scenario']} ({', '.join(options)}): {result['works']} works in "
+            f"{result['seconds']:.2f}s = {result['works_per_second'] or 0:.1f} works/s, "
+            f"{result['queries']} queries ({result['queries_per_work'] or 0:.1f}/work), "
+            f"{result['http_requests']} requests, {result['http_throttled']} throttled"
+        )
+        if result['http_misses'] or result['errors']:
+            problems = [f"{result['http_misses']} responses not recorded"] + result['errors']
+            return self.style.WARNING(f"{line}\n  " + '\n  '.join(problems))
+        return line
@@ -0,0 +1,209 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+from core.models import AuthorOrder, Dissertation, Person, Publication
+
+DEFAULT_ROWS = 100000
+DEFAULT_REPEAT = 50
+
+# Rows per INSERT while generating the benchmark data
+INSERT_BATCH_SIZE = 2000
+
+WORDS = (
+    'analysis protein network model learning quantum cell dynamics structure '
+    'genome climate neural data imaging signal theory system method clinical '
+    'review synthesis optimal robust deep graph spectral thermal energy'
+).split()
+
+
+class Rollback(Exception):
+    """Raised to discard the generated data at the end of the benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare query plans and timings of the importer lookups and list-page '
+        'queries with and without the model indexes, on generated data that is '
+        'rolled back afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=DEFAULT_ROWS,
+            help=f'Number of publications to generate (default: {DEFAULT_ROWS})',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=DEFAULT_REPEAT,
+            help=f'Number of times each query is run (default: {DEFAULT_REPEAT})',
+        )
+
+    def handle(self, *args, **options):
+        rows = max(1, options['rows'])
+        repeat = max(1, options['repeat'])
+        self.verbose = options['verbosity'] > 1
+
+        try:
+            with transaction.atomic():
+                samples = self.generate(rows)
+                queries = self.queries(samples)
+
+                self.stdout.write(self.style.NOTICE("With indexes:"))
+                indexed = self.run(queries, repeat, 'indexed')
+
+                self.drop_indexes()
+                self.stdout.write(self.style.NOTICE("Without indexes:"))
+                unindexed = self.run(queries, repeat, 'unindexed')
+
+                self.report(queries, indexed, unindexed)
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark data rolled back"))
+
+    def generate(self, rows):
+        """Insert rows publications with two authors each, plus people and dissertations."""
+        rng = random.Random(0)
+        start = time.perf_counter()
+        self.stdout.write(f"Generating {rows} publications...")
+
+        people = Person.objects.bulk_create(
+            [
+                Person(
+                    first_name=f"Bench{i}",
+                    last_name=rng.choice(WORDS).capitalize() + str(i % 997),
+                    orcid=f"0000-0002-{i // 10000:04d}-{i % 10000:04d}",
+                )
+                for i in range(max(2, rows // 4))
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        publications = Publication.objects.bulk_create(
+            [
+                Publication(
+                    title=' '.join(rng.choice(WORDS) for _ in range(6)).capitalize() + f" {i}",
+                    publication_year=rng.randint(1980, 2025),
+                    doi=f"10.5555/bench.{i}",
+                    doi_normalized=f"10.5555/bench.{i}",
+                    pmid=str(90000000 + i),
+                    arxiv_id=f"bench.{i:07d}",
+                )
+                for i in range(rows)
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        AuthorOrder.objects.bulk_create(
+            [
+                AuthorOrder(publication=publication, person=person, order=order)
+                for publication in publications
+                for order, person in enumerate(rng.sample(people, 2))
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        Dissertation.objects.bulk_create(
+            [
+                Dissertation(
+                    title=f"Dissertation {i}",
+                    author=rng.choice(people),
+                    promoter=rng.choice(people),
+                    defense_date=f"{rng.randint(1980, 2025)}-06-01",
+                )
+                for i in range(max(1, rows // 10))
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        self.stdout.write(f"  done in {time.perf_counter() - start:.1f}s")
+
+        return {
+            'publication': rng.choice(publications),
+            'person': rng.choice(people),
+        }
+
+    def queries(self, samples):
+        """Return (label, queryset) pairs for the lookups the app runs most."""
+        publication = samples['publication']
+        person = samples['person']
+        return [
+            ("Dedupe by DOI", Publication.objects.filter(doi_normalized=publication.doi).values('pk')),
+            ("Dedupe by PMID", Publication.objects.filter(pmid=publication.pmid).values('pk')),
+            ("Dedupe by arXiv ID", Publication.objects.filter(arxiv_id=publication.arxiv_id).values('pk')),
+            (
+                "Dedupe by title (case-insensitive)",
+                Publication.objects.annotate(title_lower=Lower('title'))
+                .filter(title_lower=Lower(Value(publication.title.upper())))
+                .values('pk'),
+            ),
+            ("Person by ORCID", Person.objects.filter(orcid=person.orcid).values('pk')),
+            (
+                "Person by name",
+                Person.objects.filter(first_name=person.first_name, last_name=person.last_name).values('pk'),
+            ),
+            ("Publication list page", Publication.objects.values('pk')[:20]),
+            ("Dissertation list page", Dissertation.objects.values('pk')[:20]),
+            (
+                "Authors of a publication",
+                AuthorOrder.objects.filter(publication=publication).order_by('order').values('pk'),
+            ),
+        ]
+
+    def explain(self, queryset, phase):
+        """Return the query plan of a queryset as text."""
+        sql, params = queryset.query.sql_with_params()
+        # The comment varies the statement text, so sqlite3's statement cache
+        # cannot hand back a plan prepared before the indexes were dropped
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} /* {phase} */", params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def run(self, queries, repeat, phase):
+        """Return the plan and mean time in milliseconds of every query."""
+        results = []
+        for label, queryset in queries:
+            plan = self.explain(queryset, phase)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) * 1000 / repeat
+            results.append((plan, elapsed))
+            self.stdout.write(f"  {label}: {elapsed:.2f} ms")
+            if self.verbose:
+                for line in plan.splitlines():
+                    self.stdout.write(f"      {line}")
+        return results
+
+    def drop_indexes(self):
+        """
+        Drop the declared model indexes and partial unique constraints (which
+        are implemented as indexes); the surrounding rollback restores them.
+        """
+        with connection.cursor() as cursor:
+            for model in (Person, Publication, AuthorOrder, Dissertation):
+                names = [index.name for index in model._meta.indexes]
+                names += [
+                    constraint.name for constraint in model._meta.constraints
+                    if getattr(constraint, 'condition', None) is not None
+                ]
+                for name in names:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+
+    def report(self, queries, indexed, unindexed):
+        self.stdout.write(self.style.NOTICE("Summary:"))
+        for (label, _), (plan, with_ms), (plan_without, without_ms) in zip(queries, indexed, unindexed):
+            speedup = without_ms / with_ms if with_ms else float('inf')
+            self.stdout.write(f"  {label}: {without_ms:.2f} ms -> {with_ms:.2f} ms ({speedup:.0f}x)")
+            self.stdout.write(f"      without: {self.summarize(plan_without)}")
+            self.stdout.write(f"      with:    {self.summarize(plan)}")
+
+    def summarize(self, plan):
+        """Return the lines of a query plan that say how tables are accessed and sorted."""
+        keywords = ('SCAN', 'SEARCH', 'INDEX', 'SORT', 'B-TREE')
+        lines = [line.strip() for line in plan.splitlines() if line.strip()]
+        steps = [line for line in lines if any(word in line.upper() for word in keywords)]
+        return '; '.join(steps or lines[:1])
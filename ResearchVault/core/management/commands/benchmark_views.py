@@ -0,0 +1,295 @@
+import json
+import platform
+import subprocess
+import time
+from typing import NamedTuple
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.middleware import QueryRecorder
+from core.models import AuthorOrder, Dissertation, Person, Publication
+
+DEFAULT_REQUESTS = 30
+DEFAULT_WARMUP = 3
+DEFAULT_MAX_REGRESSION = 20.0
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Page(NamedTuple):
+    """A benchmarked URL and how it is requested."""
+    url: str
+    # As the admin user, which bypasses the page cache, instead of anonymously
+    logged_in: bool = False
+    # With the ETag of an earlier response in If-None-Match, expecting a 304
+    conditional: bool = False
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark user and its session."""
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a non-empty list of numbers."""
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the public pages and admin changelists against the current database '
+        'and write query counts and latency percentiles to a JSON report, optionally '
+        'comparing them with an earlier report. Public pages are requested anonymously, '
+        'as most visitors do, so they go through the page cache; the *_logged_in pages '
+        'measure the uncached path and the *_not_modified pages conditional GETs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=DEFAULT_REQUESTS,
+            help=f'Timed requests per page (default: {DEFAULT_REQUESTS})',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=DEFAULT_WARMUP,
+            help=f'Untimed requests per page first, to fill caches (default: {DEFAULT_WARMUP})',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Path of the JSON report to write',
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='Path of an earlier JSON report to compare with',
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=DEFAULT_MAX_REGRESSION,
+            help=(
+                'Percentage by which the p50 or p95 latency may grow over the compared '
+                f'report before a page counts as a regression (default: {DEFAULT_MAX_REGRESSION})'
+            ),
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error when a page regressed, e.g. in CI',
+        )
+        parser.add_argument(
+            '--pages',
+            nargs='+',
+            help='Only benchmark these pages (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        if not Publication.objects.exists():
+            raise CommandError("There are no publications to benchmark; run generate_corpus first")
+
+        baseline = self.read_report(options['compare']) if options['compare'] else None
+        pages = self.pages()
+        if options['pages']:
+            unknown = set(options['pages']) - set(pages)
+            if unknown:
+                raise CommandError(f"Unknown pages: {', '.join(sorted(unknown))} (choose from {', '.join(pages)})")
+            pages = {name: url for name, url in pages.items() if name in options['pages']}
+
+        results = {}
+        # The admin user and its session only exist for the benchmark
+        try:
+            with transaction.atomic(), override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                # The metrics middleware would log every request
+                REQUEST_METRICS_ENABLED=False,
+            ):
+                clients = {False: Client(), True: Client()}
+                clients[True].force_login(get_user_model().objects.create_superuser(
+                    'benchmark-views', 'benchmark@example.com', None,
+                ))
+                for name, page in pages.items():
+                    results[name] = self.run(
+                        clients[page.logged_in], page, max(1, options['requests']), max(0, options['warmup']),
+                    )
+                    self.stdout.write(self.format_result(name, results[name]))
+                raise Rollback
+        except Rollback:
+            pass
+
+        report = {'meta': self.metadata(options), 'pages': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if baseline is not None:
+            regressions = self.compare(baseline, report, options['max_regression'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"Regressions in: {', '.join(regressions)}")
+
+    def pages(self):
+        """Return {name: Page} of the pages to benchmark, using records from the database."""
+        publication = Publication.objects.order_by('pk').first()
+        dissertation = Dissertation.objects.order_by('pk').first()
+        # The publication with the most authors is the worst case for the detail page
+        crowded = (
+            AuthorOrder.objects.values_list('publication_id', flat=True)
+            .order_by('-order').first()
+        )
+        person = Person.objects.order_by('pk').first()
+        year = Publication.objects.exclude(publication_year=None).values_list('publication_year', flat=True).first()
+        publication_count = Publication.objects.count()
+
+        publication_list = reverse('core:publication_list')
+        publication_detail = reverse('core:publication_detail', args=[publication.pk])
+        pages = {
+            'home': Page(reverse('core:home')),
+            'publication_list': Page(publication_list),
+            'publication_list_last_page': Page(f"{publication_list}?page=last"),
+            'publication_list_year': Page(f"{publication_list}?year={year}"),
+            'publication_list_author': Page(f"{publication_list}?author={person.pk}"),
+            'publication_list_search': Page(f"{publication_list}?search=protein+network"),
+            'publication_list_logged_in': Page(publication_list, logged_in=True),
+            'publication_list_not_modified': Page(publication_list, conditional=True),
+            'publication_detail': Page(publication_detail),
+            'publication_detail_most_authors': Page(
+                reverse('core:publication_detail', args=[crowded or publication.pk])
+            ),
+            'publication_detail_logged_in': Page(publication_detail, logged_in=True),
+            'publication_detail_not_modified': Page(publication_detail, conditional=True),
+            'dissertation_list': Page(reverse('core:dissertation_list')),
+            'dissertation_list_logged_in': Page(reverse('core:dissertation_list'), logged_in=True),
+            'author_autocomplete': Page(f"{reverse('core:author_autocomplete')}?q={person.last_name[:3]}"),
+            'admin_publication_changelist': Page(reverse('admin:core_publication_changelist'), logged_in=True),
+            'admin_publication_search': Page(
+                f"{reverse('admin:core_publication_changelist')}?q=protein", logged_in=True
+            ),
+            'admin_person_changelist': Page(reverse('admin:core_person_changelist'), logged_in=True),
+            'admin_authororder_changelist': Page(reverse('admin:core_authororder_changelist'), logged_in=True),
+            'admin_dissertation_changelist': Page(reverse('admin:core_dissertation_changelist'), logged_in=True),
+        }
+        if dissertation is not None:
+            pages['dissertation_detail'] = Page(reverse('core:dissertation_detail', args=[dissertation.pk]))
+        self.corpus = {
+            'publications': publication_count,
+            'people': Person.objects.count(),
+            'author_orders': AuthorOrder.objects.count(),
+            'dissertations': Dissertation.objects.count(),
+        }
+        return pages
+
+    def run(self, client, page, requests, warmup):
+        """Request a page repeatedly and return its latency percentiles and query counts."""
+        headers = {}
+        if page.conditional:
+            headers['HTTP_IF_NONE_MATCH'] = client.get(page.url).get('ETag', '')
+        for _ in range(warmup):
+            client.get(page.url, **headers)
+
+        timings = []
+        queries = []
+        status = None
+        size = 0
+        for _ in range(requests):
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                start = time.perf_counter()
+                response = client.get(page.url, **headers)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+            status = response.status_code
+            size = len(response.content)
+
+        result = {
+            'url': page.url,
+            'logged_in': page.logged_in,
+            'conditional': page.conditional,
+            'status': status,
+            'requests': requests,
+            'response_bytes': size,
+            'queries': max(queries),
+            'min_queries': min(queries),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'min_ms': round(min(timings), 2),
+            'max_ms': round(max(timings), 2),
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = round(percentile(timings, percent), 2)
+        return result
+
+    def format_result(self, name, result):
+        line = (
+            f"{name}: p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+            f"{result['queries']} queries, HTTP {result['status']}"
+        )
+        if result['status'] != (304 if result.get('conditional') else 200):
+            return self.style.WARNING(line)
+        return line
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = ''
+        return {
+            'created': timezone.now().isoformat(),
+            'commit': commit,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'corpus': self.corpus,
+        }
+
+    def read_report(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as report:
+                return json.load(report)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Error reading report {path}: {str(e)}")
+
+    def compare(self, baseline, report, max_regression):
+        """Print the change of every page against baseline and return the names of those that regressed."""
+        meta = baseline.get('meta', {})
+        self.stdout.write(self.style.NOTICE(
+            f"Compared with {meta.get('commit') or 'report'} from {meta.get('created', '?')}:"
+        ))
+        if meta.get('corpus') != report['meta']['corpus']:
+            self.stdout.write(self.style.WARNING("  The corpus differs from the compared report"))
+
+        regressions = []
+        for name, result in report['pages'].items():
+            before = baseline.get('pages', {}).get(name)
+            if before is None:
+                self.stdout.write(f"  {name}: new")
+                continue
+            changes = []
+            regressed = result['queries'] > before['queries']
+            for key in ('p50_ms', 'p95_ms'):
+                change = (result[key] - before[key]) * 100 / before[key] if before[key] else 0.0
+                changes.append(f"{key[:3]} {before[key]:.1f} -> {result[key]:.1f} ms ({change:+.0f}%)")
+                regressed = regressed or change > max_regression
+            changes.append(f"queries {before['queries']} -> {result['queries']}")
+            line = f"  {name}: {', '.join(changes)}"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
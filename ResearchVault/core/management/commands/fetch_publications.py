@@ -1,13 +1,37 @@
-import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import Publication, Person
+from core.crossref import publication_from_crossref
+from core.http_client import HttpClient
+from core.importing import PersonResolver, existing_titles, save_publication_batch, title_key
+from core.models import Publication, normalize_doi
+from core.pubmed import iter_pubmed_articles
 from django.db import transaction
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+ORCID_HEADERS = {
+    'Accept': 'application/json'
+}
+
+# ORCID's bulk work endpoint accepts at most 100 put-codes per request
+ORCID_BULK_SIZE = 100
+
+DEFAULT_CONCURRENCY = 8
+
+PUBMED_ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+PUBMED_EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+
+CROSSREF_WORKS_URL = "https://api.crossref.org/works"
+
+# Largest page size Crossref accepts
+CROSSREF_MAX_ROWS = 1000
+
+DEFAULT_BATCH_SIZE = 500
+
 class Command(BaseCommand):
     help = 'Fetches publications from various sources and adds them to the database'
 
@@ -33,12 +57,43 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be imported without actually importing',
         )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Do not read or write the HTTP response cache',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Revalidate cached HTTP responses even if they are still fresh',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help=f'Number of concurrent requests for ORCID work details (default: {DEFAULT_CONCURRENCY})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of records fetched and written per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--from-pub-date',
+            type=str,
+            help='Only fetch Crossref works published on or after this date (YYYY, YYYY-MM or YYYY-MM-DD)',
+        )
 
     def handle(self, *args, **options):
         source = options['source'].lower()
         author = options['author']
         orcid = options['orcid']
         dry_run = options['dry_run']
+        concurrency = options['concurrency']
+        batch_size = max(1, options['batch_size'])
+        self.http = HttpClient(use_cache=not options['no_cache'], refresh=options['refresh'])
+        self.people = PersonResolver()
 
         self.stdout.write(self.style.NOTICE(f"Fetching publications from {source}..."))
         
@@ -47,19 +102,19 @@ class Command(BaseCommand):
         
         if source == 'all' or source == 'orcid':
             if orcid:
-                self.fetch_from_orcid(orcid, dry_run)
+                self.fetch_from_orcid(orcid, dry_run, concurrency, batch_size)
             else:
                 self.stdout.write(self.style.WARNING("ORCID ID required for ORCID source"))
         
         if source == 'all' or source == 'pubmed':
             if author:
-                self.fetch_from_pubmed(author, dry_run)
+                self.fetch_from_pubmed(author, dry_run, batch_size)
             else:
                 self.stdout.write(self.style.WARNING("Author name required for PubMed source"))
                 
         if source == 'all' or source == 'crossref':
             if author:
-                self.fetch_from_crossref(author, dry_run)
+                self.fetch_from_crossref(author, dry_run, batch_size, options['from_pub_date'])
             else:
                 self.stdout.write(self.style.WARNING("Author name required for Crossref source"))
         
@@ -69,20 +124,22 @@ class Command(BaseCommand):
             
         self.stdout.write(self.style.SUCCESS("Fetching complete!"))
     
-    def fetch_from_orcid(self, orcid_id, dry_run=False):
+    def fetch_from_orcid(self, orcid_id, dry_run=False, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE):
         """
         Fetch publications from ORCID
+        
+        Work summaries are read first, then the contributor details of all new
+        works are downloaded concurrently, and only then is the database
+        written in batches, so no transaction is held open across network
+        requests.
         """
         self.stdout.write("Fetching from ORCID...")
         
         try:
             # ORCID API base URL
             url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
-            headers = {
-                'Accept': 'application/json'
-            }
             
-            response = requests.get(url, headers=headers)
+            response = self.http.get(url, headers=ORCID_HEADERS)
             response.raise_for_status()
             
             data = response.json()
@@ -109,433 +166,556 @@ class Command(BaseCommand):
                 if 'work-summary' in works[0]:
                     self.stdout.write(str(works[0]['work-summary'][0].keys() if works[0]['work-summary'] else "Empty summary"))
             
+            summaries = []
             for work in works:
                 try:
-                    # Safely extract work_summary
-                    if not work or not isinstance(work, dict):
-                        self.stdout.write(self.style.WARNING("  Skipping invalid work entry (not a dict)"))
-                        continue
-                        
-                    work_summaries = work.get('work-summary')
-                    if not work_summaries or not isinstance(work_summaries, list) or len(work_summaries) == 0:
-                        self.stdout.write(self.style.WARNING("  Skipping work with no work-summary list"))
+                    summary = self.parse_orcid_summary(work)
+                    if summary:
+                        summaries.append(summary)
+                except Exception as e:
+                    import traceback
+                    self.stdout.write(self.style.ERROR(f"  Error processing work: {str(e)}"))
+                    self.stdout.write(self.style.ERROR(traceback.format_exc()))
+            
+            summaries = self.skip_existing_orcid_works(summaries)
+            
+            # Fetch contributor details for all new works before touching the database
+            put_codes = [summary['put_code'] for summary in summaries if summary['put_code']]
+            details = self.fetch_orcid_work_details(orcid_id, put_codes, concurrency)
+            
+            # The ORCID owner is the corresponding author unless a contributor
+            # is marked as such, and the only author of works without contributors
+            owner = {'first_name': 'Unknown', 'last_name': 'Author', 'orcid': orcid_id}
+            
+            records = []
+            for summary in summaries:
+                try:
+                    records.append(self.build_orcid_publication(summary, details.get(summary['put_code'])))
+                except Exception as e:
+                    import traceback
+                    self.stdout.write(self.style.ERROR(f"  Error processing work: {str(e)}"))
+                    self.stdout.write(self.style.ERROR(traceback.format_exc()))
+            
+            for start in range(0, len(records), batch_size):
+                batch = records[start:start + batch_size]
+                try:
+                    with transaction.atomic():
+                        owner_person = self.people.resolve([owner])[0]
+                        for pub, authors in batch:
+                            pub.corresponding_author = owner_person
+                        saved = save_publication_batch(
+                            [(pub, [owner] if authors is None else authors) for pub, authors in batch],
+                            self.people,
+                        )
+                except Exception as e:
+                    self.people.reset()
+                    self.stdout.write(self.style.ERROR(f"  Error saving ORCID works: {str(e)}"))
+                    continue
+                for pub in saved:
+                    self.stdout.write(self.style.SUCCESS(f"  Added publication: {pub.title}"))
+                if len(saved) < len(batch):
+                    self.stdout.write(f"  Skipped {len(batch) - len(saved)} works whose DOI is already in the database")
+        
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error fetching from ORCID: {str(e)}"))
+    
+    def parse_orcid_summary(self, work):
+        """
+        Extract the fields we import from an ORCID work group.
+        
+        Returns:
+            dict: The parsed work summary, or None if the work should be skipped
+        """
+        # Safely extract work_summary
+        if not work or not isinstance(work, dict):
+            self.stdout.write(self.style.WARNING("  Skipping invalid work entry (not a dict)"))
+            return None
+            
+        work_summaries = work.get('work-summary')
+        if not work_summaries or not isinstance(work_summaries, list) or len(work_summaries) == 0:
+            self.stdout.write(self.style.WARNING("  Skipping work with no work-summary list"))
+            return None
+            
+        work_summary = work_summaries[0]
+        if not work_summary or not isinstance(work_summary, dict):
+            self.stdout.write(self.style.WARNING("  Skipping work with invalid work_summary"))
+            return None
+        
+        # Extract publication info
+        title_container = work_summary.get('title')
+        if not title_container or not isinstance(title_container, dict):
+            self.stdout.write(self.style.WARNING("  Skipping work with missing title container"))
+            return None
+            
+        title_obj = title_container.get('title')
+        if not title_obj or not isinstance(title_obj, dict):
+            self.stdout.write(self.style.WARNING("  Skipping work with missing title object"))
+            return None
+            
+        title = title_obj.get('value')
+        if not title:
+            self.stdout.write(self.style.WARNING("  Skipping work with no title value"))
+            return None
+        
+        # Try to get journal title if available
+        journal = ''
+        journal_title = work_summary.get('journal-title')
+        if journal_title and isinstance(journal_title, dict) and 'value' in journal_title:
+            journal = journal_title.get('value', '')
+        
+        # Extract DOI if available
+        doi = None
+        external_ids_container = work_summary.get('external-ids')
+        if external_ids_container and isinstance(external_ids_container, dict):
+            external_ids = external_ids_container.get('external-id', [])
+            if external_ids and isinstance(external_ids, list):
+                for ext_id in external_ids:
+                    if ext_id and isinstance(ext_id, dict) and ext_id.get('external-id-type') == 'doi':
+                        doi = ext_id.get('external-id-value')
+                        break
+        
+        return {
+            'title': title,
+            'journal': journal,
+            'doi': doi,
+            'summary': work_summary,
+            'put_code': work_summary.get('put-code'),
+        }
+    
+    def skip_existing_orcid_works(self, summaries):
+        """
+        Drop works already in the database, checking all DOIs and titles in two queries.
+        
+        The database rejects duplicate DOIs on insert anyway; this check only
+        saves fetching contributor details for works we already have.
+        """
+        dois = {normalize_doi(summary['doi']) for summary in summaries if summary['doi']}
+        titles = {summary['title'] for summary in summaries if not summary['doi']}
+        existing_dois = set(
+            Publication.objects.filter(doi_normalized__in=dois).values_list('doi_normalized', flat=True)
+        )
+        seen_titles = existing_titles(titles)
+        
+        new_summaries = []
+        for summary in summaries:
+            doi = normalize_doi(summary['doi'])
+            if doi:
+                if doi in existing_dois:
+                    self.stdout.write(f"  Skipping existing publication with DOI: {summary['doi']}")
+                    continue
+                existing_dois.add(doi)
+            else:
+                if title_key(summary['title']) in seen_titles:
+                    self.stdout.write(f"  Skipping existing publication with title: {summary['title']}")
+                    continue
+                seen_titles.add(title_key(summary['title']))
+            new_summaries.append(summary)
+        return new_summaries
+    
+    def fetch_orcid_work_details(self, orcid_id, put_codes, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Fetch full work records for the given put-codes.
+        
+        Uses ORCID's bulk endpoint (/works/{put-code,put-code,...}) with up to
+        ORCID_BULK_SIZE put-codes per request, running the requests on a
+        bounded thread pool.
+        
+        Returns:
+            dict: Work detail keyed by put-code; works that failed are missing
+        """
+        batches = [
+            put_codes[start:start + ORCID_BULK_SIZE]
+            for start in range(0, len(put_codes), ORCID_BULK_SIZE)
+        ]
+        if not batches:
+            return {}
+        
+        self.stdout.write(
+            f"  Fetching contributors for {len(put_codes)} works in {len(batches)} requests "
+            f"(concurrency {concurrency})"
+        )
+        
+        def fetch_batch(batch):
+            codes = ','.join(str(code) for code in batch)
+            detail_url = f"https://pub.orcid.org/v3.0/{orcid_id}/works/{codes}"
+            detail_response = self.http.get(detail_url, headers=ORCID_HEADERS)
+            detail_response.raise_for_status()
+            return detail_response.json().get('bulk', [])
+        
+        details = {}
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {executor.submit(fetch_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    for entry in future.result():
+                        work_detail = entry.get('work')
+                        if work_detail and 'put-code' in work_detail:
+                            details[work_detail['put-code']] = work_detail
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(
+                        f"  Error fetching contributors for put-codes {futures[future]}: {str(e)}"
+                    ))
+        return details
+    
+    def build_orcid_publication(self, parsed, work_detail):
+        """
+        Build an unsaved publication and its author dicts from a parsed ORCID work.
+        
+        ORCID does not bound its values, so they are cut to the columns'
+        max_length; an overlong URL or contributor ORCID is dropped instead,
+        as a shortened one would point elsewhere.
+        
+        Returns:
+            tuple: (Publication, list of author dicts). The list is None if the
+            work has no contributors, in which case the ORCID owner becomes
+            its only author
+        """
+        title = parsed['title']
+        journal = parsed['journal']
+        doi = parsed['doi']
+        work_summary = parsed['summary']
+        
+        # Create publication
+        pub = Publication()
+        pub.title = title[:500]
+        
+        # Set journal if available
+        if journal:
+            pub.journal = journal[:255]
+            
+        # Set publication date if available
+        pub_date = work_summary.get('publication-date')
+        if pub_date and isinstance(pub_date, dict):
+            # Safe extraction of date components
+            year_val = None
+            month_val = '01'
+            day_val = '01'
+            
+            year_container = pub_date.get('year')
+            if year_container and isinstance(year_container, dict):
+                year_val = year_container.get('value')
+                
+            month_container = pub_date.get('month')
+            if month_container and isinstance(month_container, dict):
+                month_val = month_container.get('value', '01')
+                
+            day_container = pub_date.get('day')
+            if day_container and isinstance(day_container, dict):
+                day_val = day_container.get('value', '01')
+            
+            if year_val:
+                try:
+                    pub.publication_year = int(year_val)
+                    # Create a full date if we have year
+                    try:
+                        pub.publication_date = timezone.datetime(
+                            int(year_val), 
+                            int(month_val) if month_val and month_val.isdigit() else 1, 
+                            int(day_val) if day_val and day_val.isdigit() else 1
+                        ).date()
+                    except (ValueError, TypeError) as e:
+                        self.stdout.write(self.style.WARNING(f"  Invalid date format: {str(e)}"))
+                        pub.publication_date = None
+                except (ValueError, TypeError) as e:
+                    self.stdout.write(self.style.WARNING(f"  Invalid year format: {year_val} - {str(e)}"))
+        
+        # Set type if available
+        work_type = work_summary.get('type')
+        if work_type:
+            pub.notes = f"Type: {work_type}"
+                
+        # Set DOI if available
+        if doi:
+            pub.doi = doi[:100]
+            
+        # Set URL if available
+        url_obj = work_summary.get('url')
+        if url_obj and isinstance(url_obj, dict) and len(url_obj.get('value') or '') <= 200:
+            pub.url = url_obj.get('value') or ''
+        
+        # Add contributors from the prefetched work detail
+        authors = None
+        if parsed['put_code'] and work_detail is None:
+            self.stdout.write(self.style.WARNING(f"  No work detail fetched for put-code: {parsed['put_code']}"))
+        elif work_detail is not None:
+            # Process contributors if available
+            if 'contributors' in work_detail and 'contributor' in (work_detail.get('contributors') or {}):
+                contributors = work_detail['contributors'].get('contributor', [])
+                self.stdout.write(f"  Found {len(contributors)} contributors")
+                
+                authors = []
+                for i, contributor in enumerate(contributors):
+                    # Skip if no credit name
+                    if not contributor.get('credit-name') or not contributor['credit-name'].get('value'):
                         continue
                         
-                    work_summary = work_summaries[0]
-                    if not work_summary or not isinstance(work_summary, dict):
-                        self.stdout.write(self.style.WARNING("  Skipping work with invalid work_summary"))
-                        continue
+                    credit_name = contributor['credit-name'].get('value')
                     
-                    # Extract publication info
-                    title_container = work_summary.get('title')
-                    if not title_container or not isinstance(title_container, dict):
-                        self.stdout.write(self.style.WARNING("  Skipping work with missing title container"))
-                        continue
-                        
-                    title_obj = title_container.get('title')
-                    if not title_obj or not isinstance(title_obj, dict):
-                        self.stdout.write(self.style.WARNING("  Skipping work with missing title object"))
-                        continue
-                        
-                    title = title_obj.get('value')
-                    if not title:
-                        self.stdout.write(self.style.WARNING("  Skipping work with no title value"))
-                        continue
+                    # Extract first and last name
+                    name_parts = credit_name.split(' ')
+                    if len(name_parts) > 1:
+                        first_name = ' '.join(name_parts[:-1])
+                        last_name = name_parts[-1]
+                    else:
+                        first_name = ''
+                        last_name = credit_name
                     
-                    # Try to get journal title if available
-                    journal = ''
-                    journal_title = work_summary.get('journal-title')
-                    if journal_title and isinstance(journal_title, dict) and 'value' in journal_title:
-                        journal = journal_title.get('value', '')
+                    # Check for contributor ORCID
+                    contributor_orcid = ''
+                    if 'contributor-orcid' in contributor and contributor['contributor-orcid'] and 'path' in contributor['contributor-orcid']:
+                        contributor_orcid = contributor['contributor-orcid'].get('path') or ''
+                        if len(contributor_orcid) > 19:
+                            contributor_orcid = ''
                     
-                    # Extract DOI if available
-                    doi = None
-                    external_ids_container = work_summary.get('external-ids')
-                    if external_ids_container and isinstance(external_ids_container, dict):
-                        external_ids = external_ids_container.get('external-id', [])
-                        if external_ids and isinstance(external_ids, list):
-                            for ext_id in external_ids:
-                                if ext_id and isinstance(ext_id, dict) and ext_id.get('external-id-type') == 'doi':
-                                    doi = ext_id.get('external-id-value')
-                                    break
+                    # Determine contribution type
+                    contribution_type = 'normal'
                     
-                    # Check if publication already exists
-                    if doi:
-                        if Publication.objects.filter(doi=doi).exists():
-                            self.stdout.write(f"  Skipping existing publication with DOI: {doi}")
-                            continue
-                    elif Publication.objects.filter(title=title).exists():
-                        self.stdout.write(f"  Skipping existing publication with title: {title}")
-                        continue
+                    # Check if this is a corresponding author
+                    corresponding = bool(
+                        'contributor-attributes' in contributor and 
+                        contributor['contributor-attributes'] and 
+                        contributor['contributor-attributes'].get('contributor-role') == 'corresponding'
+                    )
+                    if corresponding:
+                        contribution_type = 'corresponding'
                     
-                    # Create publication
-                    with transaction.atomic():
-                        pub = Publication()
-                        pub.title = title
-                        
-                        # Set journal if available
-                        if journal:
-                            pub.journal = journal
-                            
-                        # Set publication date if available
-                        pub_date = work_summary.get('publication-date')
-                        if pub_date and isinstance(pub_date, dict):
-                            # Safe extraction of date components
-                            year_val = None
-                            month_val = '01'
-                            day_val = '01'
-                            
-                            year_container = pub_date.get('year')
-                            if year_container and isinstance(year_container, dict):
-                                year_val = year_container.get('value')
-                                
-                            month_container = pub_date.get('month')
-                            if month_container and isinstance(month_container, dict):
-                                month_val = month_container.get('value', '01')
-                                
-                            day_container = pub_date.get('day')
-                            if day_container and isinstance(day_container, dict):
-                                day_val = day_container.get('value', '01')
-                            
-                            if year_val:
-                                try:
-                                    pub.publication_year = int(year_val)
-                                    # Create a full date if we have year
-                                    try:
-                                        pub.publication_date = timezone.datetime(
-                                            int(year_val), 
-                                            int(month_val) if month_val and month_val.isdigit() else 1, 
-                                            int(day_val) if day_val and day_val.isdigit() else 1
-                                        ).date()
-                                    except (ValueError, TypeError) as e:
-                                        self.stdout.write(self.style.WARNING(f"  Invalid date format: {str(e)}"))
-                                        pub.publication_date = None
-                                except (ValueError, TypeError) as e:
-                                    self.stdout.write(self.style.WARNING(f"  Invalid year format: {year_val} - {str(e)}"))
-                        
-                        # Set type if available
-                        work_type = work_summary.get('type')
-                        if work_type:
-                            pub.notes = f"Type: {work_type}"
-                                
-                        # Set DOI if available
-                        if doi:
-                            pub.doi = doi
-                            
-                        # Set URL if available
-                        url_obj = work_summary.get('url')
-                        if url_obj and isinstance(url_obj, dict) and 'value' in url_obj:
-                            pub.url = url_obj.get('value')
-                        
-                        # Save the publication
-                        pub.save()
-                        
-                        # Create main author link - assume the ORCID ID belongs to a person
-                        try:
-                            person, created = Person.objects.get_or_create(
-                                orcid=orcid_id,
-                                defaults={'first_name': 'Unknown', 'last_name': 'Author'}
-                            )
-                            pub.authors.add(person)
-                            
-                            # If this is the corresponding author, set it
-                            pub.corresponding_author = person
-                            pub.save()
-                            
-                        except Exception as e:
-                            self.stdout.write(self.style.ERROR(f"  Error adding main author: {str(e)}"))
-                            
-                        # Fetch detailed work record to get contributors
-                        try:
-                            if 'put-code' in work_summary:
-                                put_code = work_summary.get('put-code')
-                                self.stdout.write(f"  Fetching contributors for put-code: {put_code}")
-                                
-                                detail_url = f"https://pub.orcid.org/v3.0/{orcid_id}/work/{put_code}"
-                                detail_response = requests.get(detail_url, headers=headers)
-                                detail_response.raise_for_status()
-                                
-                                work_detail = detail_response.json()
-                                
-                                # Process contributors if available
-                                if 'contributors' in work_detail and 'contributor' in work_detail.get('contributors', {}):
-                                    contributors = work_detail['contributors'].get('contributor', [])
-                                    self.stdout.write(f"  Found {len(contributors)} contributors")
-                                    
-                                    added_contributors = 0
-                                    # Clear existing author orders
-                                    pub.authororder_set.all().delete()
-                                    
-                                    for i, contributor in enumerate(contributors):
-                                        # Skip if no credit name
-                                        if not contributor.get('credit-name') or not contributor['credit-name'].get('value'):
-                                            continue
-                                            
-                                        credit_name = contributor['credit-name'].get('value')
-                                        
-                                        # Extract first and last name
-                                        name_parts = credit_name.split(' ')
-                                        if len(name_parts) > 1:
-                                            first_name = ' '.join(name_parts[:-1])
-                                            last_name = name_parts[-1]
-                                        else:
-                                            first_name = ''
-                                            last_name = credit_name
-                                        
-                                        # Check for contributor ORCID
-                                        contributor_orcid = None
-                                        if 'contributor-orcid' in contributor and contributor['contributor-orcid'] and 'path' in contributor['contributor-orcid']:
-                                            contributor_orcid = contributor['contributor-orcid'].get('path')
-                                        
-                                        # Create or get person record
-                                        try:
-                                            # If we have ORCID, use that as primary key
-                                            if contributor_orcid:
-                                                co_person, created = Person.objects.get_or_create(
-                                                    orcid=contributor_orcid,
-                                                    defaults={
-                                                        'first_name': first_name,
-                                                        'last_name': last_name
-                                                    }
-                                                )
-                                            else:
-                                                # Otherwise try to match by name
-                                                co_person, created = Person.objects.get_or_create(
-                                                    first_name=first_name,
-                                                    last_name=last_name
-                                                )
-                                                
-                                            # Add to publication authors with correct order
-                                            from core.models import AuthorOrder
-                                            
-                                            # Determine contribution type
-                                            contribution_type = 'normal'
-                                            
-                                            # Check if this is a corresponding author
-                                            if ('contributor-attributes' in contributor and 
-                                                contributor['contributor-attributes'] and 
-                                                contributor['contributor-attributes'].get('contributor-role') == 'corresponding'):
-                                                contribution_type = 'corresponding'
-                                                pub.corresponding_author = co_person
-                                                pub.save()
-                                            
-                                            # Set first and last author contribution types
-                                            # First author
-                                            if i == 0:
-                                                contribution_type = 'first'
-                                            # Last author
-                                            elif i == len(contributors) - 1:
-                                                contribution_type = 'last'
-                                            
-                                            # Create author order with contribution type
-                                            AuthorOrder.objects.create(
-                                                publication=pub,
-                                                person=co_person,
-                                                order=i,  # Order is the index in the contributors list
-                                                contribution_type=contribution_type
-                                            )
-                                            added_contributors += 1
-                                                    
-                                        except Exception as e:
-                                            self.stdout.write(self.style.ERROR(f"  Error adding contributor {credit_name}: {str(e)}"))
-                                    
-                                    self.stdout.write(f"  Added {added_contributors} co-authors")
-                                    pub.save()
-                                else:
-                                    self.stdout.write("  No contributors found in work detail")
-                                    
-                        except Exception as e:
-                            self.stdout.write(self.style.ERROR(f"  Error fetching contributors: {str(e)}"))
-                        
-                        self.stdout.write(self.style.SUCCESS(f"  Added publication: {title}"))
-                except Exception as e:
-                    import traceback
-                    self.stdout.write(self.style.ERROR(f"  Error processing work: {str(e)}"))
-                    self.stdout.write(self.style.ERROR(traceback.format_exc()))
+                    # Set first and last author contribution types
+                    # First author
+                    if i == 0:
+                        contribution_type = 'first'
+                    # Last author
+                    elif i == len(contributors) - 1:
+                        contribution_type = 'last'
+                    
+                    authors.append({
+                        'first_name': first_name[:100],
+                        'last_name': last_name[:100],
+                        'orcid': contributor_orcid,
+                        'contribution_type': contribution_type,
+                        'corresponding': corresponding,
+                    })
+            else:
+                self.stdout.write("  No contributors found in work detail")
         
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error fetching from ORCID: {str(e)}"))
+        return pub, authors
     
-    def fetch_from_pubmed(self, author_name, dry_run=False):
+    def fetch_from_pubmed(self, author_name, dry_run=False, batch_size=DEFAULT_BATCH_SIZE):
         """
         Fetch publications from PubMed
+        
+        The search is stored on the E-utilities history server (WebEnv and
+        query_key) and the results are downloaded with efetch in batches of
+        batch_size. Each batch is parsed as a stream and written before the
+        next one is requested, so memory use does not depend on the number
+        of hits.
         """
         self.stdout.write("Fetching from PubMed...")
         
         try:
             # PubMed E-utilities API
-            # First search for the author
-            search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+            # First search for the author, keeping the result set on the history server
             search_params = {
                 'db': 'pubmed',
                 'term': f"{author_name}[Author]",
                 'retmode': 'json',
-                'retmax': 100  # Limit to 100 results
+                'retmax': 0,
+                'usehistory': 'y',
             }
             
-            search_response = requests.get(search_url, params=search_params)
+            # History server sessions are per-run, so none of this goes through the cache
+            search_response = self.http.send(PUBMED_ESEARCH_URL, params=search_params)
             search_response.raise_for_status()
             
-            search_data = search_response.json()
-            pmids = search_data.get('esearchresult', {}).get('idlist', [])
+            search_result = search_response.json().get('esearchresult', {})
+            count = int(search_result.get('count', 0))
+            history = {
+                'WebEnv': search_result.get('webenv'),
+                'query_key': search_result.get('querykey'),
+            }
             
-            if not pmids:
+            if not count:
                 self.stdout.write("No PubMed articles found for this author")
                 return
                 
-            self.stdout.write(f"Found {len(pmids)} articles in PubMed")
+            self.stdout.write(f"Found {count} articles in PubMed")
             
             if dry_run:
-                self.stdout.write(f"  Would fetch details for {min(5, len(pmids))} articles")
+                for article in self.iter_pubmed_batch(history, 0, 5):
+                    self.stdout.write(f"  Would import: {article['title']}")
                 return
             
-            # Fetch details for each article
-            fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-            fetch_params = {
-                'db': 'pubmed',
-                'id': ','.join(pmids),
-                'retmode': 'xml'
-            }
-            
-            fetch_response = requests.get(fetch_url, params=fetch_params)
-            fetch_response.raise_for_status()
+            imported = 0
+            for retstart in range(0, count, batch_size):
+                try:
+                    articles = list(self.iter_pubmed_batch(history, retstart, batch_size))
+                    records = [self.build_pubmed_publication(article) for article in self.skip_existing_articles(articles)]
+                    imported += len(save_publication_batch(records, self.people))
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(
+                        f"Error processing PubMed batch at {retstart}: {str(e)}"
+                    ))
+                self.stdout.write(
+                    f"  Processed {min(retstart + batch_size, count)}/{count} articles, added {imported} publications"
+                )
             
-            # Parse XML response - this would typically use xml.etree.ElementTree
-            # For simplicity, we'll just count how many we'd process
-            xml_content = fetch_response.text
-            self.stdout.write(f"Retrieved XML data for {len(pmids)} articles")
-            self.stdout.write(f"PubMed integration requires XML parsing implementation")
-            self.stdout.write(f"For a full implementation, XML parsing code would be added here")
+            self.stdout.write(self.style.SUCCESS(f"  Added {imported} publications from PubMed"))
         
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error fetching from PubMed: {str(e)}"))
     
-    def fetch_from_crossref(self, author_name, dry_run=False):
+    def iter_pubmed_batch(self, history, retstart, retmax):
+        """Stream one efetch batch from the history server and yield parsed articles."""
+        fetch_params = {
+            'db': 'pubmed',
+            'retmode': 'xml',
+            'retstart': retstart,
+            'retmax': retmax,
+            **history,
+        }
+        
+        fetch_response = self.http.send(PUBMED_EFETCH_URL, params=fetch_params, stream=True)
+        try:
+            fetch_response.raise_for_status()
+            fetch_response.raw.decode_content = True
+            yield from iter_pubmed_articles(fetch_response.raw)
+        finally:
+            fetch_response.close()
+    
+    def skip_existing_articles(self, articles):
+        """Drop articles whose PMID is already in the database; DOIs are deduplicated on insert."""
+        pmids = [article['pmid'] for article in articles if article['pmid']]
+        existing_pmids = set(Publication.objects.filter(pmid__in=pmids).values_list('pmid', flat=True))
+        
+        new_articles = []
+        for article in articles:
+            if not article['title']:
+                continue
+            if article['pmid'] in existing_pmids:
+                self.stdout.write(f"  Skipping existing publication with PMID: {article['pmid']}")
+                continue
+            new_articles.append(article)
+        return new_articles
+    
+    def build_pubmed_publication(self, article):
+        """Build an unsaved Publication and its author list from a parsed PubMed article."""
+        pub = Publication()
+        pub.title = article['title'][:500]
+        pub.abstract = article['abstract']
+        pub.journal = article['journal'][:255]
+        pub.volume = article['volume'][:50]
+        pub.issue = article['issue'][:50]
+        pub.pages = article['pages'][:50]
+        pub.pmid = article['pmid']
+        pub.doi = article['doi'][:100]
+        pub.keywords = article['keywords']
+        pub.url = f"https://pubmed.ncbi.nlm.nih.gov/{article['pmid']}/"
+        
+        if article['year']:
+            pub.publication_year = article['year']
+            try:
+                pub.publication_date = timezone.datetime(
+                    article['year'], article['month'] or 1, article['day'] or 1
+                ).date()
+            except (ValueError, TypeError):
+                pub.publication_date = None
+        
+        authors = article['authors']
+        for i, author in enumerate(authors):
+            # Set first and last author contribution types
+            if i == 0:
+                author['contribution_type'] = 'first'
+            elif i == len(authors) - 1:
+                author['contribution_type'] = 'last'
+        
+        return pub, authors
+    
+    def fetch_from_crossref(self, author_name, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, from_pub_date=None):
         """
         Fetch publications from Crossref
+        
+        Pages through all matching works with Crossref's deep-paging cursor
+        and writes them in batches of batch_size as they arrive.
         """
         self.stdout.write("Fetching from Crossref...")
         
         try:
-            # Crossref API for querying works
-            url = "https://api.crossref.org/works"
-            params = {
-                'query.author': author_name,
-                'rows': 20,  # Limit to 20 results for demo
-                'sort': 'published',
-                'order': 'desc'
-            }
-            
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            items = data.get('message', {}).get('items', [])
-            
-            self.stdout.write(f"Found {len(items)} works in Crossref")
+            works = self.iter_crossref_works(author_name, min(batch_size, CROSSREF_MAX_ROWS), from_pub_date)
             
             if dry_run:
-                for item in items[:5]:  # Show first 5 in dry run
-                    title = item.get('title', ['No title'])[0]
+                for item in islice(works, 5):  # Show first 5 in dry run
+                    title = (item.get('title') or ['No title'])[0]
                     self.stdout.write(f"  Would import: {title}")
                 return
             
-            for item in items:
-                # Extract basic info
+            imported = 0
+            processed = 0
+            batch = list(islice(works, batch_size))
+            while batch:
+                processed += len(batch)
                 try:
-                    title = item.get('title', [''])[0]
-                    if not title:
-                        continue
-                        
-                    doi = item.get('DOI')
-                    
-                    # Check if publication already exists
-                    if doi and Publication.objects.filter(doi=doi).exists():
-                        self.stdout.write(f"  Skipping existing publication with DOI: {doi}")
-                        continue
-                    elif Publication.objects.filter(title=title).exists():
-                        self.stdout.write(f"  Skipping existing publication with title: {title}")
-                        continue
-                    
-                    # Create publication
-                    with transaction.atomic():
-                        pub = Publication()
-                        pub.title = title
-                        
-                        # Get publication date
-                        published_date = item.get('published-print', item.get('published-online'))
-                        if published_date:
-                            date_parts = published_date.get('date-parts', [[]])[0]
-                            if len(date_parts) >= 1:
-                                pub.publication_year = date_parts[0]
-                                
-                                # Create full date if we have all parts
-                                if len(date_parts) >= 3:
-                                    try:
-                                        pub.publication_date = timezone.datetime(
-                                            date_parts[0], date_parts[1], date_parts[2]
-                                        ).date()
-                                    except (ValueError, TypeError):
-                                        pub.publication_date = None
-                        
-                        # Set journal info
-                        container = item.get('container-title', [''])[0]
-                        if container:
-                            pub.journal = container
-                            
-                        # Set page info
-                        if 'page' in item:
-                            pub.pages = item['page']
-                            
-                        # Set volume/issue
-                        if 'volume' in item:
-                            pub.volume = item['volume']
-                        if 'issue' in item:
-                            pub.issue = item['issue']
-                            
-                        # Set DOI
-                        if doi:
-                            pub.doi = doi
-                            
-                        # Set abstract if available
-                        if 'abstract' in item:
-                            pub.abstract = item['abstract']
-                            
-                        # Set URL
-                        if 'URL' in item:
-                            pub.url = item['URL']
-                            
-                        # Save the publication
-                        pub.save()
-                        
-                        # Add authors
-                        authors_data = item.get('author', [])
-                        for author_data in authors_data:
-                            given = author_data.get('given', '')
-                            family = author_data.get('family', '')
-                            
-                            if not family:  # Skip if no family name
-                                continue
-                                
-                            # Try to match existing Person or create new one
-                            try:
-                                person, created = Person.objects.get_or_create(
-                                    first_name=given,
-                                    last_name=family,
-                                    defaults={
-                                        'affiliation': author_data.get('affiliation', [{}])[0].get('name', '')
-                                        if author_data.get('affiliation') else ''
-                                    }
-                                )
-                                pub.authors.add(person)
-                            except Exception as e:
-                                self.stdout.write(self.style.ERROR(f"Error adding author {given} {family}: {str(e)}"))
-                        
-                        pub.save()
-                        self.stdout.write(self.style.SUCCESS(f"  Added publication: {title}"))
-                        
+                    records = []
+                    for item in batch:
+                        record = publication_from_crossref(item)
+                        if record:
+                            records.append(record)
+                    records = self.skip_existing_records(records)
+                    imported += len(save_publication_batch(records, self.people))
                 except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error processing Crossref item: {str(e)}"))
+                    self.stdout.write(self.style.ERROR(f"Error processing Crossref batch: {str(e)}"))
+                self.stdout.write(f"  Processed {processed} works, added {imported} publications")
+                batch = list(islice(works, batch_size))
+            
+            self.stdout.write(self.style.SUCCESS(f"  Added {imported} publications from Crossref"))
         
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error fetching from Crossref: {str(e)}"))
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f"Error fetching from Crossref: {str(e)}"))
+    
+    def iter_crossref_works(self, author_name, rows=CROSSREF_MAX_ROWS, from_pub_date=None):
+        """
+        Yield every Crossref work matching the author, one page at a time
+        
+        Uses cursor-based deep paging (cursor=*, then next-cursor). Cursors
+        expire after a few minutes, so these requests bypass the HTTP cache.
+        """
+        # Crossref API for querying works
+        params = {
+            'query.author': author_name,
+            'rows': rows,
+            'sort': 'published',
+            'order': 'desc',
+            'cursor': '*',
+        }
+        if from_pub_date:
+            params['filter'] = f"from-pub-date:{from_pub_date}"
+        
+        while True:
+            response = self.http.send(CROSSREF_WORKS_URL, params=params)
+            response.raise_for_status()
+            
+            message = response.json().get('message', {})
+            items = message.get('items', [])
+            if params['cursor'] == '*':
+                self.stdout.write(f"Found {message.get('total-results', 0)} works in Crossref")
+            if not items:
+                return
+            
+            yield from items
+            
+            next_cursor = message.get('next-cursor')
+            if not next_cursor or len(items) < rows:
+                return
+            params['cursor'] = next_cursor
+    
+    def skip_existing_records(self, records):
+        """Drop records whose title is already in the database; DOIs are deduplicated on insert."""
+        seen_titles = existing_titles([pub.title for pub, _ in records])
+        
+        new_records = []
+        for pub, authors in records:
+            # Check if publication already exists
+            if title_key(pub.title) in seen_titles:
+                self.stdout.write(f"  Skipping existing publication with title: {pub.title}")
+                continue
+            seen_titles.add(title_key(pub.title))
+            new_records.append((pub, authors))
+        return new_records
@@ -0,0 +1,280 @@
+import csv
+import re
+import time
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core.importing import normalize_name
+from core.models import AuthorOrder, Person
+
+DEFAULT_MIN_SCORE = 0.5
+DEFAULT_MAX_BLOCK_SIZE = 500
+
+# Publications with more authors than this say little about who someone is
+# and would make the co-author sets huge, so they are left out of them
+MAX_COAUTHORS_PER_PUBLICATION = 100
+
+# Weights of the name, co-author and affiliation similarity in the score
+NAME_WEIGHT = 0.7
+COAUTHOR_WEIGHT = 0.2
+AFFILIATION_WEIGHT = 0.1
+
+AFFILIATION_STOPWORDS = {'of', 'the', 'and', 'for', 'de', 'der', 'und', 'la', 'le', 'des', 'university', 'department'}
+
+REPORT_FIELDS = [
+    'primary_id', 'duplicate_id', 'score', 'primary_name', 'duplicate_name',
+    'name_score', 'coauthor_score', 'affiliation_score', 'reason', 'admin_url',
+]
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def first_name_similarity(a, b):
+    """
+    Return how well two normalized first names can belong to the same person.
+
+    Initials match any name with the same initials ("j" ~ "john",
+    "j m" ~ "john michael"); full names are compared character-wise.
+    """
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.5
+    tokens_a, tokens_b = a.split(), b.split()
+    if all(len(token) == 1 for token in tokens_a) or all(len(token) == 1 for token in tokens_b):
+        pairs = list(zip(tokens_a, tokens_b))
+        if pairs and all(x[0] == y[0] for x, y in pairs):
+            return 0.8
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class Command(BaseCommand):
+    help = (
+        'Find people that are probably the same person and write a ranked merge '
+        'report (CSV) for the merge_people command or the admin merge action'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='-',
+            help='Path of the CSV report (default: standard output)',
+        )
+        parser.add_argument(
+            '--min-score',
+            type=float,
+            default=DEFAULT_MIN_SCORE,
+            help=f'Only report pairs scoring at least this much, from 0 to 1 (default: {DEFAULT_MIN_SCORE})',
+        )
+        parser.add_argument(
+            '--max-block-size',
+            type=int,
+            default=DEFAULT_MAX_BLOCK_SIZE,
+            help=(
+                'Blocks with more people than this are split further by the first '
+                f'letters of the first name (default: {DEFAULT_MAX_BLOCK_SIZE})'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.max_block_size = max(2, options['max_block_size'])
+        self.load()
+        self.log(f"Loaded {len(self.people)} people in {time.monotonic() - started:.1f}s")
+
+        pairs = self.candidate_pairs()
+        self.log(f"Comparing {len(pairs)} candidate pairs...")
+
+        rows = []
+        for a, b in pairs:
+            row = self.score(a, b)
+            if row and row['score'] >= options['min_score']:
+                rows.append(row)
+        rows.sort(key=lambda row: (-row['score'], row['primary_id'], row['duplicate_id']))
+
+        self.write_report(rows, options['output'])
+        self.log(self.style.SUCCESS(
+            f"Found {len(rows)} likely duplicates in {time.monotonic() - started:.1f}s"
+        ))
+
+    def log(self, message):
+        # Progress goes to stderr so the report can be written to stdout
+        self.stderr.write(message)
+
+    def load(self):
+        """Read people, their publications and co-authors into memory."""
+        self.people = {}
+        for pk, first_name, last_name, orcid, affiliation in Person.objects.values_list(
+            'pk', 'first_name', 'last_name', 'orcid', 'affiliation'
+        ).iterator(chunk_size=5000):
+            first, last = normalize_name(first_name, last_name)
+            self.people[pk] = {
+                'name': f"{first_name} {last_name}",
+                'first': first,
+                'last': last,
+                'orcid': orcid.strip(),
+                'affiliation': {
+                    word for word in re.findall(r'\w+', normalize_name('', affiliation)[1])
+                    if word not in AFFILIATION_STOPWORDS
+                },
+            }
+
+        self.publications = defaultdict(set)
+        authors = defaultdict(list)
+        for publication_id, person_id in AuthorOrder.objects.values_list(
+            'publication_id', 'person_id'
+        ).iterator(chunk_size=5000):
+            self.publications[person_id].add(publication_id)
+            authors[publication_id].append(person_id)
+        self.authors = {
+            publication_id: person_ids for publication_id, person_ids in authors.items()
+            if len(person_ids) <= MAX_COAUTHORS_PER_PUBLICATION
+        }
+        self._coauthors = {}
+
+    def coauthors(self, pk):
+        if pk not in self._coauthors:
+            found = set()
+            for publication_id in self.publications.get(pk, ()):
+                found.update(self.authors.get(publication_id, ()))
+            found.discard(pk)
+            self._coauthors[pk] = found
+        return self._coauthors[pk]
+
+    def blocks(self):
+        """
+        Yield (people, swapped people) that share a blocking key.
+
+        Keys are the ORCID, and the normalized last name with the first
+        initial. Every person is also filed under their first name with the
+        last initial, as "swapped", so that "Smith John" meets "John Smith";
+        two swapped people in a block only share a first name and are not
+        compared.
+        """
+        keys = defaultdict(lambda: ([], []))
+        for pk, person in self.people.items():
+            if person['orcid']:
+                keys[('orcid', person['orcid'])][0].append(pk)
+            if person['last']:
+                keys[('name', person['last'], person['first'][:1])][0].append(pk)
+            if person['first']:
+                keys[('name', person['first'], person['last'][:1])][1].append(pk)
+
+        for key, (members, swapped) in keys.items():
+            if not members or len(members) + len(swapped) < 2:
+                continue
+            if key[0] == 'orcid' or len(members) + len(swapped) <= self.max_block_size:
+                yield members, swapped
+                continue
+            # Split oversized blocks ("Wang, J") by more of the first name
+            yield from self.split_block(members, swapped, key[1], 2)
+
+    def split_block(self, members, swapped, name, length):
+        sub_blocks = defaultdict(lambda: ([], []))
+        # Initials ("j", "j m") can be anyone in the block, so they join every sub-block
+        initials = []
+        for pk in members:
+            first = self.people[pk]['first']
+            if not first or len(first.split()[0]) < length:
+                initials.append(pk)
+            else:
+                sub_blocks[first[:length]][0].append(pk)
+        for pk in swapped:
+            sub_blocks[self.people[pk]['last'][:length]][1].append(pk)
+        if not sub_blocks:
+            sub_blocks[''] = ([], [])
+        for sub_members, _ in sub_blocks.values():
+            sub_members.extend(initials)
+        for prefix, (sub_members, sub_swapped) in sub_blocks.items():
+            size = len(sub_members) + len(sub_swapped)
+            if not sub_members or size < 2:
+                continue
+            if size <= self.max_block_size:
+                yield sub_members, sub_swapped
+            elif len(prefix) == length and length < 8:
+                yield from self.split_block(sub_members, sub_swapped, name, length + 1)
+            else:
+                self.log(self.style.WARNING(
+                    f"Skipping {size} people named like '{prefix} {name}': block too large"
+                ))
+
+    def candidate_pairs(self):
+        pairs = set()
+        for members, swapped in self.blocks():
+            for a, b in combinations(members, 2):
+                pairs.add((min(a, b), max(a, b)))
+            for a in members:
+                for b in swapped:
+                    if a != b:
+                        pairs.add((min(a, b), max(a, b)))
+        return sorted(pairs)
+
+    def score(self, a, b):
+        """Return a report row for two people, or None if they cannot be the same person."""
+        person_a, person_b = self.people[a], self.people[b]
+
+        # Authors of the same publication are different people
+        if self.publications.get(a, set()) & self.publications.get(b, set()):
+            return None
+
+        if person_a['orcid'] and person_b['orcid']:
+            if person_a['orcid'] != person_b['orcid']:
+                return None
+            name_score, reason = 1.0, 'same ORCID'
+        else:
+            if person_a['last'] == person_b['last']:
+                name_score = first_name_similarity(person_a['first'], person_b['first'])
+            elif person_a['last'] == person_b['first'] and person_a['first'] == person_b['last']:
+                # First and last name swapped
+                name_score = 0.9
+            else:
+                return None
+            reason = 'name'
+
+        coauthor_score = jaccard(self.coauthors(a), self.coauthors(b))
+        affiliation_score = jaccard(person_a['affiliation'], person_b['affiliation'])
+        if reason == 'same ORCID':
+            score = 1.0
+        else:
+            score = NAME_WEIGHT * name_score + COAUTHOR_WEIGHT * coauthor_score + AFFILIATION_WEIGHT * affiliation_score
+
+        # Keep the better documented record: more publications, then an ORCID, then the older one
+        primary, duplicate = sorted(
+            (a, b),
+            key=lambda pk: (-len(self.publications.get(pk, ())), not self.people[pk]['orcid'], pk),
+        )
+        return {
+            'primary_id': primary,
+            'duplicate_id': duplicate,
+            'score': round(score, 3),
+            'primary_name': self.people[primary]['name'],
+            'duplicate_name': self.people[duplicate]['name'],
+            'name_score': round(name_score, 3),
+            'coauthor_score': round(coauthor_score, 3),
+            'affiliation_score': round(affiliation_score, 3),
+            'reason': reason,
+            'admin_url': f"{reverse('admin:core_person_changelist')}?id__in={primary},{duplicate}",
+        }
+
+    def write_report(self, rows, path):
+        if path == '-':
+            self.write_rows(rows, self.stdout)
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as report:
+            self.write_rows(rows, report)
+        self.log(f"Report written to {path}")
+
+    def write_rows(self, rows, output):
+        writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,256 @@
+import datetime
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import caching, search
+from core.models import AuthorOrder, Degree, Dissertation, Person, Publication, author_cache_values, normalize_doi
+
+DEFAULT_PUBLICATIONS = 10000
+DEFAULT_MAX_AUTHORS = 1000
+DEFAULT_CHUNK_SIZE = 2000
+
+# Rows per INSERT
+INSERT_BATCH_SIZE = 2000
+
+# Share of publications with a DOI, PMID and arXiv ID
+DOI_SHARE = 0.8
+PMID_SHARE = 0.5
+ARXIV_SHARE = 0.2
+
+# Share of publications from large collaborations, whose author counts
+# follow a power law up to --max-authors; the rest have a handful of authors
+LONG_TAIL_SHARE = 0.03
+
+# DOIs of generated publications use this prefix, which is reserved for examples
+DOI_PREFIX = '10.5555/corpus'
+
+FIRST_NAMES = (
+    'Anna Ben Carla David Emma Felix Greta Hugo Ines Jan Julia Kai Lena Marco Nina Omar '
+    'Paula Quentin Rosa Sven Tara Umar Vera Wei Xin Yara Zoe Li Ming Priya Rahul Sofia Lucas'
+).split()
+LAST_NAMES = (
+    'Smith Jansen Wang Li Zhang Garcia Müller Kim Nguyen Rossi Dubois Silva Kowalski Novak '
+    'Peeters Tanaka Singh Cohen Larsen Ivanova Brown Martin Lopez Schmidt Chen Haddad Okafor'
+).split()
+WORDS = (
+    'analysis protein network model learning quantum cell dynamics structure genome climate '
+    'neural data imaging signal theory system method clinical review synthesis optimal robust '
+    'deep graph spectral thermal energy receptor tumor catalyst lattice sequencing inference '
+    'microbial cohort trial memory language vision battery polymer carbon ocean soil neuron'
+).split()
+JOURNALS = (
+    'Nature', 'Science', 'Cell', 'Physical Review Letters', 'PLOS ONE', 'The Lancet',
+    'Journal of Machine Learning Research', 'Bioinformatics', 'Neuron', 'Chemical Reviews',
+)
+INSTITUTIONS = ('Ghent University', 'KU Leuven', 'Utrecht University', 'ETH Zurich', 'University of Oslo')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a synthetic corpus of people, publications with a '
+        'long-tailed author count distribution and dissertations with copromoters, '
+        'for benchmarking'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--publications',
+            type=int,
+            default=DEFAULT_PUBLICATIONS,
+            help=f'Number of publications to generate (default: {DEFAULT_PUBLICATIONS})',
+        )
+        parser.add_argument(
+            '--people',
+            type=int,
+            help='Number of people to generate (default: a third of the publications)',
+        )
+        parser.add_argument(
+            '--dissertations',
+            type=int,
+            help='Number of dissertations to generate (default: a twentieth of the publications)',
+        )
+        parser.add_argument(
+            '--max-authors',
+            type=int,
+            default=DEFAULT_MAX_AUTHORS,
+            help=f'Largest number of authors on one publication (default: {DEFAULT_MAX_AUTHORS})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Publications written per transaction (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed, so that a corpus can be generated again (default: 0)',
+        )
+        parser.add_argument(
+            '--skip-search-index',
+            action='store_true',
+            help='Do not index the generated records for search (run rebuild_search_index later)',
+        )
+
+    def handle(self, *args, **options):
+        publications = max(0, options['publications'])
+        people = options['people'] if options['people'] is not None else max(10, publications // 3)
+        dissertations = (
+            options['dissertations'] if options['dissertations'] is not None else publications // 20
+        )
+        self.max_authors = max(1, options['max_authors'])
+        self.chunk_size = max(1, options['chunk_size'])
+        self.index = not options['skip_search_index']
+        self.rng = random.Random(options['seed'])
+        # Numbers generated records so that a second run does not repeat DOIs
+        self.offset = (Publication.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+
+        start = time.perf_counter()
+        self.names = self.generate_people(max(2, people))
+        self.person_ids = list(self.names)
+        self.generate_publications(publications)
+        self.generate_dissertations(max(0, dissertations))
+        # Bulk inserts send no signals, so the cached pages are invalidated here
+        caching.bump_content_version()
+        self.stdout.write(self.style.SUCCESS(f"Corpus generated in {time.perf_counter() - start:.1f}s"))
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"  {label}: {done}/{total}")
+
+    def generate_people(self, count):
+        """Insert count people and return {pk: name}."""
+        self.stdout.write(f"Generating {count} people...")
+        names = {}
+        for start in range(0, count, self.chunk_size):
+            batch = []
+            for i in range(start, min(count, start + self.chunk_size)):
+                first_name = self.rng.choice(FIRST_NAMES)
+                batch.append(Person(
+                    first_name=first_name if self.rng.random() > 0.2 else first_name[0] + '.',
+                    last_name=f"{self.rng.choice(LAST_NAMES)}{self.offset + i}",
+                    orcid=f"0000-0003-{(self.offset + i) // 10000 % 10000:04d}-{(self.offset + i) % 10000:04d}"
+                    if self.rng.random() < 0.4 else '',
+                    affiliation=self.rng.choice(INSTITUTIONS),
+                ))
+            with transaction.atomic():
+                for person in Person.objects.bulk_create(batch, batch_size=INSERT_BATCH_SIZE):
+                    names[person.pk] = str(person)
+            self.progress('people', len(names), count)
+        return names
+
+    def author_count(self):
+        """Return a number of authors: mostly 1-10, with a power-law tail of collaborations."""
+        if self.rng.random() < LONG_TAIL_SHARE:
+            count = int(10 * self.rng.paretovariate(1.2))
+        else:
+            count = int(math.exp(self.rng.gauss(1.4, 0.6)))
+        return max(1, min(self.max_authors, count, len(self.person_ids)))
+
+    def title(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def generate_publications(self, count):
+        self.stdout.write(f"Generating {count} publications...")
+        done = 0
+        for start in range(0, count, self.chunk_size):
+            size = min(self.chunk_size, count - start)
+            records = [self.publication(self.offset + start + i) for i in range(size)]
+            author_orders = []
+            for publication, author_ids in records:
+                orders = [
+                    AuthorOrder(
+                        publication=publication,
+                        person_id=person_id,
+                        order=order,
+                        contribution_type=self.contribution_type(order, len(author_ids)),
+                    )
+                    for order, person_id in enumerate(author_ids)
+                ]
+                # The authors are known up front, so the author cache is filled
+                # before the insert rather than recomputed from AuthorOrder
+                publication.authors_display, publication.author_flags = author_cache_values(
+                    (self.names[ao.person_id], ao.contribution_type) for ao in orders
+                )
+                author_orders.extend(orders)
+            with transaction.atomic():
+                Publication.objects.bulk_create([publication for publication, _ in records], batch_size=INSERT_BATCH_SIZE)
+                AuthorOrder.objects.bulk_create(author_orders, batch_size=INSERT_BATCH_SIZE)
+                if self.index:
+                    ids = [publication.pk for publication, _ in records]
+                    transaction.on_commit(lambda ids=ids: search.index_publications(ids))
+            done += size
+            self.progress('publications', done, count)
+
+    def publication(self, number):
+        year = self.rng.randint(1970, 2025)
+        month = self.rng.randint(1, 12)
+        author_ids = self.rng.sample(self.person_ids, self.author_count())
+        publication = Publication(
+            title=f"{self.title(self.rng.randint(4, 12))} {number}",
+            abstract=' '.join(self.title(12) + '.' for _ in range(self.rng.randint(3, 10))),
+            journal=self.rng.choice(JOURNALS),
+            volume=str(self.rng.randint(1, 120)),
+            issue=str(self.rng.randint(1, 12)),
+            pages=f"{self.rng.randint(1, 900)}-{self.rng.randint(901, 1800)}",
+            publication_date=datetime.date(year, month, self.rng.randint(1, 28)),
+            publication_year=year,
+            doi=f"{DOI_PREFIX}.{number}" if self.rng.random() < DOI_SHARE else '',
+            pmid=str(40000000 + number) if self.rng.random() < PMID_SHARE else '',
+            arxiv_id=f"corpus.{number:07d}" if self.rng.random() < ARXIV_SHARE else '',
+            keywords=', '.join(self.rng.sample(WORDS, 4)),
+            citation_count=int(self.rng.paretovariate(1.1)) - 1,
+            corresponding_author_id=self.rng.choice(author_ids),
+        )
+        publication.doi_normalized = normalize_doi(publication.doi) or None
+        return publication, author_ids
+
+    def contribution_type(self, order, count):
+        if order == 0:
+            return 'first'
+        if order == count - 1:
+            return 'last'
+        if order == 1 and self.rng.random() < 0.1:
+            return 'co-first'
+        return 'normal'
+
+    def generate_dissertations(self, count):
+        self.stdout.write(f"Generating {count} dissertations...")
+        done = 0
+        copromoters = Dissertation.copromoters.through
+        for start in range(0, count, self.chunk_size):
+            batch = []
+            for i in range(start, min(count, start + self.chunk_size)):
+                author_id, promoter_id, *others = self.rng.sample(self.person_ids, min(5, len(self.person_ids)))
+                defense_date = datetime.date(self.rng.randint(1980, 2025), self.rng.randint(1, 12), 1)
+                batch.append((Dissertation(
+                    title=f"{self.title(self.rng.randint(5, 12))} {self.offset + i}",
+                    author_id=author_id,
+                    promoter_id=promoter_id,
+                    supervisor_id=others[0] if others and self.rng.random() < 0.3 else None,
+                    degree=self.rng.choice(Degree.values),
+                    start_date=defense_date.replace(year=defense_date.year - 4),
+                    defense_date=defense_date,
+                    abstract=' '.join(self.title(12) + '.' for _ in range(self.rng.randint(3, 10))),
+                    institution=self.rng.choice(INSTITUTIONS),
+                    keywords=', '.join(self.rng.sample(WORDS, 4)),
+                ), others[:self.rng.randint(0, 3)]))
+            with transaction.atomic():
+                Dissertation.objects.bulk_create([dissertation for dissertation, _ in batch], batch_size=INSERT_BATCH_SIZE)
+                copromoters.objects.bulk_create(
+                    [
+                        copromoters(dissertation_id=dissertation.pk, person_id=person_id)
+                        for dissertation, person_ids in batch
+                        for person_id in person_ids
+                    ],
+                    batch_size=INSERT_BATCH_SIZE,
+                )
+                if self.index:
+                    ids = [dissertation.pk for dissertation, _ in batch]
+                    transaction.on_commit(lambda ids=ids: search.index_dissertations(ids))
+            done += len(batch)
+            self.progress('dissertations', done, count)
@@ -0,0 +1,244 @@
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.importing import PersonResolver, save_publication_batch
+from core.management.commands import fetch_publications
+from core.management.commands.benchmark_views import PERCENTILES, percentile
+from core.models import Dissertation, Person, Publication
+
+DEFAULT_DURATION = 10
+DEFAULT_READERS = 4
+
+# DOIs of the publications the simulated import writes, deleted afterwards
+DOI_PREFIX = '10.5555/loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the latency of page reads on the configured database profile, first '
+        'alone and then while a simulated import writes publications in batches like '
+        'fetch_publications. The imported publications are deleted afterwards, but run '
+        'this against a copy of the database. Compare profiles by running it once per '
+        'profile, e.g. with DATABASE_ENGINE=postgresql or SQLITE_TUNING=0.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=DEFAULT_DURATION,
+            help=f'Seconds per phase (default: {DEFAULT_DURATION})',
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=DEFAULT_READERS,
+            help=f'Threads requesting pages concurrently (default: {DEFAULT_READERS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=fetch_publications.DEFAULT_BATCH_SIZE,
+            help=f'Publications per import transaction (default: {fetch_publications.DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument('--output', type=str, help='Path of a JSON report to write')
+
+    def handle(self, *args, **options):
+        if not Publication.objects.exists():
+            raise CommandError("There are no publications to read; run generate_corpus first")
+
+        duration = max(1.0, options['duration'])
+        readers = max(1, options['readers'])
+        profile = self.profile()
+        self.stdout.write(self.style.NOTICE(
+            f"Profile: {', '.join(f'{name} {value}' for name, value in profile.items())}"
+        ))
+
+        urls = self.urls()
+        run = f"{DOI_PREFIX}.{time.time_ns()}"
+        last_person = Person.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        results = {}
+        # Without the page cache every request reads from the database
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            REQUEST_METRICS_ENABLED=False,
+            PAGE_CACHE_TIMEOUT=0,
+        ):
+            try:
+                for phase, batch_size in (('reads', None), ('reads during import', options['batch_size'])):
+                    results[phase] = self.run_phase(urls, duration, readers, batch_size, run)
+                    self.stdout.write(self.format_result(phase, results[phase]))
+            finally:
+                deleted = self.clean_up(run, last_person)
+                self.stdout.write(f"Deleted {deleted} imported publications")
+
+        idle, busy = results['reads'], results['reads during import']
+        if idle['p95_ms']:
+            self.stdout.write(self.style.SUCCESS(
+                f"p95 read latency during the import: {busy['p95_ms'] / idle['p95_ms']:.1f}x that without"
+            ))
+
+        if options['output']:
+            report = {'profile': profile, 'readers': readers, 'duration': duration, 'phases': results}
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def profile(self):
+        """Return the settings of the database connection that matter under load."""
+        profile = {
+            'database': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        }
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                for pragma in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size'):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    profile[pragma] = cursor.fetchone()[0]
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SHOW server_version")
+                profile['server_version'] = cursor.fetchone()[0]
+                profile['server_side_cursors'] = not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+        return profile
+
+    def urls(self):
+        """Return the pages to read: lists, a deep page and details, as visitors and crawlers do."""
+        publication = Publication.objects.order_by('pk').first()
+        dissertation = Dissertation.objects.order_by('pk').first()
+        year = Publication.objects.exclude(publication_year=None).values_list('publication_year', flat=True).first()
+        urls = [
+            reverse('core:home'),
+            reverse('core:publication_list'),
+            f"{reverse('core:publication_list')}?page=last",
+            f"{reverse('core:publication_list')}?year={year}",
+            reverse('core:publication_detail', args=[publication.pk]),
+            reverse('core:dissertation_list'),
+            reverse('core:api_publication_list'),
+        ]
+        if dissertation is not None:
+            urls.append(reverse('core:dissertation_detail', args=[dissertation.pk]))
+        return urls
+
+    def run_phase(self, urls, duration, readers, batch_size, run):
+        """Read urls from several threads for duration seconds, importing in batches if batch_size is set."""
+        stop = threading.Event()
+        reads = [{'timings': [], 'errors': 0} for _ in range(readers)]
+        threads = [
+            threading.Thread(target=self.read, args=(urls[i % len(urls):] + urls[:i % len(urls)], stop, reads[i]))
+            for i in range(readers)
+        ]
+        writes = {'timings': [], 'publications': 0, 'errors': 0}
+        if batch_size:
+            threads.append(threading.Thread(target=self.write, args=(batch_size, run, stop, writes)))
+
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        timings = [timing for read in reads for timing in read['timings']]
+        result = {
+            'requests': len(timings),
+            'errors': sum(read['errors'] for read in reads),
+            'requests_per_second': round(len(timings) / duration, 1),
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = round(percentile(timings, percent), 2) if timings else None
+        result['max_ms'] = round(max(timings), 2) if timings else None
+        if batch_size:
+            result['import'] = {
+                'batch_size': batch_size,
+                'batches': len(writes['timings']),
+                'publications': writes['publications'],
+                'publications_per_second': round(writes['publications'] / duration, 1),
+                'p50_commit_ms': round(percentile(writes['timings'], 50), 2) if writes['timings'] else None,
+                'max_commit_ms': round(max(writes['timings']), 2) if writes['timings'] else None,
+                'errors': writes['errors'],
+            }
+        return result
+
+    def read(self, urls, stop, stats):
+        client = Client()
+        try:
+            while not stop.is_set():
+                for url in urls:
+                    start = time.perf_counter()
+                    try:
+                        response = client.get(url)
+                        if response.status_code != 200:
+                            stats['errors'] += 1
+                    except DatabaseError:
+                        # e.g. "database is locked" once SQLite's timeout has passed
+                        stats['errors'] += 1
+                    stats['timings'].append((time.perf_counter() - start) * 1000)
+                    if stop.is_set():
+                        break
+        finally:
+            connections.close_all()
+
+    def write(self, batch_size, run, stop, stats):
+        """Import batches of synthetic publications by existing authors until stopped."""
+        rng = random.Random(0)
+        people = PersonResolver()
+        names = list(Person.objects.order_by('?').values_list('first_name', 'last_name')[:1000])
+        number = 0
+        try:
+            while not stop.is_set():
+                records = []
+                for _ in range(batch_size):
+                    year = rng.randint(1970, 2025)
+                    records.append((
+                        Publication(
+                            title=f"Load test publication {number}",
+                            abstract='Written by load_test_database. ' * rng.randint(5, 20),
+                            journal='Load Test Letters',
+                            publication_year=year,
+                            doi=f"{run}.{number}",
+                        ),
+                        [{'first_name': first, 'last_name': last} for first, last in rng.sample(names, min(len(names), rng.randint(1, 8)))],
+                    ))
+                    number += 1
+                start = time.perf_counter()
+                try:
+                    stats['publications'] += len(save_publication_batch(records, people))
+                except DatabaseError:
+                    stats['errors'] += 1
+                stats['timings'].append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+
+    def clean_up(self, run, last_person):
+        """Delete what the simulated import wrote."""
+        # In one transaction, so the signal handlers re-index and invalidate once
+        with transaction.atomic():
+            deleted = Publication.objects.filter(doi_normalized__startswith=run.lower()).delete()
+            # People only the import created, in case a name was not matched
+            Person.objects.filter(pk__gt=last_person, authororder__isnull=True).delete()
+        return deleted[1].get('core.Publication', 0)
+
+    def format_result(self, phase, result):
+        line = (
+            f"{phase}: {result['requests']} requests ({result['requests_per_second']}/s), "
+            f"p50 {result['p50_ms'] or 0:.1f} ms, p95 {result['p95_ms'] or 0:.1f} ms, "
+            f"p99 {result['p99_ms'] or 0:.1f} ms, max {result['max_ms'] or 0:.1f} ms, {result['errors']} errors"
+        )
+        if 'import' in result:
+            imported = result['import']
+            line += (
+                f"\n  import: {imported['publications']} publications in {imported['batches']} batches "
+                f"({imported['publications_per_second']}/s), commit p50 {imported['p50_commit_ms'] or 0:.1f} ms, "
+                f"max {imported['max_commit_ms'] or 0:.1f} ms, {imported['errors']} errors"
+            )
+        if result['errors'] or result.get('import', {}).get('errors'):
+            return self.style.WARNING(line)
+        return line
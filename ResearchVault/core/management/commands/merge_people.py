@@ -0,0 +1,91 @@
+import csv
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import merge
+from core.models import Person
+
+
+class Command(BaseCommand):
+    help = (
+        'Merge duplicate people listed in a CSV file with the columns primary_id and '
+        'duplicate_id (one row per duplicate, e.g. the report of find_duplicate_people)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', type=str, help='Path to the CSV mapping file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the merges without changing the database',
+        )
+
+    def handle(self, *args, **options):
+        mapping = self.read_mapping(options['csv'])
+        groups = self.group_mapping(mapping)
+
+        people = Person.objects.in_bulk({pk for primary, duplicates in groups.items() for pk in (primary, *duplicates)})
+        merged = 0
+        primaries = 0
+        for primary_id, duplicate_ids in groups.items():
+            primary = people.get(primary_id)
+            duplicates = [people[pk] for pk in sorted(duplicate_ids) if pk in people]
+            if primary is None or not duplicates:
+                self.stdout.write(self.style.WARNING(f"Skipping person {primary_id}: not found or nothing to merge"))
+                continue
+
+            names = ', '.join(f"{person} ({person.pk})" for person in duplicates)
+            if options['dry_run']:
+                self.stdout.write(f"Would merge {names} into {primary} ({primary.pk})")
+                continue
+            try:
+                merged += merge.merge_people(primary, duplicates)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Error merging into {primary} ({primary.pk}): {str(e)}"))
+                continue
+            primaries += 1
+            self.stdout.write(f"Merged {names} into {primary} ({primary.pk})")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Merged {merged} people into {primaries} records"))
+
+    def read_mapping(self, csv_path):
+        """Return {duplicate_id: primary_id} from the CSV file."""
+        try:
+            with open(csv_path, 'r', encoding='utf-8') as csvfile:
+                reader = csv.DictReader(csvfile)
+                if not reader.fieldnames or not {'primary_id', 'duplicate_id'} <= set(reader.fieldnames):
+                    raise CommandError("CSV file must contain the columns 'primary_id' and 'duplicate_id'")
+                mapping = {}
+                for line, row in enumerate(reader, start=2):
+                    try:
+                        primary_id, duplicate_id = int(row['primary_id']), int(row['duplicate_id'])
+                    except (TypeError, ValueError):
+                        self.stdout.write(self.style.WARNING(f"Skipping line {line}: invalid ids"))
+                        continue
+                    if primary_id != duplicate_id:
+                        mapping.setdefault(duplicate_id, primary_id)
+                return mapping
+        except OSError as e:
+            raise CommandError(f"Error reading CSV file {csv_path}: {str(e)}")
+
+    def group_mapping(self, mapping):
+        """
+        Return {primary_id: set of duplicate ids}, following chains.
+
+        A row merging A into B and another merging B into C both end up in C.
+        Rows that form a cycle are dropped.
+        """
+        groups = defaultdict(set)
+        for duplicate_id in mapping:
+            primary_id = mapping[duplicate_id]
+            seen = {duplicate_id}
+            while primary_id in mapping and primary_id not in seen:
+                seen.add(primary_id)
+                primary_id = mapping[primary_id]
+            if primary_id in seen:
+                self.stdout.write(self.style.WARNING(f"Skipping person {duplicate_id}: merge mapping has a cycle"))
+                continue
+            groups[primary_id].add(duplicate_id)
+        return groups
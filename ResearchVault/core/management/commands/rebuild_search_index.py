@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for publications and dissertations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of records to index per batch',
+        )
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if not backend.is_available():
+            self.stdout.write(self.style.WARNING(
+                "No full-text index is available for this database; search falls back to title matching"
+            ))
+            return
+
+        self.stdout.write(self.style.NOTICE("Rebuilding search index..."))
+        publications, dissertations = search.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {publications} publications and {dissertations} dissertations"
+        ))
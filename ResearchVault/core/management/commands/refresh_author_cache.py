@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core import caching
+from core.models import Publication
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached author list and author flags of every publication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of publications to refresh per batch',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("Refreshing author cache..."))
+        updated = Publication.objects.all().refresh_author_cache(chunk_size=max(1, options['chunk_size']))
+        if updated:
+            caching.bump_content_version()
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} publications"))
@@ -0,0 +1,125 @@
+"""
+Merging duplicate Person records.
+
+``merge_people`` moves everything that references the duplicates onto the
+primary person with a fixed number of set-based statements, whatever the
+number of publications involved, and then deletes the duplicates.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import signals
+from .models import AuthorOrder, Dissertation, Person, Publication
+
+# Dissertation foreign keys that point at a person
+DISSERTATION_ROLES = ('author', 'promoter', 'supervisor')
+
+# Person fields copied from a duplicate when the primary record has none
+FILL_FIELDS = ('email', 'orcid', 'affiliation')
+
+
+def _keep_first(queryset, group_field, primary):
+    """
+    Delete all but one row per group_field value among queryset.
+
+    The row kept is the primary person's if there is one, otherwise the
+    earliest (by ``order`` where the model has it, then by pk).
+    """
+    primary_first = Case(When(person=primary, then=Value(0)), default=Value(1), output_field=IntegerField())
+    ordering = [primary_first, 'pk']
+    if queryset.model is AuthorOrder:
+        # Keep the earliest author position, and with it its contribution type
+        ordering = ['order', primary_first, 'pk']
+    first = queryset.filter(**{group_field: OuterRef(group_field)}).order_by(*ordering).values('pk')[:1]
+    return queryset.exclude(pk=Subquery(first)).delete()
+
+
+def _renumber_authors(publication_ids):
+    """Number the authors of the given publications 0, 1, 2... again, keeping their order."""
+    earlier = (
+        AuthorOrder.objects.filter(publication=OuterRef('publication'))
+        .filter(Q(order__lt=OuterRef('order')) | Q(order=OuterRef('order'), pk__lt=OuterRef('pk')))
+        .order_by().values('publication').annotate(count=Count('pk')).values('count')
+    )
+    AuthorOrder.objects.filter(publication__in=publication_ids).update(order=Coalesce(Subquery(earlier), 0))
+
+
+def merge_people(primary, duplicates):
+    """
+    Merge duplicate people into primary and delete the duplicates.
+
+    On a publication both listed, the earliest author position is kept and
+    the authors after the dropped one move up. The
+    primary person takes over corresponding authorships, dissertation
+    author/promoter/supervisor roles and co-promotions, and any email, ORCID
+    or affiliation it lacks.
+
+    Args:
+        primary: The Person to keep
+        duplicates: People (or their ids) to merge into primary
+
+    Returns:
+        int: Number of people merged
+    """
+    duplicate_ids = {getattr(person, 'pk', person) for person in duplicates} - {primary.pk}
+    if not duplicate_ids:
+        return 0
+    person_ids = duplicate_ids | {primary.pk}
+    now = timezone.now()
+
+    with transaction.atomic():
+        duplicate_people = list(Person.objects.filter(pk__in=duplicate_ids).order_by('pk'))
+        duplicate_ids = {person.pk for person in duplicate_people}
+        if not duplicate_ids:
+            return 0
+
+        publication_ids = set(
+            AuthorOrder.objects.filter(person__in=duplicate_ids).values_list('publication_id', flat=True)
+        )
+        publication_ids.update(
+            Publication.objects.filter(corresponding_author__in=duplicate_ids).values_list('pk', flat=True)
+        )
+        dissertation_filter = Q(copromoters__in=duplicate_ids)
+        for role in DISSERTATION_ROLES:
+            dissertation_filter |= Q(**{f'{role}__in': duplicate_ids})
+        dissertation_ids = set(Dissertation.objects.filter(dissertation_filter).values_list('pk', flat=True))
+
+        # Authorships
+        authorships = AuthorOrder.objects.filter(person__in=person_ids)
+        shared = list(
+            authorships.order_by().values('publication').annotate(count=Count('pk'))
+            .filter(count__gt=1).values_list('publication', flat=True)
+        )
+        _keep_first(authorships, 'publication', primary)
+        AuthorOrder.objects.filter(person__in=duplicate_ids).update(person=primary)
+        if shared:
+            _renumber_authors(shared)
+        Publication.objects.filter(corresponding_author__in=duplicate_ids).update(
+            corresponding_author=primary, updated_at=now,
+        )
+
+        # Dissertations
+        for role in DISSERTATION_ROLES:
+            Dissertation.objects.filter(**{f'{role}__in': duplicate_ids}).update(**{role: primary, 'updated_at': now})
+        copromoters = Dissertation.copromoters.through.objects
+        _keep_first(copromoters.filter(person__in=person_ids), 'dissertation', primary)
+        copromoters.filter(person__in=duplicate_ids).update(person=primary)
+
+        # Contact details the primary record is missing
+        missing = [field for field in FILL_FIELDS if not getattr(primary, field)]
+        for field in missing:
+            value = next((getattr(person, field) for person in duplicate_people if getattr(person, field)), '')
+            setattr(primary, field, value)
+        if any(getattr(primary, field) for field in missing):
+            Person.objects.filter(pk=primary.pk).update(**{field: getattr(primary, field) for field in missing})
+
+        Person.objects.filter(pk__in=duplicate_ids).delete()
+
+        # update() sends no signals, so refresh the derived data explicitly
+        signals.schedule_author_cache(publication_ids)
+        signals.schedule_publications(publication_ids)
+        signals.schedule_dissertations(dissertation_ids)
+
+    return len(duplicate_ids)
@@ -0,0 +1,186 @@
+"""
+Per-request performance instrumentation.
+
+``RequestMetricsMiddleware`` records, for every request, the number of SQL
+queries and the time spent in them, the time spent rendering the template
+and the size of the response. The figures are logged to the
+``core.performance`` logger and, when ``REQUEST_METRICS_SERVER_TIMING`` is on
+(in development by default), sent back in a ``Server-Timing`` header shown in
+the browser's network panel. Requests over one of the ``REQUEST_METRICS_*``
+thresholds in the settings are logged at WARNING level.
+
+The same statement run over and over with different parameters is the
+signature of an N+1 loop, so the highest repeat count of a single SQL
+statement is recorded as well.
+
+Streaming responses (e.g. the exports) run most of their queries while the
+content is sent, so they are measured and logged when the stream closes.
+Their headers are sent by then, so they get no ``Server-Timing`` header.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.performance')
+
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_MAX_QUERIES = 50
+DEFAULT_MAX_REPEATED_QUERIES = 10
+
+_END = object()
+
+
+class QueryRecorder:
+    """Database execute wrapper that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        # Queries run while the template renders are counted separately
+        self.template_count = 0
+        self.in_template = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+            if self.in_template:
+                self.template_count += 1
+
+    @property
+    def max_repeats(self):
+        return max(self.statements.values(), default=0)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure queries, template rendering and response size of each request.
+
+    Put it first in MIDDLEWARE so that its measurements cover the other
+    middleware as well, and so that it sees template responses just before
+    they are rendered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', settings.DEBUG)
+        self.slow_request_ms = getattr(settings, 'REQUEST_METRICS_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+        self.max_queries = getattr(settings, 'REQUEST_METRICS_MAX_QUERIES', DEFAULT_MAX_QUERIES)
+        self.max_repeated_queries = getattr(
+            settings, 'REQUEST_METRICS_MAX_REPEATED_QUERIES', DEFAULT_MAX_REPEATED_QUERIES
+        )
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._metrics = {'recorder': recorder, 'render': 0.0}
+        started = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+
+        if response.streaming and not response.is_async:
+            content = response.streaming_content
+            response.streaming_content = self.measure_stream(request, response, content, recorder, started)
+        else:
+            self.record(request, response, recorder, request._metrics['render'], time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def recording(recorder):
+        """Return a context manager that records the queries of every database connection."""
+        stack = ExitStack()
+        # Wrappers belong to this thread's connection objects, so they
+        # also apply to connections opened later in the request
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def measure_stream(self, request, response, content, recorder, started):
+        """Yield the content of a streaming response, then record the request once it is sent."""
+        content = iter(content)
+        size = 0
+        try:
+            while True:
+                # Only record while a chunk is produced, not while suspended at a yield
+                with self.recording(recorder):
+                    chunk = next(content, _END)
+                if chunk is _END:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.record(request, response, recorder, request._metrics['render'],
+                        time.perf_counter() - started, size)
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, '_metrics', None)
+        if metrics is None:
+            return response
+
+        # Template responses are rendered right after this hook, and their
+        # post-render callbacks run right after rendering
+        recorder = metrics['recorder']
+        started = time.perf_counter()
+        recorder.in_template = True
+
+        def rendered(response):
+            recorder.in_template = False
+            metrics['render'] = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, recorder, render, total, size=None):
+        streamed = response.streaming
+        if not streamed:
+            size = len(response.content)
+        match = getattr(request, 'resolver_match', None)
+        metrics = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_ms': round(recorder.duration * 1000, 1),
+            'queries': recorder.count,
+            'template_queries': recorder.template_count,
+            'max_repeated_queries': recorder.max_repeats,
+            'render_ms': round(render * 1000, 1),
+            'response_bytes': size,
+            'streamed': streamed,
+        }
+
+        problems = []
+        if metrics['duration_ms'] > self.slow_request_ms:
+            problems.append('slow')
+        if recorder.count > self.max_queries:
+            problems.append('too_many_queries')
+        if recorder.max_repeats > self.max_repeated_queries:
+            problems.append('repeated_queries')
+        metrics['flags'] = problems
+
+        if self.server_timing and not streamed:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics["db_ms"]};desc="{recorder.count} queries"',
+                f'tpl;dur={metrics["render_ms"]}',
+                f'total;dur={metrics["duration_ms"]}',
+            ])
+
+        message = ' '.join(f'{key}={value}' for key, value in metrics.items() if key != 'flags')
+        if problems:
+            logger.warning('%s flags=%s', message, ','.join(problems), extra={'metrics': metrics})
+        else:
+            logger.info('%s', message, extra={'metrics': metrics})
+
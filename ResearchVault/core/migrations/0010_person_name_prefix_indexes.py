@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:31
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_old_supervisor'),
+    ]
+
+    operations = [
+        # The AuthorOrder through table already exists (0004); only bring the
+        # migration state in line with the model, as SQLite cannot alter M2M fields.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='publication',
+                    name='authors',
+                    field=models.ManyToManyField(help_text='Authors of the publication', related_name='publications', through='core.AuthorOrder', to='core.person'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), django.db.models.functions.text.Lower('first_name'), name='core_person_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='core_person_first_lower_idx'),
+        ),
+    ]
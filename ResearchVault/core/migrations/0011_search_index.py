@@ -0,0 +1,114 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+SQLITE_CREATE = """
+CREATE VIRTUAL TABLE core_search_index USING fts5(
+    title, abstract, keywords, journal, authors,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+POSTGRES_CREATE = [
+    "CREATE TABLE core_search_index (id bigint PRIMARY KEY, document tsvector NOT NULL)",
+    "CREATE INDEX core_search_index_document_gin ON core_search_index USING GIN (document)",
+]
+
+
+# Copied from core.search as it was when this migration was written, so that
+# later changes there do not change what this migration does
+SQLITE_INSERT = (
+    "INSERT INTO core_search_index (rowid, title, abstract, keywords, journal, authors) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+POSTGRES_INSERT = (
+    "INSERT INTO core_search_index (id, document) VALUES (%s, "
+    "setweight(to_tsvector('simple', %s), 'A') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'C') || "
+    "setweight(to_tsvector('simple', %s), 'D'))"
+)
+
+PUBLICATION = 0
+DISSERTATION = 1
+
+
+def _person_name(person):
+    return f"{person.first_name} {person.last_name}" if person else ''
+
+
+def publication_document(publication):
+    return {
+        'title': publication.title,
+        'abstract': publication.abstract,
+        'keywords': publication.keywords,
+        'journal': ' '.join(filter(None, [publication.journal, publication.conference])),
+        'authors': ' '.join(_person_name(ao.person) for ao in publication.authororder_set.all()),
+    }
+
+
+def dissertation_document(dissertation):
+    people = [dissertation.author, dissertation.promoter, dissertation.supervisor]
+    people.extend(dissertation.copromoters.all())
+    return {
+        'title': dissertation.title,
+        'abstract': dissertation.abstract,
+        'keywords': dissertation.keywords,
+        'journal': ' '.join(filter(None, [dissertation.institution, dissertation.department])),
+        'authors': ' '.join(_person_name(person) for person in people if person),
+    }
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index table for the current database, if supported."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # Without FTS5 search falls back to icontains on the title
+                return
+        schema_editor.execute(SQLITE_CREATE)
+        insert = SQLITE_INSERT
+        columns = ('title', 'abstract', 'keywords', 'journal', 'authors')
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+        insert = POSTGRES_INSERT
+        columns = ('title', 'keywords', 'authors', 'journal', 'abstract')
+    else:
+        return
+
+    # Index the existing rows with the historical models; the key is the
+    # object's id with its kind in the low bit
+    Publication = apps.get_model('core', 'Publication')
+    Dissertation = apps.get_model('core', 'Dissertation')
+
+    publications = Publication.objects.prefetch_related('authororder_set__person')
+    documents = [(pub.pk * 2 + PUBLICATION, publication_document(pub)) for pub in publications]
+    dissertations = Dissertation.objects.select_related(
+        'author', 'promoter', 'supervisor'
+    ).prefetch_related('copromoters')
+    documents += [(d.pk * 2 + DISSERTATION, dissertation_document(d)) for d in dissertations]
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(insert, [(key, *(doc[column] for column in columns)) for key, doc in documents])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS core_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_person_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:43
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authororder',
+            index=models.Index(fields=['publication', 'order'], name='core_authororder_pub_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dissertation',
+            index=models.Index(fields=['-defense_date', 'title'], name='core_diss_date_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['last_name', 'first_name'], name='core_person_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['orcid'], name='core_person_orcid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['doi'], name='core_pub_doi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['pmid'], name='core_pub_pmid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['arxiv_id'], name='core_pub_arxiv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='core_pub_title_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['-publication_year', 'title'], name='core_pub_year_title_idx'),
+        ),
+    ]
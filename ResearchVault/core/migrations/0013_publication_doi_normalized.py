@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:47
+
+import re
+from urllib.parse import unquote
+
+from django.db import migrations, models
+
+# Copied from core.models as it was when this migration was written, so that
+# later changes there do not change what this migration does
+DOI_PREFIX = re.compile(r'^(?:https?://(?:dx\.|www\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+
+def normalize_doi(doi):
+    doi = unquote((doi or '').strip())
+    return DOI_PREFIX.sub('', doi).strip().lower()
+
+
+def fill_doi_normalized(apps, schema_editor):
+    """
+    Set doi_normalized on existing publications.
+
+    Where several publications share a DOI only the oldest gets the key; the
+    others keep their DOI but stay NULL, outside the unique constraint, which
+    Publication.save() keeps them out of.
+    """
+    Publication = apps.get_model('core', 'Publication')
+    seen = set()
+    batch = []
+    for publication in Publication.objects.exclude(doi='').only('pk', 'doi').order_by('pk').iterator(chunk_size=2000):
+        key = normalize_doi(publication.doi)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        publication.doi_normalized = key
+        batch.append(publication)
+        if len(batch) >= 2000:
+            Publication.objects.bulk_update(batch, ['doi_normalized'])
+            batch = []
+    Publication.objects.bulk_update(batch, ['doi_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_lookup_and_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='publication',
+            name='core_pub_doi_idx',
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='doi_normalized',
+            field=models.CharField(blank=True, editable=False, help_text='Canonical DOI used for deduplication, set on save (NULL without a DOI)', max_length=100, null=True),
+        ),
+        migrations.RunPython(fill_doi_normalized, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='publication',
+            constraint=models.UniqueConstraint(condition=models.Q(('doi_normalized__isnull', False)), fields=('doi_normalized',), name='core_pub_doi_normalized_uniq'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:49
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+# Copied from core.models as it was when this migration was written, so that
+# later changes there do not change what this migration does
+AUTHOR_MARKERS = {
+    'first': ('*', 1),
+    'co-first': ('*', 1),
+    'last': ('†', 2),
+    'co-last': ('†', 2),
+    'corresponding': ('#', 4),
+}
+
+
+def author_cache_values(authors):
+    names = []
+    flags = 0
+    for name, contribution_type in authors:
+        marker, flag = AUTHOR_MARKERS.get(contribution_type, ('', 0))
+        names.append(f"{name}{marker}")
+        flags |= flag
+    return ', '.join(names), flags
+
+
+def fill_author_cache(apps, schema_editor):
+    """Compute authors_display and author_flags for existing publications."""
+    Publication = apps.get_model('core', 'Publication')
+    AuthorOrder = apps.get_model('core', 'AuthorOrder')
+    rows = (
+        AuthorOrder.objects.order_by('publication_id', 'order')
+        .values_list('publication_id', 'person__first_name', 'person__last_name', 'contribution_type')
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for publication_id, authors in groupby(rows, key=lambda row: row[0]):
+        authors_display, author_flags = author_cache_values(
+            (f"{first_name} {last_name}", contribution_type) for _, first_name, last_name, contribution_type in authors
+        )
+        batch.append(Publication(pk=publication_id, authors_display=authors_display, author_flags=author_flags))
+        if len(batch) >= 2000:
+            Publication.objects.bulk_update(batch, ['authors_display', 'author_flags'])
+            batch = []
+    Publication.objects.bulk_update(batch, ['authors_display', 'author_flags'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_publication_doi_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='author_flags',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Bitmask of first, last and corresponding authors present'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='authors_display',
+            field=models.TextField(blank=True, editable=False, help_text='Authors in order, each followed by its contribution marker'),
+        ),
+        migrations.RunPython(fill_author_cache, migrations.RunPython.noop),
+    ]
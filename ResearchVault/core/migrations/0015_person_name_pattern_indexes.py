@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:20
+
+from django.db import migrations
+
+POSTGRES_CREATE = [
+    "CREATE INDEX core_person_last_lower_like_idx ON core_person (LOWER(last_name) text_pattern_ops)",
+    "CREATE INDEX core_person_first_lower_like_idx ON core_person (LOWER(first_name) text_pattern_ops)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS core_person_last_lower_like_idx",
+    "DROP INDEX IF EXISTS core_person_first_lower_like_idx",
+]
+
+
+def create_pattern_indexes(apps, schema_editor):
+    """
+    Index lower-cased names for LIKE 'prefix%' on PostgreSQL.
+
+    Under a non-C collation the indexes of 0010 cannot answer prefix matches,
+    so the author autocomplete uses LIKE there, which needs text_pattern_ops.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_publication_author_cache'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
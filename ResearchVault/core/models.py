@@ -1,6 +1,21 @@
+import re
+from urllib.parse import unquote
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+# Resolver and scheme prefixes that importers and users put in front of DOIs
+DOI_PREFIX = re.compile(r'^(?:https?://(?:dx\.|www\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+
+def normalize_doi(doi):
+    """Return the canonical form of a DOI: without resolver prefix, escaping or case."""
+    doi = unquote((doi or '').strip())
+    return DOI_PREFIX.sub('', doi).strip().lower()
+
+
 # Create your models here.
 class Degree(models.TextChoices):
     PHD = 'PhD', 'PhD'
@@ -20,6 +35,76 @@ class Person(models.Model):
     class Meta:
         verbose_name_plural = "People"
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # Case-insensitive prefix lookups for the author autocomplete
+            models.Index(Lower('last_name'), Lower('first_name'), name='core_person_name_lower_idx'),
+            models.Index(Lower('first_name'), name='core_person_first_lower_idx'),
+            # Exact lookups from the importers, and the default ordering
+            models.Index(fields=['last_name', 'first_name'], name='core_person_name_idx'),
+            models.Index(fields=['orcid'], name='core_person_orcid_idx'),
+        ]
+
+
+# Bits of Publication.author_flags
+FIRST_AUTHOR_FLAG = 1
+LAST_AUTHOR_FLAG = 2
+CORRESPONDING_AUTHOR_FLAG = 4
+
+# Marker shown after an author's name, and the flag it sets, per contribution type
+AUTHOR_MARKERS = {
+    'first': ('*', FIRST_AUTHOR_FLAG),
+    'co-first': ('*', FIRST_AUTHOR_FLAG),
+    'last': ('†', LAST_AUTHOR_FLAG),
+    'co-last': ('†', LAST_AUTHOR_FLAG),
+    'corresponding': ('#', CORRESPONDING_AUTHOR_FLAG),
+}
+
+
+def author_cache_values(authors):
+    """
+    Return (authors_display, author_flags) for a publication.
+
+    Args:
+        authors: (name, contribution_type) pairs in author order
+    """
+    names = []
+    flags = 0
+    for name, contribution_type in authors:
+        marker, flag = AUTHOR_MARKERS.get(contribution_type, ('', 0))
+        names.append(f"{name}{marker}")
+        flags |= flag
+    return ', '.join(names), flags
+
+
+class PublicationQuerySet(models.QuerySet):
+    def with_authors(self):
+        """Prefetch ordered AuthorOrder rows together with their Person."""
+        return self.prefetch_related(
+            models.Prefetch(
+                'authororder_set',
+                queryset=AuthorOrder.objects.select_related('person').order_by('order'),
+            )
+        )
+    
+    def refresh_author_cache(self, chunk_size=500):
+        """
+        Recompute authors_display and author_flags for these publications.
+        
+        Returns:
+            int: Number of publications updated
+        """
+        now = timezone.now()
+        count = 0
+        ids = list(self.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), chunk_size):
+            changed = []
+            for publication in self.model.objects.filter(pk__in=ids[start:start + chunk_size]).with_authors():
+                if publication.refresh_author_cache(save=False):
+                    publication.updated_at = now
+                    changed.append(publication)
+            self.model.objects.bulk_update(changed, ['authors_display', 'author_flags', 'updated_at'])
+            count += len(changed)
+        return count
 
 
 class Publication(models.Model):
@@ -54,6 +139,13 @@ class Publication(models.Model):
     
     # Identifiers
     doi = models.CharField(max_length=100, blank=True, help_text="Digital Object Identifier")
+    doi_normalized = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Canonical DOI used for deduplication, set on save (NULL without a DOI)"
+    )
     pmid = models.CharField(max_length=20, blank=True, help_text="PubMed ID")
     arxiv_id = models.CharField(max_length=50, blank=True, help_text="arXiv ID")
     isbn = models.CharField(max_length=20, blank=True, help_text="ISBN for books")
@@ -74,41 +166,136 @@ class Publication(models.Model):
     # Notes and custom fields
     notes = models.TextField(blank=True, help_text="Personal notes about the publication")
     
+    # Author list denormalized from AuthorOrder for rendering without joins;
+    # kept up to date by core.signals (see refresh_author_cache)
+    authors_display = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Authors in order, each followed by its contribution marker"
+    )
+    author_flags = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Bitmask of first, last and corresponding authors present"
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PublicationQuerySet.as_manager()
+    
     def __str__(self):
         return self.title
     
+    def _doi_held_elsewhere(self, doi_normalized):
+        """Return whether another publication holds this DOI key."""
+        return Publication.objects.filter(doi_normalized=doi_normalized).exclude(pk=self.pk).exists()
+    
+    def clean(self):
+        super().clean()
+        doi_normalized = normalize_doi(self.doi)
+        if not doi_normalized or doi_normalized == self.doi_normalized or not self._doi_held_elsewhere(doi_normalized):
+            return
+        # Duplicates that predate the unique key (see migration 0013) stay
+        # editable as long as their DOI is not changed
+        if not self._state.adding:
+            stored_doi = Publication.objects.filter(pk=self.pk).values_list('doi', flat=True).first()
+            if normalize_doi(stored_doi) == doi_normalized:
+                return
+        raise ValidationError({'doi': "A publication with this DOI already exists."})
+    
+    def save(self, *args, **kwargs):
+        doi_normalized = normalize_doi(self.doi) or None
+        # An existing publication does not take a key another one holds, e.g. a
+        # duplicate left without one by migration 0013, and stays outside the
+        # unique constraint; new publications with a known DOI are rejected by it
+        if (
+            doi_normalized
+            and not self._state.adding
+            and doi_normalized != self.doi_normalized
+            and self._doi_held_elsewhere(doi_normalized)
+        ):
+            doi_normalized = None
+        self.doi_normalized = doi_normalized
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'doi' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'doi_normalized'}
+        super().save(*args, **kwargs)
+    
     def get_keywords_list(self):
         """Return keywords as a list of strings."""
         if not self.keywords:
             return []
         return [kw.strip() for kw in self.keywords.split(',') if kw.strip()]
     
+    def _has_prefetched_authors(self):
+        return 'authororder_set' in getattr(self, '_prefetched_objects_cache', {})
+    
     def get_ordered_authors(self):
         """Return authors in the correct order."""
-        return [ao.person for ao in self.authororder_set.order_by('order')]
+        return [ao.person for ao in self.get_authors_with_contributions()]
         
     def get_authors_with_contributions(self):
         """Return authors with their contribution types."""
+        if self._has_prefetched_authors():
+            return self.authororder_set.all()
         return self.authororder_set.order_by('order').select_related('person')
+    
+    def refresh_author_cache(self, save=True):
+        """
+        Recompute authors_display and author_flags from the AuthorOrder rows.
+        
+        With save=True the two fields (and updated_at) are written with an
+        UPDATE, without sending post_save.
+        
+        Returns:
+            bool: True if either value changed
+        """
+        authors_display, author_flags = author_cache_values(
+            (str(ao.person), ao.contribution_type) for ao in self.get_authors_with_contributions()
+        )
+        changed = (authors_display, author_flags) != (self.authors_display, self.author_flags)
+        self.authors_display, self.author_flags = authors_display, author_flags
+        if save and changed:
+            self.updated_at = timezone.now()
+            Publication.objects.filter(pk=self.pk).update(
+                authors_display=authors_display, author_flags=author_flags, updated_at=self.updated_at,
+            )
+        return changed
         
     def has_first_authors(self):
         """Check if this publication has any first or co-first authors."""
-        return self.authororder_set.filter(contribution_type__in=['first', 'co-first']).exists()
+        return bool(self.author_flags & FIRST_AUTHOR_FLAG)
         
     def has_last_authors(self):
         """Check if this publication has any last or co-last authors."""
-        return self.authororder_set.filter(contribution_type__in=['last', 'co-last']).exists()
+        return bool(self.author_flags & LAST_AUTHOR_FLAG)
         
     def has_corresponding_authors(self):
         """Check if this publication has any corresponding authors."""
-        return self.authororder_set.filter(contribution_type='corresponding').exists()
+        return bool(self.author_flags & CORRESPONDING_AUTHOR_FLAG)
     
     class Meta:
         ordering = ['-publication_year', 'title']
+        indexes = [
+            # Identifier lookups used to deduplicate imports; DOIs are
+            # deduplicated through the unique doi_normalized constraint below
+            models.Index(fields=['pmid'], name='core_pub_pmid_idx'),
+            models.Index(fields=['arxiv_id'], name='core_pub_arxiv_idx'),
+            # Case-insensitive title key (see core.importing.existing_titles)
+            models.Index(Lower('title'), name='core_pub_title_lower_idx'),
+            # Default ordering of the publication list
+            models.Index(fields=['-publication_year', 'title'], name='core_pub_year_title_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['doi_normalized'],
+                # IS NOT NULL lets SQLite use the index for doi_normalized = ?
+                condition=models.Q(doi_normalized__isnull=False),
+                name='core_pub_doi_normalized_uniq',
+            ),
+        ]
 
 
 class AuthorOrder(models.Model):
@@ -135,6 +322,9 @@ class AuthorOrder(models.Model):
     class Meta:
         ordering = ['publication', 'order']
         unique_together = ('publication', 'person')
+        indexes = [
+            models.Index(fields=['publication', 'order'], name='core_authororder_pub_order_idx'),
+        ]
         verbose_name = "Author Order"
         verbose_name_plural = "Author Orders"
 
@@ -218,5 +408,8 @@ class Dissertation(models.Model):
     
     class Meta:
         ordering = ['-defense_date', 'title']
+        indexes = [
+            models.Index(fields=['-defense_date', 'title'], name='core_diss_date_title_idx'),
+        ]
         verbose_name = "Dissertation"
         verbose_name_plural = "Dissertations"
@@ -0,0 +1,253 @@
+"""
+Keyset (cursor) pagination for the list views.
+
+Django's Paginator counts the whole filtered queryset and skips to a page
+with OFFSET, so every request pays for a COUNT(*) and deep pages read and
+throw away all the rows before them. ``KeysetPaginator`` instead remembers
+the sort key of the last row shown, e.g. (publication_year, title, id), and
+asks for the rows that sort after it. With an index on the ordering, every
+page costs the same as the first one.
+
+Cursors are signed, so they are opaque to users and cannot be forged into
+arbitrary filters. ``KeysetPaginationMixin`` switches a ListView over when
+the ``KEYSET_PAGINATION`` setting is on.
+
+Settings:
+    KEYSET_PAGINATION: use keyset pagination in the list views (default: False)
+    KEYSET_PAGINATION_COUNT: show an estimated result count with it (default: True)
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from . import caching
+
+CURSOR_SALT = 'core.pagination'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def estimate_count(queryset):
+    """
+    Return a cheap estimate of queryset.count().
+
+    PostgreSQL's planner estimate is used where available. Elsewhere the
+    exact count is computed once per content version and cached.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    key = hashlib.md5(str(queryset.order_by().query).encode()).hexdigest()
+    return caching.cached(f'count:{key}', queryset.count)
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; has the parts of Page the templates use."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1], forward=True)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[0], forward=False)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by the values of its ordering fields.
+
+    Args:
+        queryset: The queryset to paginate
+        per_page: Objects per page
+        ordering: Field names as in Meta.ordering, e.g. ['-publication_year', 'title'];
+            the primary key is added as a tie-breaker
+        count: Whether ``count`` returns an estimate (see estimate_count) or None
+    """
+
+    def __init__(self, queryset, per_page, ordering, count=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.with_count = count
+        ordering = [name for name in ordering if name.lstrip('-') not in ('pk', 'id')]
+        self.ordering = [*ordering, 'pk']
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-'), self._field(name.lstrip('-')))
+            for name in self.ordering
+        ]
+        # Where NULL sorts depends on the database: last in descending order
+        # on SQLite (NULL is smallest), first on PostgreSQL (NULL is largest)
+        self.nulls_largest = connections[queryset.db].features.nulls_order_largest
+        self.salt = f"{CURSOR_SALT}:{queryset.model._meta.label}:{','.join(self.ordering)}"
+
+    def _field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.queryset) if self.with_count else None
+
+    def cursor_for(self, obj, forward=True):
+        """Return the cursor of the page after (or before) obj."""
+        values = []
+        for name, _, field in self.fields:
+            value = getattr(obj, field.attname)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps({'v': values, 'f': forward}, salt=self.salt, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+            values = [
+                None if value is None else field.to_python(value)
+                for value, (_, _, field) in zip(data['v'], self.fields, strict=True)
+            ]
+            return values, bool(data['f'])
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as e:
+            raise InvalidCursor("Invalid cursor") from e
+
+    def _beyond(self, name, value, descending):
+        """Return the condition for rows that sort after value in one field."""
+        nulls_first = descending == self.nulls_largest
+        if value is None:
+            return Q(**{f'{name}__isnull': False}) if nulls_first else Q(pk__in=[])
+        condition = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+        return condition if nulls_first else condition | Q(**{f'{name}__isnull': True})
+
+    def _after(self, values, forward):
+        """Return the condition for rows that sort after (or, backwards, before) values."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending, _), value in zip(self.fields, values):
+            condition |= equal & self._beyond(name, value, descending if forward else not descending)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    def _segments(self, values, forward):
+        """
+        Return the conditions of the rows after values, in the order they are read.
+
+        On its own the condition from ``_after`` is a chain of ORs that
+        databases cannot use to seek into the index, so they scan it from the
+        start instead. Bounding the leading field with a plain range makes
+        the lookup a seek. Rows whose leading field is NULL sort apart from
+        the others and fall outside the range, so they are read separately,
+        only when a page reaches them.
+        """
+        name, descending, _ = self.fields[0]
+        descending = descending if forward else not descending
+        nulls_first = descending == self.nulls_largest
+        after = self._after(values, forward)
+        if values[0] is None:
+            segments = [Q(**{f'{name}__isnull': True}) & after]
+            if nulls_first:
+                segments.append(Q(**{f'{name}__isnull': False}))
+        else:
+            segments = [Q(**{f'{name}__lte' if descending else f'{name}__gte': values[0]}) & after]
+            if not nulls_first:
+                segments.append(Q(**{f'{name}__isnull': True}))
+        return segments
+
+    def _rows(self, queryset, values, forward):
+        """Return up to per_page + 1 rows after (or, backwards, before) values."""
+        rows = []
+        for segment in self._segments(values, forward):
+            rows += queryset.filter(segment)[:self.per_page + 1 - len(rows)]
+            if len(rows) > self.per_page:
+                break
+        return rows
+
+    def page(self, cursor=None):
+        """Return the page a cursor points at, or the first page without one."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if not cursor:
+            rows = list(queryset[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        values, forward = self._decode(cursor)
+        if forward:
+            rows = self._rows(queryset, values, True)
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        # Backwards: read the rows before the cursor in reverse, then flip them
+        rows = self._rows(queryset.reverse(), values, False)
+        return KeysetPage(rows[:self.per_page][::-1], self, True, len(rows) > self.per_page)
+
+
+class KeysetPaginationMixin:
+    """
+    Paginate a ListView by cursor instead of page number when KEYSET_PAGINATION is on.
+
+    The view's ``ordering`` is the keyset, so it should match an index.
+    Templates get ``keyset_pagination`` to choose between cursor and
+    numbered page links.
+    """
+    cursor_kwarg = 'cursor'
+
+    def use_keyset_pagination(self):
+        return getattr(settings, 'KEYSET_PAGINATION', False)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(
+            queryset, page_size, self.get_ordering(),
+            count=getattr(settings, 'KEYSET_PAGINATION_COUNT', True),
+        )
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['keyset_pagination'] = self.use_keyset_pagination()
+        return context
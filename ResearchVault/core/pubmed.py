@@ -0,0 +1,120 @@
+"""
+Incremental parsing of PubMed efetch XML.
+
+``iter_pubmed_articles`` reads a ``PubmedArticleSet`` document from a file-like
+object with ``iterparse`` and yields one dict per article, clearing the parsed
+elements as it goes so memory use does not grow with the size of the response.
+"""
+import re
+from xml.etree import ElementTree
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+ORCID_PATTERN = re.compile(r'(\d{4}-\d{4}-\d{4}-\d{3}[\dX])')
+
+
+def _text(element, path):
+    """Return the whitespace-normalised text under a sub-element, or ''."""
+    found = element.find(path)
+    if found is None:
+        return ''
+    return ' '.join(''.join(found.itertext()).split())
+
+
+def _month(value):
+    if value.isdigit():
+        return int(value)
+    return MONTHS.get(value[:3].lower())
+
+
+def _parse_date(pub_date):
+    """Return (year, month, day) from a PubDate element; missing parts are None."""
+    if pub_date is None:
+        return None, None, None
+    year = _text(pub_date, 'Year')
+    if not year:
+        # e.g. <MedlineDate>1998 Dec-1999 Jan</MedlineDate>
+        match = re.search(r'\d{4}', _text(pub_date, 'MedlineDate'))
+        return (int(match.group()) if match else None), None, None
+    month = _month(_text(pub_date, 'Month'))
+    day = _text(pub_date, 'Day')
+    return int(year), month, int(day) if day.isdigit() else None
+
+
+def _parse_author(author):
+    last_name = _text(author, 'LastName')
+    if not last_name:
+        # Collective names ("The XYZ Consortium") are not people
+        return None
+    orcid = ''
+    for identifier in author.findall('Identifier'):
+        if identifier.get('Source') == 'ORCID':
+            match = ORCID_PATTERN.search(identifier.text or '')
+            if match:
+                orcid = match.group(1)
+    # Cut to the Person columns, as one overlong value fails the whole batch
+    return {
+        'first_name': (_text(author, 'ForeName') or _text(author, 'Initials'))[:100],
+        'last_name': last_name[:100],
+        'orcid': orcid,
+        'affiliation': _text(author, 'AffiliationInfo/Affiliation')[:255],
+    }
+
+
+def parse_pubmed_article(article):
+    """Return the fields we import from a PubmedArticle element."""
+    citation = article.find('MedlineCitation')
+    record = citation.find('Article')
+    journal = record.find('Journal')
+
+    abstract_parts = []
+    for part in record.findall('Abstract/AbstractText'):
+        text = ' '.join(''.join(part.itertext()).split())
+        label = part.get('Label')
+        abstract_parts.append(f"{label}: {text}" if label else text)
+
+    doi = ''
+    for article_id in article.findall('PubmedData/ArticleIdList/ArticleId'):
+        if article_id.get('IdType') == 'doi':
+            doi = (article_id.text or '').strip()
+    if not doi:
+        for location in record.findall('ELocationID'):
+            if location.get('EIdType') == 'doi':
+                doi = (location.text or '').strip()
+
+    authors = [
+        author for author in (_parse_author(element) for element in record.findall('AuthorList/Author'))
+        if author
+    ]
+
+    year, month, day = _parse_date(journal.find('JournalIssue/PubDate') if journal is not None else None)
+    return {
+        'pmid': _text(citation, 'PMID'),
+        'title': _text(record, 'ArticleTitle'),
+        'abstract': '\n\n'.join(abstract_parts),
+        'journal': _text(journal, 'Title') if journal is not None else '',
+        'volume': _text(journal, 'JournalIssue/Volume') if journal is not None else '',
+        'issue': _text(journal, 'JournalIssue/Issue') if journal is not None else '',
+        'pages': _text(record, 'Pagination/MedlinePgn'),
+        'year': year,
+        'month': month,
+        'day': day,
+        'doi': doi,
+        'keywords': ', '.join(_text(keyword, '.') for keyword in citation.findall('KeywordList/Keyword')),
+        'authors': authors,
+    }
+
+
+def iter_pubmed_articles(stream):
+    """Yield parsed articles from an efetch XML stream, one at a time."""
+    root = None
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if root is None and event == 'start':
+            root = element
+        elif event == 'end' and element.tag == 'PubmedArticle':
+            yield parse_pubmed_article(element)
+            # Drop the finished article from the tree so it can be freed
+            root.clear()
@@ -0,0 +1,297 @@
+"""
+Full-text search over publications and dissertations.
+
+All documents live in a single ``core_search_index`` table whose integer key
+encodes both the object id and its kind (see ``document_key``). On SQLite the
+table is an FTS5 virtual table ranked with BM25; on PostgreSQL it holds a
+weighted ``tsvector`` with a GIN index. Searches join the table to the
+queried model, so matches are filtered, ranked, counted and paged in SQL.
+Any other database falls back to a plain ``title__icontains`` filter.
+
+The index is kept in sync by the signal handlers in ``core.signals``. Code
+that bypasses signals (``bulk_create``, ``update``) should call
+``index_publications`` / ``index_dissertations`` for the affected ids, and
+``manage.py rebuild_search_index`` rebuilds everything from scratch.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Value
+
+SEARCH_TABLE = 'core_search_index'
+
+PUBLICATION = 0
+DISSERTATION = 1
+
+# Database aliases on which the index table has been seen, so the
+# introspection query runs once per process rather than once per search
+_available_aliases = set()
+
+
+def document_key(kind, object_id):
+    """Return the index key for an object: its id with the kind in the low bit."""
+    return object_id * 2 + kind
+
+
+def _query_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _person_name(person):
+    return f"{person.first_name} {person.last_name}" if person else ''
+
+
+def publication_document(publication):
+    """
+    Return the indexed fields of a publication.
+
+    Expects ``authororder_set`` to be prefetched with its persons (see
+    ``PublicationQuerySet.with_authors``) when indexing many publications.
+    """
+    return {
+        'title': publication.title,
+        'abstract': publication.abstract,
+        'keywords': publication.keywords,
+        'journal': ' '.join(filter(None, [publication.journal, publication.conference])),
+        'authors': ' '.join(_person_name(ao.person) for ao in publication.authororder_set.all()),
+    }
+
+
+def dissertation_document(dissertation):
+    """Return the indexed fields of a dissertation."""
+    people = [dissertation.author, dissertation.promoter, dissertation.supervisor]
+    people.extend(dissertation.copromoters.all())
+    return {
+        'title': dissertation.title,
+        'abstract': dissertation.abstract,
+        'keywords': dissertation.keywords,
+        'journal': ' '.join(filter(None, [dissertation.institution, dissertation.department])),
+        'authors': ' '.join(_person_name(person) for person in people if person),
+    }
+
+
+class SearchBackend:
+    """Fallback backend without an index; searches titles with icontains."""
+
+    indexed = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def is_available(self):
+        if not self.indexed:
+            return False
+        if self.connection.alias not in _available_aliases:
+            if SEARCH_TABLE not in self.connection.introspection.table_names():
+                return False
+            _available_aliases.add(self.connection.alias)
+        return True
+
+    def clear(self):
+        pass
+
+    def delete(self, keys):
+        pass
+
+    def upsert(self, documents):
+        pass
+
+    def filter(self, queryset, kind, query):
+        """
+        Keep the rows of a queryset that match a search, annotated with search_rank.
+
+        Indexed backends join the index and order by rank. Here the title is
+        matched with icontains and the rank is a constant, so the queryset's
+        ordering is kept.
+        """
+        return queryset.filter(title__icontains=query).annotate(search_rank=Value(0))
+
+    def _join(self, queryset, kind):
+        """Return the WHERE clauses matching index keys of the given kind to the queryset's rows."""
+        quote = self.connection.ops.quote_name
+        model_column = f"{quote(queryset.model._meta.db_table)}.{quote(queryset.model._meta.pk.column)}"
+        key_column = f"{SEARCH_TABLE}.{self.key_column}"
+        # Compare the model's primary key (not an expression on it) so its index can be used
+        return [f"{model_column} = {key_column} / 2", f"{key_column} %% 2 = {int(kind)}"]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table ranked with BM25."""
+
+    indexed = True
+    key_column = 'rowid'
+
+    # BM25 column weights: title, abstract, keywords, journal, authors
+    weights = (10.0, 1.0, 4.0, 2.0, 4.0)
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    def delete(self, keys):
+        if not keys:
+            return
+        placeholders = ', '.join(['%s'] * len(keys))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", list(keys))
+
+    def upsert(self, documents):
+        if not documents:
+            return
+        self.delete([key for key, _ in documents])
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, abstract, keywords, journal, authors) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [
+                    (key, doc['title'], doc['abstract'], doc['keywords'], doc['journal'], doc['authors'])
+                    for key, doc in documents
+                ],
+            )
+
+    def filter(self, queryset, kind, query):
+        # Quote every term so user input cannot inject FTS5 syntax, and
+        # prefix-match so partial words keep working as they did with icontains.
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in _query_terms(query))
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # bm25() is lower for better matches
+        return queryset.extra(
+            select={'search_rank': f"bm25({SEARCH_TABLE}, {weights})"},
+            tables=[SEARCH_TABLE],
+            where=[f"{SEARCH_TABLE} MATCH %s", *self._join(queryset, kind)],
+            params=[match],
+        ).order_by('search_rank', 'pk')
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted tsvector column with a GIN index, ranked with ts_rank_cd."""
+
+    indexed = True
+    key_column = 'id'
+
+    # The 'simple' configuration avoids stemming author and journal names
+    config = 'simple'
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+
+    def delete(self, keys):
+        if not keys:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE id = ANY(%s)", [list(keys)])
+
+    def upsert(self, documents):
+        if not documents:
+            return
+        config = self.config
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (id, document) VALUES (%s, "
+                f"setweight(to_tsvector('{config}', %s), 'A') || "
+                f"setweight(to_tsvector('{config}', %s), 'B') || "
+                f"setweight(to_tsvector('{config}', %s), 'B') || "
+                f"setweight(to_tsvector('{config}', %s), 'C') || "
+                f"setweight(to_tsvector('{config}', %s), 'D')) "
+                "ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+                [
+                    (key, doc['title'], doc['keywords'], doc['authors'], doc['journal'], doc['abstract'])
+                    for key, doc in documents
+                ],
+            )
+
+    def filter(self, queryset, kind, query):
+        tsquery = ' & '.join(f"{term}:*" for term in _query_terms(query))
+        to_tsquery = f"to_tsquery('{self.config}', %s)"
+        return queryset.extra(
+            select={'search_rank': f"ts_rank_cd({SEARCH_TABLE}.document, {to_tsquery})"},
+            select_params=[tsquery],
+            tables=[SEARCH_TABLE],
+            where=[f"{SEARCH_TABLE}.document @@ {to_tsquery}", *self._join(queryset, kind)],
+            params=[tsquery],
+        ).order_by('-search_rank', 'pk')
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    """Return the search backend for a database connection."""
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, SearchBackend)(connection)
+
+
+def index_publications(ids):
+    """Index the given publications, dropping any that no longer exist."""
+    from .models import Publication
+
+    backend = get_backend()
+    if not backend.is_available():
+        return
+    ids = set(ids)
+    publications = Publication.objects.filter(pk__in=ids).with_authors()
+    documents = [(document_key(PUBLICATION, pub.pk), publication_document(pub)) for pub in publications]
+    found = {pub.pk for pub in publications}
+    backend.delete([document_key(PUBLICATION, pk) for pk in ids - found])
+    backend.upsert(documents)
+
+
+def index_dissertations(ids):
+    """Index the given dissertations, dropping any that no longer exist."""
+    from .models import Dissertation
+
+    backend = get_backend()
+    if not backend.is_available():
+        return
+    ids = set(ids)
+    dissertations = (
+        Dissertation.objects.filter(pk__in=ids)
+        .select_related('author', 'promoter', 'supervisor')
+        .prefetch_related('copromoters')
+    )
+    documents = [(document_key(DISSERTATION, d.pk), dissertation_document(d)) for d in dissertations]
+    found = {d.pk for d in dissertations}
+    backend.delete([document_key(DISSERTATION, pk) for pk in ids - found])
+    backend.upsert(documents)
+
+
+def rebuild(chunk_size=500):
+    """
+    Rebuild the whole index.
+
+    Returns:
+        tuple: (publications indexed, dissertations indexed)
+    """
+    from .models import Publication, Dissertation
+
+    backend = get_backend()
+    if not backend.is_available():
+        return 0, 0
+    backend.clear()
+    counts = []
+    for model, index in ((Publication, index_publications), (Dissertation, index_dissertations)):
+        ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), chunk_size):
+            index(ids[start:start + chunk_size])
+        counts.append(len(ids))
+    return tuple(counts)
+
+
+def filter_queryset(queryset, kind, query):
+    """
+    Restrict a Publication or Dissertation queryset to search matches.
+
+    With an index, all matches are returned ordered by relevance, then id;
+    otherwise the title is matched with icontains and ordering is kept.
+    """
+    backend = get_backend()
+    if not backend.is_available():
+        # Also when the index table is missing, e.g. on SQLite without FTS5
+        backend = SearchBackend(backend.connection)
+    elif not _query_terms(query):
+        return queryset.none()
+    return backend.filter(queryset, kind, query)
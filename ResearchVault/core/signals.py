@@ -0,0 +1,141 @@
+"""
+Signal handlers that keep derived data in sync with the models.
+
+Changes are collected per thread and applied once the surrounding
+transaction commits, so saving a publication together with hundreds of
+AuthorOrder rows re-indexes it and refreshes its cached author list once
+instead of once per row. Any change also bumps the content version, which
+invalidates the cached pages (see caching.py).
+
+Pages answer conditional GETs based on updated_at, so a change to a person
+also touches updated_at of the dissertations and publications that show
+them but are not saved themselves.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, search
+from .models import AuthorOrder, Dissertation, Person, Publication
+
+_pending = threading.local()
+
+
+def _pending_ids(name):
+    if not hasattr(_pending, name):
+        setattr(_pending, name, set())
+    return getattr(_pending, name)
+
+
+def _flush():
+    author_ids = _pending_ids('authors')
+    publication_ids = _pending_ids('publications')
+    dissertation_ids = _pending_ids('dissertations')
+    invalidate = getattr(_pending, 'invalidate', False)
+    _pending.authors, _pending.publications, _pending.dissertations = set(), set(), set()
+    _pending.invalidate = False
+    if author_ids:
+        Publication.objects.filter(pk__in=author_ids).refresh_author_cache()
+    if publication_ids:
+        search.index_publications(publication_ids)
+    if dissertation_ids:
+        search.index_dissertations(dissertation_ids)
+    if invalidate or author_ids or publication_ids or dissertation_ids:
+        caching.bump_content_version()
+
+
+def _touch(queryset):
+    """Mark rows as changed without sending signals, for the updated_at based page validators."""
+    queryset.update(updated_at=timezone.now())
+
+
+def schedule_publications(ids):
+    """Re-index these publications when the current transaction commits."""
+    _pending_ids('publications').update(ids)
+    transaction.on_commit(_flush)
+
+
+def schedule_author_cache(ids):
+    """Refresh the cached author lists of these publications when the current transaction commits."""
+    _pending_ids('authors').update(ids)
+    transaction.on_commit(_flush)
+
+
+def schedule_dissertations(ids):
+    """Re-index these dissertations when the current transaction commits."""
+    _pending_ids('dissertations').update(ids)
+    transaction.on_commit(_flush)
+
+
+def schedule_cache_invalidation():
+    """Bump the content version when the current transaction commits."""
+    _pending.invalidate = True
+    transaction.on_commit(_flush)
+
+
+@receiver([post_save, post_delete], sender=Publication)
+def publication_changed(sender, instance, **kwargs):
+    schedule_publications([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=AuthorOrder)
+def author_order_changed(sender, instance, **kwargs):
+    schedule_author_cache([instance.publication_id])
+    schedule_publications([instance.publication_id])
+
+
+@receiver([post_save, post_delete], sender=Dissertation)
+def dissertation_changed(sender, instance, **kwargs):
+    schedule_dissertations([instance.pk])
+
+
+@receiver(m2m_changed, sender=Dissertation.copromoters.through)
+def copromoters_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # instance is a Person; after the clear its dissertations are unknown
+        ids = list(instance.copromoted_dissertations.values_list('pk', flat=True))
+    elif not action.startswith('post_') or (reverse and action == 'post_clear'):
+        return
+    elif reverse:
+        # instance is a Person and pk_set holds dissertation ids
+        ids = pk_set or []
+    else:
+        ids = [instance.pk]
+    _touch(Dissertation.objects.filter(pk__in=ids))
+    schedule_dissertations(ids)
+
+
+@receiver(pre_delete, sender=Person)
+def person_deleting(sender, instance, **kwargs):
+    # Their dissertations and publications as author are deleted with them, but
+    # those they co-promoted, supervised or corresponded for remain and change
+    _touch(Dissertation.objects.filter(Q(supervisor=instance) | Q(copromoters=instance)))
+    _touch(Publication.objects.filter(corresponding_author=instance))
+
+
+@receiver(post_delete, sender=Person)
+def person_deleted(sender, instance, **kwargs):
+    # Their author rows are deleted with them and send their own signals
+    schedule_cache_invalidation()
+
+
+@receiver(post_save, sender=Person)
+def person_changed(sender, instance, created, **kwargs):
+    # A new person has no publications yet; a renamed one changes author text
+    if created:
+        schedule_cache_invalidation()
+        return
+    publication_ids = list(AuthorOrder.objects.filter(person=instance).values_list('publication_id', flat=True))
+    schedule_author_cache(publication_ids)
+    schedule_publications(publication_ids)
+    # The author cache refresh touches the publications whose author list changed
+    _touch(Publication.objects.filter(corresponding_author=instance).exclude(pk__in=publication_ids))
+    dissertations = Dissertation.objects.filter(
+        Q(author=instance) | Q(promoter=instance) | Q(supervisor=instance) | Q(copromoters=instance)
+    )
+    _touch(dissertations)
+    schedule_dissertations(dissertations.values_list('pk', flat=True).distinct())
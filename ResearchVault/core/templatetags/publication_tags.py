@@ -0,0 +1,34 @@
+import re
+
+from django import template
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# A contribution marker at the end of an author in Publication.authors_display
+MARKER_PATTERN = re.compile(r'([*†#])(?=, |$)')
+
+
+@register.filter(needs_autoescape=True)
+def author_markers(value, autoescape=True):
+    """Render the contribution markers of a cached author list as superscripts."""
+    escape = conditional_escape if autoescape else (lambda text: text)
+    return mark_safe(MARKER_PATTERN.sub(r'<sup>\1</sup>', escape(value)))
+
+
+@register.filter
+def strip_author_markers(value):
+    """Return a cached author list without its contribution markers."""
+    return MARKER_PATTERN.sub('', value)
+
+
+@register.simple_tag(takes_context=True)
+def query_with(context, **changes):
+    """Return the current query string with some parameters replaced, or removed when None."""
+    params = context['request'].GET.copy()
+    for name, value in changes.items():
+        params.pop(name, None)
+        if value is not None and value != '':
+            params[name] = value
+    return params.urlencode()
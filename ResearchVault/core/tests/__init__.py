@@ -0,0 +1,13 @@
+"""
+Tests of the core app; run with ``python manage.py test core``.
+
+The page cache is file-based outside the tests, so test cases that go
+through it use ``TEST_CACHES`` to keep away from the development cache.
+"""
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'core-tests',
+    }
+}
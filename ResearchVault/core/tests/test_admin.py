@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import AuthorOrder, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES, REQUEST_METRICS_ENABLED=False)
+class PublicationAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.org', 'password'))
+
+    def test_changelist_shows_authors_without_markers(self):
+        ada = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        charles = Person.objects.create(first_name='Charles', last_name='Babbage')
+        with self.captureOnCommitCallbacks(execute=True):
+            publication = Publication.objects.create(title='Notes')
+            AuthorOrder.objects.create(publication=publication, person=ada, order=0, contribution_type='first')
+            AuthorOrder.objects.create(publication=publication, person=charles, order=1, contribution_type='last')
+        self.assertEqual(Publication.objects.get().authors_display, 'Ada Lovelace*, Charles Babbage†')
+
+        response = self.client.get(reverse('admin:core_publication_changelist'))
+        self.assertContains(response, '<td class="field-get_authors">Ada Lovelace, Charles Babbage</td>', html=True)
@@ -0,0 +1,135 @@
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.api import API_MAX_PAGE_SIZE
+from core.models import AuthorOrder, Dissertation, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES, PAGE_CACHE_TIMEOUT=0, REQUEST_METRICS_ENABLED=False)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.people = Person.objects.bulk_create(
+            Person(first_name=f"First{index}", last_name=f"Last{index}", email=f"p{index}@example.com")
+            for index in range(10)
+        )
+        cls.publications = Publication.objects.bulk_create(
+            Publication(
+                title=f"Publication {index:02}", publication_year=2000 + index % 5, doi=f"10.1/{index}",
+                doi_normalized=f"10.1/{index}", corresponding_author=cls.people[index % 10],
+            )
+            for index in range(60)
+        )
+        AuthorOrder.objects.bulk_create(
+            AuthorOrder(publication=publication, person=cls.people[(index + offset) % 10], order=offset)
+            for index, publication in enumerate(cls.publications)
+            for offset in range(3)
+        )
+        cls.dissertations = Dissertation.objects.bulk_create(
+            Dissertation(title=f"Dissertation {index}", author=cls.people[index], promoter=cls.people[0])
+            for index in range(1, 6)
+        )
+        for dissertation in cls.dissertations:
+            dissertation.copromoters.set(cls.people[6:8])
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'core:{name}', args=args), params)
+        return response, json.loads(response.content)
+
+    def queries(self, name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response, _ = self.get(name, **params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_the_page_size(self):
+        for name, include in (
+            ('api_publication_list', 'authors,corresponding_author'),
+            ('api_dissertation_list', 'author,promoter,copromoters'),
+            ('api_person_list', ''),
+        ):
+            with self.subTest(name=name):
+                small = self.queries(name, page_size=2, include=include)
+                large = self.queries(name, page_size=50, include=include)
+                self.assertEqual(small, large)
+                # Objects, a many-valued relation, and included people
+                self.assertLessEqual(large, 4)
+
+    def test_publication_list(self):
+        response, body = self.get('api_publication_list', page_size=5)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(body['data']), 5)
+        self.assertEqual(body['meta']['count'], 60)
+        self.assertIsNone(body['links']['previous'])
+        first = body['data'][0]
+        expected = Publication.objects.order_by('-publication_year', 'title', 'pk').first()
+        self.assertEqual(first['id'], expected.pk)
+        self.assertEqual([author['order'] for author in first['authors']], [0, 1, 2])
+
+    def test_cursor_links_cover_every_publication(self):
+        seen = []
+        response, body = self.get('api_publication_list', page_size=25)
+        while True:
+            seen += [item['id'] for item in body['data']]
+            if not body['links']['next']:
+                break
+            body = json.loads(self.client.get(body['links']['next']).content)
+        self.assertEqual(sorted(seen), sorted(publication.pk for publication in self.publications))
+
+    def test_fields_and_includes(self):
+        _, body = self.get('api_publication_list', fields='title', include='authors', page_size=1)
+        item = body['data'][0]
+        self.assertEqual(set(item), {'id', 'title'})
+        included = {person['id'] for person in body['included']['people']}
+        authors = AuthorOrder.objects.filter(publication_id=item['id']).values_list('person_id', flat=True)
+        self.assertEqual(included, set(authors))
+
+    def test_people_do_not_expose_email(self):
+        _, body = self.get('api_person_detail', self.people[0].pk)
+        self.assertNotIn('email', body['data'])
+        self.assertEqual(body['data']['last_name'], 'Last0')
+
+    def test_batch_by_ids_and_dois(self):
+        wanted = [self.publications[3].pk, 999999, self.publications[1].pk]
+        _, body = self.get('api_publication_list', ids=','.join(map(str, wanted)), fields='title')
+        self.assertEqual([item['id'] for item in body['data']], [wanted[0], wanted[2]])
+        self.assertEqual(body['meta']['missing'], [999999])
+
+        response = self.client.get(reverse('core:api_publication_list'), {
+            'doi': ['https://doi.org/10.1/7', '10.1/unknown'], 'fields': 'doi',
+        })
+        body = json.loads(response.content)
+        self.assertEqual([item['doi'] for item in body['data']], ['10.1/7'])
+        self.assertEqual(body['meta']['missing'], ['10.1/unknown'])
+
+    def test_dissertation_copromoters(self):
+        _, body = self.get('api_dissertation_detail', self.dissertations[0].pk)
+        self.assertCountEqual(body['data']['copromoters'], [self.people[6].pk, self.people[7].pk])
+
+    def test_page_size_is_capped(self):
+        _, body = self.get('api_publication_list', page_size=API_MAX_PAGE_SIZE + 50, fields='title')
+        self.assertEqual(len(body['data']), min(API_MAX_PAGE_SIZE, 60))
+
+    def test_errors_are_json(self):
+        for name, args, params, status in [
+            ('api_publication_list', [], {'fields': 'nope'}, 400),
+            ('api_publication_list', [], {'include': 'nope'}, 400),
+            ('api_publication_list', [], {'page_size': 'ten'}, 400),
+            ('api_publication_list', [], {'cursor': 'garbage'}, 400),
+            ('api_publication_list', [], {'ids': ','.join(['1'] * 101)}, 400),
+            ('api_publication_detail', [999999], {}, 404),
+        ]:
+            with self.subTest(name=name, params=params):
+                response, body = self.get(name, *args, **params)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', body)
+
+    def test_only_get_is_allowed(self):
+        response = self.client.post(reverse('core:api_publication_list'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import caching
+from core.models import AuthorOrder, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES, PAGE_CACHE_TIMEOUT=60, REQUEST_METRICS_ENABLED=False)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publication = Publication.objects.create(title='Analytical engines', publication_year=1843)
+            AuthorOrder.objects.create(publication=self.publication, person=self.author)
+
+    def test_cached_is_computed_once_per_content_version(self):
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)  # noqa: E731
+        self.assertEqual(caching.cached('value', compute), 1)
+        self.assertEqual(caching.cached('value', compute), 1)
+        caching.bump_content_version()
+        self.assertEqual(caching.cached('value', compute), 2)
+
+    def test_committed_changes_bump_the_content_version(self):
+        version = caching.content_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publication.title = 'Difference engines'
+            self.publication.save()
+        self.assertGreater(caching.content_version(), version)
+        self.assertIsNotNone(caching.content_changed_at())
+
+    def test_pages_are_served_from_the_cache_until_content_changes(self):
+        for url in [
+            reverse('core:home'),
+            reverse('core:publication_list'),
+            reverse('core:publication_detail', args=[self.publication.pk]),
+        ]:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertContains(self.client.get(url), 'Analytical engines')
+                with self.assertNumQueries(0):
+                    self.assertContains(self.client.get(url), 'Analytical engines')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publication.title = 'Difference engines'
+            self.publication.save()
+        response = self.client.get(reverse('core:publication_list'))
+        self.assertContains(response, 'Difference engines')
+        self.assertNotContains(response, 'Analytical engines')
+
+    def test_author_renames_reach_the_cached_cards(self):
+        url = reverse('core:publication_list')
+        self.assertContains(self.client.get(url), 'Lovelace')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.last_name = 'King'
+            self.author.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Ada King')
+        self.assertNotContains(response, 'Lovelace')
+
+    def test_requests_with_a_session_are_not_cached(self):
+        url = reverse('core:publication_list')
+        self.client.get(url)
+        self.client.cookies['sessionid'] = 'some-session'
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertTrue(queries)
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_page_cache_can_be_disabled(self):
+        url = reverse('core:publication_detail', args=[self.publication.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertTrue(queries)
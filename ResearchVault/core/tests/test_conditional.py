@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import AuthorOrder, Dissertation, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES, PAGE_MAX_AGE=120, REQUEST_METRICS_ENABLED=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        self.promoter = Person.objects.create(first_name='Charles', last_name='Babbage')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publication = Publication.objects.create(title='Analytical engines', publication_year=1843)
+            AuthorOrder.objects.create(publication=self.publication, person=self.author)
+            self.dissertation = Dissertation.objects.create(
+                title='On engines', author=self.author, promoter=self.promoter,
+            )
+        self.urls = [
+            reverse('core:publication_list'),
+            reverse('core:publication_list') + '?year=1843',
+            reverse('core:publication_detail', args=[self.publication.pk]),
+            reverse('core:dissertation_list'),
+            reverse('core:dissertation_detail', args=[self.dissertation.pk]),
+        ]
+
+    def edit(self, obj, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.save()
+
+    def test_pages_have_validators_and_are_public(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertTrue(response.has_header('Last-Modified'))
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('max-age=120', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_matching_etag_is_answered_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_if_modified_since(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                last_modified = self.client.get(url)['Last-Modified']
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT')
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_with_the_content(self):
+        detail = reverse('core:publication_detail', args=[self.publication.pk])
+        pages = {url: self.client.get(url)['ETag'] for url in [self.urls[0], detail]}
+        self.edit(self.publication, title='Difference engines')
+        for url, etag in pages.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Difference engines')
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_author_changes_change_the_publication_etag(self):
+        detail = reverse('core:publication_detail', args=[self.publication.pk])
+        etag = self.client.get(detail)['ETag']
+        self.edit(self.author, last_name='King')
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'King')
+
+    def test_list_etag_changes_on_additions_and_deletions(self):
+        url = reverse('core:publication_list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            added = Publication.objects.create(title='Sketch of the engine', publication_year=1842)
+        added_etag = self.client.get(url, HTTP_IF_NONE_MATCH=etag)['ETag']
+        self.assertNotEqual(added_etag, etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            added.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=added_etag).status_code, 200)
+
+    def test_requests_with_a_session_are_private_and_never_304(self):
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'session'
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_missing_objects_are_not_found(self):
+        for name in ('core:publication_detail', 'core:dissertation_detail'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[999999]), HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.has_header('ETag'))
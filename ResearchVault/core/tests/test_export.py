@@ -0,0 +1,125 @@
+import csv
+import datetime
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import export, search, signals
+from core.models import AuthorOrder, Person, Publication
+from core.tests import TEST_CACHES
+
+
+def render(format, queryset=None):
+    if queryset is None:
+        queryset = Publication.objects.all()
+    return ''.join(export.export_publications(queryset, format))
+
+
+@override_settings(CACHES=TEST_CACHES, REQUEST_METRICS_ENABLED=False)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        cls.charles = Person.objects.create(first_name='Charles', last_name='Babbage')
+        cls.article = Publication.objects.create(
+            title='Notes on {engines} & 50% of_everything', journal='Taylor #3', publication_year=1843,
+            publication_date=datetime.date(1843, 9, 1), volume='3', issue='1', pages='666 - 731',
+            doi='10.1000/notes', keywords='engines, notes',
+        )
+        AuthorOrder.objects.create(publication=cls.article, person=cls.ada, order=0)
+        AuthorOrder.objects.create(publication=cls.article, person=cls.charles, order=1)
+        cls.anonymous = Publication.objects.create(title='Untitled\nmemo', publication_year=1840)
+
+    def test_bibtex(self):
+        entries = render('bibtex').split('\n\n')
+        article = next(entry for entry in entries if 'Notes on' in entry)
+        self.assertTrue(article.startswith(f"@article{{lovelace1843_{self.article.pk},"))
+        self.assertIn("author = {Lovelace, Ada and Babbage, Charles},", article)
+        self.assertIn(r"title = {{Notes on \{engines\} \& 50\% of\_everything}},", article)
+        self.assertIn(r"journal = {Taylor \#3},", article)
+        self.assertIn("pages = {666--731},", article)
+        self.assertIn("doi = {10.1000/notes},", article)
+
+        memo = next(entry for entry in entries if 'memo' in entry)
+        self.assertTrue(memo.startswith(f"@misc{{anonymous1840_{self.anonymous.pk},"))
+        self.assertIn("title = {{Untitled memo}},", memo)
+        self.assertNotIn("author", memo)
+
+    def test_ris(self):
+        article = export.ris_record(Publication.objects.with_authors().get(pk=self.article.pk))
+        lines = article.rstrip('\n').splitlines()
+        self.assertEqual(lines[0], 'TY  - JOUR')
+        self.assertEqual(lines[1:3], ['AU  - Lovelace, Ada', 'AU  - Babbage, Charles'])
+        self.assertIn('DA  - 1843/09/01', lines)
+        self.assertIn('SP  - 666', lines)
+        self.assertIn('EP  - 731', lines)
+        self.assertEqual(lines[-3:], ['KW  - engines', 'KW  - notes', 'ER  - '])
+
+    def test_csl_json(self):
+        items = json.loads(render('csl-json'))
+        self.assertEqual(len(items), 2)
+        article = next(item for item in items if item['id'] == str(self.article.pk))
+        self.assertEqual(article['type'], 'article-journal')
+        self.assertEqual(article['author'], [
+            {'family': 'Lovelace', 'given': 'Ada'}, {'family': 'Babbage', 'given': 'Charles'},
+        ])
+        self.assertEqual(article['issued'], {'date-parts': [[1843, 9, 1]]})
+        self.assertEqual(article['DOI'], '10.1000/notes')
+        self.assertEqual(json.loads(render('csl-json', Publication.objects.none())), [])
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(render('csv'))))
+        self.assertEqual(len(rows), 2)
+        article = next(row for row in rows if row['id'] == str(self.article.pk))
+        self.assertEqual(list(article), export.CSV_COLUMNS)
+        self.assertEqual(article['authors'], 'Ada Lovelace; Charles Babbage')
+        self.assertEqual(article['title'], self.article.title)
+        memo = next(row for row in rows if row['id'] == str(self.anonymous.pk))
+        self.assertEqual(memo['title'], 'Untitled\nmemo')
+        self.assertEqual(memo['journal'], '')
+
+    def test_chunks_keep_the_order(self):
+        ordered = Publication.objects.order_by('-title')
+        for chunk_size in (1, 500):
+            items = json.loads(''.join(export.export_publications(ordered, 'csl-json', chunk_size)))
+            self.assertEqual([item['id'] for item in items], [str(self.anonymous.pk), str(self.article.pk)])
+
+    def test_view(self):
+        url = reverse('core:publication_export')
+        for name, export_format in export.FORMATS.items():
+            with self.subTest(format=name):
+                response = self.client.get(url, {'format': name})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.streaming)
+                self.assertEqual(response['Content-Type'], export_format.content_type)
+                self.assertEqual(
+                    response['Content-Disposition'],
+                    f'attachment; filename="publications.{export_format.extension}"',
+                )
+                self.assertEqual(b''.join(response.streaming_content).decode(), render(name))
+        self.assertEqual(self.client.get(url, {'format': 'docx'}).status_code, 404)
+
+    def test_view_filters(self):
+        response = self.client.get(reverse('core:publication_export'), {'format': 'csl-json', 'year': 1840})
+        items = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([item['id'] for item in items], [str(self.anonymous.pk)])
+
+    def test_search_exports_every_match(self):
+        if not search.get_backend().is_available():
+            self.skipTest("No full-text index on this database")
+        with self.captureOnCommitCallbacks(execute=True):
+            publications = Publication.objects.bulk_create(
+                Publication(title=f"Difference engine {index}") for index in range(1200)
+            )
+            signals.schedule_publications([publication.pk for publication in publications])
+
+        response = self.client.get(reverse('core:publication_export'), {'format': 'csv', 'search': 'difference'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1200)
+
+        output = io.StringIO()
+        call_command('export_publications', '--format', 'csv', '--search', 'difference', stdout=output)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(output.getvalue())))), 1200)
@@ -0,0 +1,160 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.http_fixtures import FixtureStore, RecordingAdapter, ReplayAdapter, _build_response, fixture_key
+from core.models import AuthorOrder, Person, Publication
+from core.tests import TEST_CACHES
+
+WORK_URL = 'https://api.crossref.org/works/{doi}'
+
+
+def crossref_work(doi, title):
+    return {'message': {
+        'DOI': doi,
+        'title': [title],
+        'container-title': ['Journal of Engines'],
+        'published-print': {'date-parts': [[1843, 9, 1]]},
+        'author': [
+            {'given': 'Ada', 'family': 'Lovelace', 'sequence': 'first'},
+            {'given': 'Charles', 'family': 'Babbage', 'sequence': 'additional'},
+        ],
+    }}
+
+
+@override_settings(CACHES=TEST_CACHES, HTTP_FIXTURES_MODE='replay')
+class FixtureReplayTests(TestCase):
+    """The importers run against recorded responses instead of the network."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name)
+        self.store = FixtureStore(self.path)
+        settings = override_settings(HTTP_FIXTURES_PATH=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def record_work(self, doi, title):
+        url = WORK_URL.format(doi=doi)
+        body = json.dumps(crossref_work(doi, title)).encode()
+        self.store.add(fixture_key('GET', url, '*/*'), url, 200, {'Content-Type': 'application/json'}, body)
+
+    def add_doi(self, *args):
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('add_doi', *args, '--no-cache', stdout=output)
+        return output.getvalue()
+
+    def test_add_doi_from_a_recorded_work(self):
+        self.record_work('10.1000/notes', 'Notes on the analytical engine')
+        output = self.add_doi('--doi', 'https://doi.org/10.1000/NOTES')
+        self.assertIn('Added publication', output)
+
+        publication = Publication.objects.get(doi_normalized='10.1000/notes')
+        self.assertEqual(publication.title, 'Notes on the analytical engine')
+        self.assertEqual(publication.journal, 'Journal of Engines')
+        self.assertEqual(publication.publication_year, 1843)
+        self.assertEqual(
+            [str(ao.person) for ao in AuthorOrder.objects.filter(publication=publication).order_by('order')],
+            ['Ada Lovelace', 'Charles Babbage'],
+        )
+
+    def test_unrecorded_work_imports_nothing(self):
+        with self.assertLogs('core.http_fixtures', 'WARNING'):
+            output = self.add_doi('--doi', '10.1000/unknown')
+        self.assertIn('Error adding publication', output)
+        self.assertFalse(Publication.objects.exists())
+        self.assertFalse(Person.objects.exists())
+
+    def test_csv_import_reuses_people_and_reports_misses(self):
+        for index in range(5):
+            self.record_work(f'10.1000/{index}', f'Work {index}')
+        csv_path = self.path / 'dois.csv'
+        csv_path.write_text('doi\n' + ''.join(f'10.1000/{index}\n' for index in range(6)), encoding='utf-8')
+
+        with self.assertLogs('core.http_fixtures', 'WARNING') as logs:
+            output = self.add_doi('--csv', str(csv_path), '--workers', '3', '--batch-size', '2')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('Successfully imported 5 publications', output)
+        self.assertIn('1 failed', output)
+        self.assertEqual(Publication.objects.count(), 5)
+        self.assertEqual(Person.objects.count(), 2)
+        self.assertEqual(AuthorOrder.objects.count(), 10)
+
+        # Importing again finds every DOI in the database without fetching it
+        output = self.add_doi('--csv', str(csv_path))
+        self.assertIn('5 already in the database', output)
+        self.assertEqual(Publication.objects.count(), 5)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReplayAdapterTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = FixtureStore(directory.name)
+        self.url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?term=engines&db=pubmed'
+        # Recorded with an API key, replayed without one, and with the parameters in another order
+        key = fixture_key('GET', self.url + '&api_key=secret', 'application/json')
+        self.store.add(key, self.url, 200, {'Content-Type': 'application/json'}, b'{"count": 1}')
+        logo = 'https://example.org/logo.png'
+        self.store.add(fixture_key('GET', logo, '*/*'), logo, 200, {}, b'\x89PNG\xff')
+
+    def session(self, adapter):
+        session = requests.Session()
+        session.mount('https://', adapter)
+        return session
+
+    def test_replays_recorded_responses(self):
+        adapter = ReplayAdapter(FixtureStore(self.store.path))
+        session = self.session(adapter)
+        url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?db=pubmed&term=engines'
+        response = session.get(url, headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 1})
+        self.assertEqual(session.get('https://example.org/logo.png').content, b'\x89PNG\xff')
+
+        # A different Accept header is a different recording
+        with self.assertLogs('core.http_fixtures', 'WARNING'):
+            self.assertEqual(session.get(url).status_code, 404)
+        self.assertEqual(adapter.stats.as_dict(), {'requests': 3, 'misses': 1, 'throttled': 0})
+
+    def test_rate_limit_answers_429(self):
+        adapter = ReplayAdapter(self.store, rate_limits={'eutils.ncbi.nlm.nih.gov': 2})
+        session = self.session(adapter)
+        headers = {'Accept': 'application/json'}
+        statuses = [session.get(self.url, headers=headers).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = session.get(self.url, headers=headers)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(adapter.stats.throttled, 2)
+        # Other hosts are not limited
+        self.assertEqual(session.get('https://example.org/logo.png').status_code, 200)
+
+    def test_recordings_do_not_contain_the_api_key(self):
+        adapter = RecordingAdapter(self.store)
+
+        def network(request, **kwargs):
+            return _build_response(adapter, request, 200, {'Content-Type': 'application/json'}, b'{"count": 2}')
+
+        url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi?db=pubmed&api_key=secret&id=1'
+        with mock.patch.object(HTTPAdapter, 'send', side_effect=network):
+            response = self.session(adapter).get(url)
+        self.assertEqual(response.json(), {'count': 2})
+
+        recorded = ''.join(path.read_text(encoding='utf-8') for path in Path(self.store.path).glob('*.jsonl'))
+        self.assertNotIn('secret', recorded)
+        self.assertNotIn('api_key', recorded)
+        self.assertIn('esummary.fcgi?db=pubmed&id=1', recorded)
+
+        # The recording is replayed for requests made with or without a key
+        replay = self.session(ReplayAdapter(FixtureStore(self.store.path)))
+        self.assertEqual(replay.get(url.replace('secret', 'other')).json(), {'count': 2})
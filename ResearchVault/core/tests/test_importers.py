@@ -0,0 +1,108 @@
+import io
+
+from django.db import models
+from django.test import TestCase, override_settings
+
+from core.importing import save_publication_batch
+from core.management.commands.fetch_publications import Command as FetchPublications
+from core.models import Person, Publication
+from core.pubmed import iter_pubmed_articles
+from core.tests import TEST_CACHES
+
+
+def assert_fits(test, instance):
+    """Fail if a string value is longer than its column allows, which PostgreSQL rejects."""
+    for field in instance._meta.get_fields():
+        if isinstance(field, models.CharField) and field.max_length:
+            value = getattr(instance, field.attname) or ''
+            test.assertLessEqual(len(value), field.max_length, field.name)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class OrcidWorkTests(TestCase):
+    def build(self, title='Title', journal='Journal', doi='10.1000/x', url='https://example.org/', contributors=()):
+        command = FetchPublications(stdout=io.StringIO())
+        parsed = {
+            'title': title,
+            'journal': journal,
+            'doi': doi,
+            'summary': {'url': {'value': url}, 'publication-date': {'year': {'value': '2020'}}},
+            'put_code': 1,
+        }
+        return command.build_orcid_publication(parsed, {'contributors': {'contributor': list(contributors)}})
+
+    def test_builds_publication_and_contributors(self):
+        publication, authors = self.build(contributors=[
+            {'credit-name': {'value': 'Ada King Lovelace'}, 'contributor-orcid': {'path': '0000-0002-1825-0097'}},
+            {'credit-name': {'value': 'Babbage'}},
+        ])
+        self.assertEqual(publication.publication_year, 2020)
+        self.assertEqual(publication.url, 'https://example.org/')
+        self.assertEqual(
+            [(a['first_name'], a['last_name'], a['orcid'], a['contribution_type']) for a in authors],
+            [('Ada King', 'Lovelace', '0000-0002-1825-0097', 'first'), ('', 'Babbage', '', 'last')],
+        )
+
+    def test_overlong_values_do_not_fail_the_batch(self):
+        publication, authors = self.build(
+            title='T' * 600, journal='J' * 300, doi='10.1000/' + 'd' * 200, url='https://example.org/' + 'u' * 300,
+            contributors=[{
+                'credit-name': {'value': 'F' * 150 + ' ' + 'L' * 150},
+                'contributor-orcid': {'path': 'https://orcid.org/0000-0002-1825-0097'},
+            }],
+        )
+        assert_fits(self, publication)
+        self.assertEqual(publication.title, 'T' * 500)
+        self.assertEqual(publication.url, '')
+        self.assertEqual(authors[0], {
+            'first_name': 'F' * 100, 'last_name': 'L' * 100, 'orcid': '',
+            'contribution_type': 'first', 'corresponding': False,
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            saved = save_publication_batch([(publication, authors)])
+        self.assertEqual(len(saved), 1)
+        assert_fits(self, Person.objects.get())
+        self.assertEqual(Publication.objects.get().journal, 'J' * 255)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PubmedParserTests(TestCase):
+    ARTICLE = """<?xml version="1.0"?>
+<PubmedArticleSet><PubmedArticle>
+  <MedlineCitation><PMID>123</PMID><Article>
+    <Journal><Title>Journal of Engines</Title>
+      <JournalIssue><Volume>3</Volume><PubDate><Year>1843</Year><Month>Sep</Month></PubDate></JournalIssue>
+    </Journal>
+    <ArticleTitle>Notes on the <i>analytical</i> engine</ArticleTitle>
+    <AuthorList>
+      <Author><LastName>{last_name}</LastName><ForeName>{fore_name}</ForeName>
+        <Identifier Source="ORCID">https://orcid.org/0000-0002-1825-0097</Identifier>
+        <AffiliationInfo><Affiliation>{affiliation}</Affiliation></AffiliationInfo>
+      </Author>
+      <Author><CollectiveName>The Engine Consortium</CollectiveName></Author>
+    </AuthorList>
+  </Article></MedlineCitation>
+  <PubmedData><ArticleIdList><ArticleId IdType="doi">10.1000/notes</ArticleId></ArticleIdList></PubmedData>
+</PubmedArticle></PubmedArticleSet>"""
+
+    def parse(self, last_name='Lovelace', fore_name='Ada', affiliation='London'):
+        xml = self.ARTICLE.format(last_name=last_name, fore_name=fore_name, affiliation=affiliation)
+        return list(iter_pubmed_articles(io.BytesIO(xml.encode())))
+
+    def test_parses_article(self):
+        [article] = self.parse()
+        self.assertEqual(article['pmid'], '123')
+        self.assertEqual(article['title'], 'Notes on the analytical engine')
+        self.assertEqual((article['year'], article['month'], article['day']), (1843, 9, None))
+        self.assertEqual(article['doi'], '10.1000/notes')
+        self.assertEqual(article['authors'], [{
+            'first_name': 'Ada', 'last_name': 'Lovelace', 'orcid': '0000-0002-1825-0097', 'affiliation': 'London',
+        }])
+
+    def test_truncates_author_values(self):
+        [article] = self.parse(last_name='L' * 150, fore_name='F' * 150, affiliation='A' * 300)
+        author = article['authors'][0]
+        self.assertEqual(author['last_name'], 'L' * 100)
+        self.assertEqual(author['first_name'], 'F' * 100)
+        self.assertEqual(author['affiliation'], 'A' * 255)
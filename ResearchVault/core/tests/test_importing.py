@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core.importing import PersonResolver, normalize_name, save_publication_batch
+from core.models import AuthorOrder, Person, Publication
+from core.tests import TEST_CACHES
+
+
+def author(first_name, last_name, **extra):
+    return {'first_name': first_name, 'last_name': last_name, **extra}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class NormalizeNameTests(TestCase):
+    def test_ignores_case_accents_dots_and_spacing(self):
+        self.assertEqual(normalize_name('J.  Émile', 'SMITH'), normalize_name('j emile', 'smith'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PersonResolverTests(TestCase):
+    def test_matches_existing_people_by_name(self):
+        smith = Person.objects.create(first_name='John', last_name='Smith')
+        oster = Person.objects.create(first_name='Émile', last_name='Øster')
+        people = PersonResolver().resolve([author('john', 'SMITH'), author('Emile', 'Øster')])
+        self.assertEqual(people, [smith, oster])
+        self.assertEqual(Person.objects.count(), 2)
+
+    def test_matches_on_orcid_before_name(self):
+        person = Person.objects.create(first_name='Jane', last_name='Doe', orcid='0000-0002-1825-0097')
+        people = PersonResolver().resolve([author('J.', 'Doe-Smith', orcid='0000-0002-1825-0097')])
+        self.assertEqual(people, [person])
+
+    def test_creates_a_missing_person_once(self):
+        resolver = PersonResolver()
+        people = resolver.resolve([author('Ann', 'New'), author('ann', 'new')])
+        self.assertEqual(Person.objects.filter(last_name='New').count(), 1)
+        self.assertEqual(people[0], people[1])
+
+    def test_remembers_people_across_batches(self):
+        resolver = PersonResolver()
+        first = resolver.resolve([author('Ann', 'New'), author('Bob', 'Old')])
+        with self.assertNumQueries(0):
+            second = resolver.resolve([author('Bob', 'Old'), author('Ann', 'New')])
+        self.assertEqual(second, first[::-1])
+
+    def test_looks_up_names_in_chunks(self):
+        Person.objects.create(first_name='Ann', last_name='Name7')
+        authors = [author('Ann', f'Name{i}') for i in range(25)]
+        with mock.patch('core.importing.LOOKUP_CHUNK_SIZE', 10):
+            # Three lookups of at most 10 last names, then one insert
+            with self.assertNumQueries(4):
+                people = PersonResolver().resolve(authors)
+        self.assertEqual(Person.objects.count(), 25)
+        self.assertEqual(people[7], Person.objects.get(last_name='Name7'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SavePublicationBatchTests(TestCase):
+    def record(self, title, doi='', authors=()):
+        return Publication(title=title, doi=doi), list(authors)
+
+    def test_saves_publications_with_ordered_authors(self):
+        inserted = save_publication_batch([
+            self.record('First', '10.1/a', [
+                author('Ann', 'Alpha', contribution_type='first'),
+                author('Bob', 'Beta', corresponding=True),
+                author('Cid', 'Gamma', contribution_type='last'),
+            ]),
+            self.record('Second', authors=[author('Bob', 'Beta')]),
+        ])
+        self.assertEqual([publication.title for publication in inserted], ['First', 'Second'])
+
+        first = Publication.objects.get(title='First')
+        self.assertEqual([person.last_name for person in first.get_ordered_authors()], ['Alpha', 'Beta', 'Gamma'])
+        self.assertEqual(first.corresponding_author.last_name, 'Beta')
+        self.assertEqual(first.authors_display, 'Ann Alpha*, Bob Beta, Cid Gamma†')
+        self.assertTrue(first.has_first_authors())
+        self.assertTrue(first.has_last_authors())
+        # The same Bob Beta on both publications
+        self.assertEqual(Person.objects.filter(last_name='Beta').count(), 1)
+
+    def test_skips_dois_already_in_the_database_or_the_batch(self):
+        Publication.objects.create(title='Existing', doi='10.1/existing')
+        inserted = save_publication_batch([
+            self.record('Again', 'https://doi.org/10.1/EXISTING', [author('Ann', 'Skipped')]),
+            self.record('New', '10.1/new', [author('Bob', 'Kept')]),
+            self.record('New again', 'doi:10.1/new', [author('Cid', 'Skipped')]),
+        ])
+        self.assertEqual([publication.title for publication in inserted], ['New'])
+        self.assertEqual(Publication.objects.filter(doi_normalized='10.1/new').get().title, 'New')
+        # Authors of skipped publications are not created
+        self.assertFalse(Person.objects.filter(last_name='Skipped').exists())
+
+    def test_links_a_repeated_author_once(self):
+        save_publication_batch([self.record('Repeat', authors=[author('Ann', 'Same'), author('ann', 'same')])])
+        self.assertEqual(AuthorOrder.objects.filter(publication__title='Repeat').count(), 1)
+
+    def test_empty_batch(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(save_publication_batch([]), [])
+
+    def test_failed_batch_rolls_back_and_resets_the_resolver(self):
+        resolver = PersonResolver()
+        with mock.patch.object(AuthorOrder.objects, 'bulk_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                save_publication_batch([self.record('Lost', '10.1/lost', [author('Ann', 'Gone')])], resolver)
+        self.assertFalse(Publication.objects.filter(title='Lost').exists())
+        self.assertFalse(Person.objects.filter(last_name='Gone').exists())
+        # The person created in the rolled-back transaction is created again
+        save_publication_batch([self.record('Found', '10.1/lost', [author('Ann', 'Gone')])], resolver)
+        self.assertEqual(Publication.objects.get(doi_normalized='10.1/lost').get_ordered_authors()[0].last_name, 'Gone')
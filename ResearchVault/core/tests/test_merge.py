@@ -0,0 +1,127 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import search
+from core.filters import filter_dissertations, filter_publications
+from core.merge import merge_people
+from core.models import AuthorOrder, Dissertation, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MergePeopleTests(TestCase):
+    def setUp(self):
+        self.primary = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        self.duplicate = Person.objects.create(
+            first_name='Augusta', last_name='King', orcid='0000-0002-1825-0097', email='ada@example.org',
+        )
+        self.babbage = Person.objects.create(first_name='Charles', last_name='Babbage')
+        self.menabrea = Person.objects.create(first_name='Luigi', last_name='Menabrea')
+
+    def create_publication(self, title, *authors, **fields):
+        """Create a publication with (person, contribution type) authors in order."""
+        with self.captureOnCommitCallbacks(execute=True):
+            publication = Publication.objects.create(title=title, **fields)
+            AuthorOrder.objects.bulk_create(
+                AuthorOrder(publication=publication, person=person, order=order, contribution_type=contribution_type)
+                for order, (person, contribution_type) in enumerate(authors)
+            )
+            # bulk_create sends no signals
+            Publication.objects.filter(pk=publication.pk).refresh_author_cache()
+        return publication
+
+    def merge(self, *duplicates):
+        with self.captureOnCommitCallbacks(execute=True):
+            return merge_people(self.primary, duplicates or [self.duplicate])
+
+    def authors(self, publication):
+        return list(
+            AuthorOrder.objects.filter(publication=publication).order_by('order')
+            .values_list('person__last_name', 'order', 'contribution_type')
+        )
+
+    def test_publication_authored_by_both_keeps_the_earliest_position(self):
+        publication = self.create_publication(
+            'Sketch of the analytical engine',
+            (self.babbage, 'first'), (self.duplicate, 'corresponding'), (self.primary, 'normal'),
+            (self.menabrea, 'last'),
+        )
+        self.assertEqual(self.merge(), 1)
+        # The remaining authors are numbered without a gap
+        self.assertEqual(self.authors(publication), [
+            ('Babbage', 0, 'first'), ('Lovelace', 1, 'corresponding'), ('Menabrea', 2, 'last'),
+        ])
+        self.assertFalse(Person.objects.filter(pk=self.duplicate.pk).exists())
+
+    def test_publications_of_the_duplicate_only_are_moved(self):
+        publication = self.create_publication(
+            'Notes', (self.duplicate, 'first'), (self.babbage, 'normal'),
+            corresponding_author=self.duplicate,
+        )
+        other = self.create_publication('Other', (self.babbage, 'first'), (self.menabrea, 'normal'))
+        self.merge()
+        self.assertEqual(self.authors(publication), [('Lovelace', 0, 'first'), ('Babbage', 1, 'normal')])
+        self.assertEqual(Publication.objects.get(pk=publication.pk).corresponding_author, self.primary)
+        self.assertEqual(self.authors(other), [('Babbage', 0, 'first'), ('Menabrea', 1, 'normal')])
+
+    def test_dissertation_roles_and_copromoters(self):
+        dissertation = Dissertation.objects.create(title='On engines', author=self.duplicate, promoter=self.babbage)
+        dissertation.copromoters.set([self.primary, self.duplicate, self.menabrea])
+        promoted = Dissertation.objects.create(title='On tables', author=self.menabrea, promoter=self.duplicate)
+        promoted.copromoters.set([self.duplicate])
+        self.merge()
+
+        dissertation.refresh_from_db()
+        self.assertEqual(dissertation.author, self.primary)
+        self.assertCountEqual(dissertation.copromoters.all(), [self.primary, self.menabrea])
+        promoted.refresh_from_db()
+        self.assertEqual(promoted.promoter, self.primary)
+        self.assertEqual(list(promoted.copromoters.all()), [self.primary])
+
+    def test_primary_takes_missing_contact_details(self):
+        self.primary.affiliation = 'London'
+        self.primary.save()
+        self.merge()
+        self.primary.refresh_from_db()
+        self.assertEqual(self.primary.orcid, '0000-0002-1825-0097')
+        self.assertEqual(self.primary.email, 'ada@example.org')
+        self.assertEqual(self.primary.affiliation, 'London')
+
+    def test_author_cache_and_search_index_are_refreshed(self):
+        publication = self.create_publication(
+            'Notes', (self.babbage, 'first'), (self.duplicate, 'normal'), (self.primary, 'last'),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            dissertation = Dissertation.objects.create(title='On engines', author=self.duplicate, promoter=self.babbage)
+        self.merge()
+
+        publication.refresh_from_db()
+        self.assertEqual(publication.authors_display, 'Charles Babbage*, Ada Lovelace')
+        if not search.get_backend().is_available():
+            return
+        publications = Publication.objects.all()
+        self.assertEqual(list(filter_publications(publications, {'search': 'king'})), [])
+        self.assertEqual(list(filter_publications(publications, {'search': 'lovelace'})), [publication])
+        dissertations = Dissertation.objects.all()
+        self.assertEqual(list(filter_dissertations(dissertations, {'search': 'augusta'})), [])
+        self.assertEqual(list(filter_dissertations(dissertations, {'search': 'ada'})), [dissertation])
+
+    def test_query_count_does_not_grow_with_the_publications(self):
+        def queries(publications):
+            duplicate = Person.objects.create(first_name='A.', last_name='Lovelace')
+            for index in range(publications):
+                self.create_publication(f'Shared {index}', (duplicate, 'first'), (self.primary, 'last'))
+                self.create_publication(f'Own {index}', (self.babbage, 'first'), (duplicate, 'normal'))
+            Dissertation.objects.create(title='On engines', author=duplicate, promoter=self.babbage)
+            with CaptureQueriesContext(connection) as captured:
+                with self.captureOnCommitCallbacks(execute=True):
+                    merge_people(self.primary, [duplicate])
+            return len(captured)
+
+        self.assertEqual(queries(2), queries(20))
+
+    def test_nothing_to_merge(self):
+        self.assertEqual(merge_people(self.primary, [self.primary]), 0)
+        self.assertEqual(merge_people(self.primary, [999999]), 0)
+        self.assertEqual(Person.objects.count(), 4)
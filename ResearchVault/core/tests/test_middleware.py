@@ -0,0 +1,70 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import AuthorOrder, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(
+    CACHES=TEST_CACHES, PAGE_CACHE_TIMEOUT=0, REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SERVER_TIMING=True,
+    REQUEST_METRICS_SLOW_REQUEST_MS=60000, REQUEST_METRICS_MAX_QUERIES=50, REQUEST_METRICS_MAX_REPEATED_QUERIES=10,
+)
+class RequestMetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ada = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        for index in range(3):
+            publication = Publication.objects.create(title=f'Notes {index}', publication_year=1843)
+            AuthorOrder.objects.create(publication=publication, person=ada)
+
+    def get(self, url, **params):
+        """Return the response and the metrics logged for it."""
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            response = self.client.get(url, params)
+            if response.streaming:
+                response.content_bytes = b''.join(response.streaming_content)
+        self.assertEqual(len(logs.records), 1)
+        return response, logs.records[0]
+
+    def test_records_queries_and_template_queries(self):
+        response, record = self.get(reverse('core:home'))
+        metrics = record.metrics
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertEqual(metrics['view'], 'core:home')
+        self.assertEqual(metrics['status'], 200)
+        # The home page's lists are evaluated by the template
+        self.assertGreater(metrics['queries'], metrics['template_queries'])
+        self.assertGreater(metrics['template_queries'], 0)
+        self.assertEqual(metrics['response_bytes'], len(response.content))
+        self.assertFalse(metrics['streamed'])
+        self.assertIn(f'desc="{metrics["queries"]} queries"', response['Server-Timing'])
+
+    def test_flags_requests_over_the_thresholds(self):
+        with self.settings(REQUEST_METRICS_MAX_QUERIES=1, REQUEST_METRICS_SLOW_REQUEST_MS=-1):
+            _, record = self.get(reverse('core:home'))
+        self.assertEqual(record.levelname, 'WARNING')
+        self.assertEqual(record.metrics['flags'], ['slow', 'too_many_queries'])
+
+    def test_streamed_responses_are_measured_when_the_stream_ends(self):
+        url = reverse('core:publication_export')
+        with self.assertNoLogs('core.performance'):
+            response = self.client.get(url, {'format': 'csv'})
+        response, record = self.get(url, format='csv')
+        metrics = record.metrics
+        self.assertTrue(metrics['streamed'])
+        self.assertEqual(metrics['response_bytes'], len(response.content_bytes))
+        self.assertIn('Notes 2', response.content_bytes.decode())
+        # Publications and their prefetched authors are read while streaming
+        self.assertGreaterEqual(metrics['queries'], 2)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_server_timing_can_be_turned_off(self):
+        with self.settings(REQUEST_METRICS_SERVER_TIMING=False):
+            response, _ = self.get(reverse('core:home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        with self.assertNoLogs('core.performance'):
+            response = self.client.get(reverse('core:home'))
+        self.assertFalse(response.has_header('Server-Timing'))
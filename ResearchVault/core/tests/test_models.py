@@ -0,0 +1,97 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+
+from core.models import Publication, normalize_doi
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES)
+class NormalizeDoiTests(TestCase):
+    def test_strips_resolver_and_scheme_prefixes(self):
+        for doi in [
+            '10.1000/ABC',
+            'https://doi.org/10.1000/abc',
+            'http://dx.doi.org/10.1000/abc',
+            'https://www.doi.org/10.1000/abc',
+            'doi: 10.1000/abc',
+            'DOI:10.1000/abc',
+            '  10.1000/abc  ',
+        ]:
+            with self.subTest(doi=doi):
+                self.assertEqual(normalize_doi(doi), '10.1000/abc')
+
+    def test_unescapes_url_encoding(self):
+        self.assertEqual(normalize_doi('https://doi.org/10.1000%2Fa%28b%29'), '10.1000/a(b)')
+
+    def test_empty(self):
+        self.assertEqual(normalize_doi(None), '')
+        self.assertEqual(normalize_doi('  '), '')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PublicationDoiTests(TestCase):
+    def test_save_sets_the_normalized_key(self):
+        publication = Publication.objects.create(title='A', doi='https://doi.org/10.1000/ABC')
+        self.assertEqual(publication.doi_normalized, '10.1000/abc')
+
+    def test_no_doi_is_stored_as_null(self):
+        first = Publication.objects.create(title='A')
+        second = Publication.objects.create(title='B', doi='  ')
+        self.assertIsNone(first.doi_normalized)
+        self.assertIsNone(second.doi_normalized)
+
+    def test_update_fields_with_doi_also_writes_the_key(self):
+        publication = Publication.objects.create(title='A')
+        publication.doi = '10.1000/new'
+        publication.save(update_fields=['doi'])
+        publication.refresh_from_db()
+        self.assertEqual(publication.doi_normalized, '10.1000/new')
+
+    def test_duplicate_doi_in_another_form_is_rejected(self):
+        Publication.objects.create(title='A', doi='10.1000/abc')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Publication.objects.create(title='B', doi='doi:10.1000/ABC')
+
+    def test_clean_rejects_a_duplicate_doi(self):
+        Publication.objects.create(title='A', doi='10.1000/abc')
+        with self.assertRaises(ValidationError) as raised:
+            Publication(title='B', doi='https://doi.org/10.1000/abc').full_clean()
+        self.assertIn('doi', raised.exception.message_dict)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LegacyDuplicateDoiTests(TestCase):
+    """Duplicates that migration 0013 left with doi_normalized=NULL."""
+
+    def setUp(self):
+        self.original = Publication.objects.create(title='Original', doi='10.1000/abc')
+        self.duplicate = Publication.objects.create(title='Duplicate')
+        Publication.objects.filter(pk=self.duplicate.pk).update(doi='https://doi.org/10.1000/ABC')
+        self.duplicate.refresh_from_db()
+
+    def test_editing_another_field_keeps_it_outside_the_unique_key(self):
+        self.duplicate.title = 'Duplicate, edited'
+        self.duplicate.full_clean()
+        self.duplicate.save()
+        self.duplicate.refresh_from_db()
+        self.assertEqual(self.duplicate.title, 'Duplicate, edited')
+        self.assertIsNone(self.duplicate.doi_normalized)
+
+    def test_changing_to_a_free_doi_takes_its_key(self):
+        self.duplicate.doi = '10.1000/other'
+        self.duplicate.save()
+        self.duplicate.refresh_from_db()
+        self.assertEqual(self.duplicate.doi_normalized, '10.1000/other')
+
+    def test_clean_rejects_changing_to_another_held_doi(self):
+        Publication.objects.create(title='Third', doi='10.1000/third')
+        self.duplicate.doi = '10.1000/third'
+        with self.assertRaises(ValidationError):
+            self.duplicate.full_clean()
+
+    def test_original_keeps_its_key_when_saved(self):
+        self.original.title = 'Original, edited'
+        self.original.save()
+        self.original.refresh_from_db()
+        self.assertEqual(self.original.doi_normalized, '10.1000/abc')
@@ -0,0 +1,104 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Dissertation, Person, Publication
+from core.pagination import InvalidCursor, KeysetPaginator
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated years and titles, and publications without a year
+        years = [2020, 2020, None, 2019, None, 2021, 2019, 2020, None, 2018, 2021]
+        Publication.objects.bulk_create(
+            Publication(title=f"Title {index % 4}", publication_year=year)
+            for index, year in enumerate(years * 2)
+        )
+
+    def expected(self, ordering):
+        return list(Publication.objects.order_by(*ordering, 'pk').values_list('pk', flat=True))
+
+    def walk_forward(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_and_backward_follow_the_ordering(self):
+        for ordering in (['-publication_year', 'title'], ['publication_year', '-title']):
+            with self.subTest(ordering=ordering):
+                paginator = KeysetPaginator(Publication.objects.all(), 4, ordering, count=False)
+                pages = self.walk_forward(paginator)
+                forward = [obj.pk for page in pages for obj in page]
+                self.assertEqual(forward, self.expected(ordering))
+                self.assertFalse(pages[0].has_previous())
+                self.assertTrue(all(len(page) == 4 for page in pages[:-1]))
+
+                # Back from the last page to the first
+                backward = [[obj.pk for obj in pages[-1]]]
+                page = pages[-1]
+                while page.has_previous():
+                    page = paginator.page(page.previous_cursor)
+                    self.assertTrue(page.has_next())
+                    backward.insert(0, [obj.pk for obj in page])
+                self.assertEqual(backward, [[obj.pk for obj in page] for page in pages])
+
+    def test_page_size_larger_than_the_table(self):
+        page = KeysetPaginator(Publication.objects.all(), 100, ['-publication_year', 'title']).page()
+        self.assertEqual(len(page), Publication.objects.count())
+        self.assertFalse(page.has_other_pages())
+        self.assertIsNone(page.next_cursor)
+
+    def test_count_is_the_number_of_rows(self):
+        paginator = KeysetPaginator(Publication.objects.filter(publication_year=2020), 4, ['title'])
+        self.assertEqual(paginator.count, 6)
+        self.assertIsNone(KeysetPaginator(Publication.objects.all(), 4, ['title'], count=False).count)
+
+    def test_cursors_cannot_be_forged_or_reused_with_another_ordering(self):
+        paginator = KeysetPaginator(Publication.objects.all(), 4, ['-publication_year', 'title'])
+        cursor = paginator.page().next_cursor
+        other = KeysetPaginator(Publication.objects.all(), 4, ['publication_year', 'title'])
+        for bad in ['garbage', cursor[:-2] + 'xx', None]:
+            with self.subTest(cursor=bad), self.assertRaises(InvalidCursor):
+                other.page(bad or cursor)
+
+
+@override_settings(CACHES=TEST_CACHES, KEYSET_PAGINATION=True, REQUEST_METRICS_ENABLED=False)
+class KeysetListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Publication.objects.bulk_create(
+            Publication(title=f"Publication {index:02}", publication_year=2000 + index % 3 if index % 5 else None)
+            for index in range(25)
+        )
+        person = Person.objects.create(first_name='Ada', last_name='Lovelace')
+        Dissertation.objects.bulk_create(
+            Dissertation(title=f"Dissertation {index:02}", author=person, promoter=person) for index in range(12)
+        )
+
+    def test_lists_are_paged_by_cursor(self):
+        for name, model in (('core:publication_list', Publication), ('core:dissertation_list', Dissertation)):
+            with self.subTest(name=name):
+                url = reverse(name)
+                seen = []
+                response = self.client.get(url)
+                while True:
+                    self.assertTrue(response.context['keyset_pagination'])
+                    page = response.context['page_obj']
+                    seen += [obj.pk for obj in page]
+                    if not page.has_next():
+                        break
+                    response = self.client.get(url, {'cursor': page.next_cursor})
+                self.assertEqual(seen, list(model.objects.values_list('pk', flat=True).order_by(
+                    *model._meta.ordering, 'pk'
+                )))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('core:publication_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_search_falls_back_to_numbered_pages(self):
+        response = self.client.get(reverse('core:publication_list'), {'search': 'publication'})
+        self.assertFalse(response.context['keyset_pagination'])
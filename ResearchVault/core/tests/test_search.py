@@ -0,0 +1,105 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core import search
+from core.filters import filter_dissertations, filter_publications
+from core.models import AuthorOrder, Dissertation, Person, Publication
+from core.tests import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchTests(TestCase):
+    """Search through the index, kept up to date by the signal handlers once transactions commit."""
+
+    def setUp(self):
+        if not search.get_backend().is_available():
+            self.skipTest("No full-text index on this database")
+        self.author = Person.objects.create(first_name='Ada', last_name='Lovelace')
+
+    def create_publication(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            publication = Publication.objects.create(**fields)
+            AuthorOrder.objects.create(publication=publication, person=self.author)
+        return publication
+
+    def search_publications(self, query, **params):
+        return list(filter_publications(Publication.objects.all(), {'search': query, **params}))
+
+    def test_finds_new_publications_by_title_author_and_prefix(self):
+        publication = self.create_publication(title='Analytical engines', journal='Notes')
+        self.assertEqual(self.search_publications('analytical'), [publication])
+        self.assertEqual(self.search_publications('lovelace'), [publication])
+        self.assertEqual(self.search_publications('engin'), [publication])
+        self.assertEqual(self.search_publications('difference'), [])
+
+    def test_ranks_title_matches_first(self):
+        in_abstract = self.create_publication(title='On numbers', abstract='About engines.')
+        in_title = self.create_publication(title='Engines', abstract='About numbers.')
+        self.assertEqual(self.search_publications('engines'), [in_title, in_abstract])
+
+    def test_reindexes_when_a_publication_or_author_changes(self):
+        publication = self.create_publication(title='Analytical engines')
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.title = 'Difference engines'
+            publication.save()
+        self.assertEqual(self.search_publications('analytical'), [])
+        self.assertEqual(self.search_publications('difference'), [publication])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.last_name = 'King'
+            self.author.save()
+        self.assertEqual(self.search_publications('lovelace'), [])
+        self.assertEqual(self.search_publications('king'), [publication])
+
+    def test_deleted_publications_leave_the_index(self):
+        publication = self.create_publication(title='Analytical engines')
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.delete()
+        self.assertEqual(self.search_publications('analytical'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {search.SEARCH_TABLE}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_combines_with_the_other_filters(self):
+        old = self.create_publication(title='Engines', publication_year=1843)
+        self.create_publication(title='Engines', publication_year=1990)
+        self.assertEqual(self.search_publications('engines', year='1843'), [old])
+
+    def test_returns_every_match(self):
+        publications = Publication.objects.bulk_create(
+            Publication(title=f'Engine {number}') for number in range(1200)
+        )
+        search.index_publications([publication.pk for publication in publications])
+        queryset = filter_publications(Publication.objects.all(), {'search': 'engine'})
+        self.assertEqual(queryset.count(), 1200)
+        self.assertEqual(len(queryset[1190:1200]), 10)
+
+    def test_search_syntax_in_queries_is_literal(self):
+        publication = self.create_publication(title='Engines "of" AND OR NOT (the) future*')
+        for query in ['"of', 'AND OR', 'NOT (the)', 'future*', 'engines -the', 'engines:']:
+            with self.subTest(query=query):
+                self.assertIn(publication, self.search_publications(query))
+        self.assertEqual(self.search_publications('***'), [])
+
+    def test_finds_dissertations_by_their_people(self):
+        student = Person.objects.create(first_name='Charles', last_name='Babbage')
+        with self.captureOnCommitCallbacks(execute=True):
+            dissertation = Dissertation.objects.create(title='On engines', author=student, promoter=self.author)
+        found = filter_dissertations(Dissertation.objects.all(), {'search': 'lovelace'})
+        self.assertEqual(list(found), [dissertation])
+        self.assertEqual(self.search_publications('babbage'), [])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FallbackSearchTests(TestCase):
+    """Without an index table, titles are matched with icontains."""
+
+    def test_matches_titles_and_keeps_the_ordering(self):
+        old = Publication.objects.create(title='Analytical Engines', publication_year=1843)
+        new = Publication.objects.create(title='Engines of the future', publication_year=1990)
+        Publication.objects.create(title='Difference tables', publication_year=1822)
+        backend = search.SearchBackend(connection)
+        queryset = Publication.objects.order_by('-publication_year')
+        found = backend.filter(queryset, search.PUBLICATION, 'engines')
+        self.assertEqual(list(found), [new, old])
+        self.assertEqual({publication.search_rank for publication in found}, {0})
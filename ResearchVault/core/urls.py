@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'core'
 
@@ -9,8 +9,20 @@ urlpatterns = [
     # Publication URLs
     path('publications/', views.PublicationListView.as_view(), name='publication_list'),
     path('publications/<int:pk>/', views.PublicationDetailView.as_view(), name='publication_detail'),
+    path('publications/export/', views.publication_export, name='publication_export'),
     
     # Dissertation URLs
     path('dissertations/', views.DissertationListView.as_view(), name='dissertation_list'),
     path('dissertations/<int:pk>/', views.DissertationDetailView.as_view(), name='dissertation_detail'),
+    
+    # Autocomplete URLs
+    path('people/autocomplete/', views.author_autocomplete, name='author_autocomplete'),
+    
+    # JSON API (see core/api.py)
+    path('api/v1/publications/', api.publication_list, name='api_publication_list'),
+    path('api/v1/publications/<int:pk>/', api.publication_detail, name='api_publication_detail'),
+    path('api/v1/people/', api.person_list, name='api_person_list'),
+    path('api/v1/people/<int:pk>/', api.person_detail, name='api_person_detail'),
+    path('api/v1/dissertations/', api.dissertation_list, name='api_dissertation_list'),
+    path('api/v1/dissertations/<int:pk>/', api.dissertation_detail, name='api_dissertation_detail'),
 ]
\ No newline at end of file
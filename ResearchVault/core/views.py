@@ -1,90 +1,142 @@
-from django.shortcuts import render, get_object_or_404
+import hashlib
+
+from django.db import connection
+from django.db.models import Count, Exists, Max, OuterRef, Q, Value
+from django.db.models.functions import Concat, Lower
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView
+from . import caching
+from . import export
+from .filters import filter_dissertations, filter_publications
 from .models import Publication, Person, Dissertation
+from .pagination import KeysetPaginationMixin
+
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def _selected_person(person_id):
+    """Return the Person for a filter value from the query string, if any."""
+    if person_id and person_id.isdigit():
+        return Person.objects.filter(pk=int(person_id)).first()
+    return None
+
+def _publication_years():
+    years = Publication.objects.values_list('publication_year', flat=True).distinct().order_by('-publication_year')
+    return [year for year in years if year is not None]
+
+
+def _totals():
+    return {
+        'total_publications': Publication.objects.count(),
+        'total_dissertations': Dissertation.objects.count(),
+        'total_authors': Person.objects.count(),
+    }
+
+def _detail_validators(model):
+    """Return the conditional GET validators of a detail page: the object's updated_at."""
+    def validators(request, pk):
+        # The signal handlers touch updated_at when a person shown on the page changes
+        updated_at = caching.cached(
+            f'updated-at:{model._meta.label_lower}:{pk}',
+            lambda: model.objects.filter(pk=pk).values_list('updated_at', flat=True).first() or '',
+        )
+        if not updated_at:
+            return None, None
+        return f"{model._meta.model_name}-{pk}-{updated_at.timestamp()}", updated_at
+    return validators
+
+
+def _list_validators(model, filter_queryset, *extra):
+    """
+    Return the conditional GET validators of a list page.
+
+    The ETag covers the full URL (filters and page) and the newest updated_at
+    and number of the listed objects, so additions, changes and deletions all
+    change it. Deletions leave no updated_at behind, so Last-Modified is the
+    last change to any content instead.
+    """
+    def validators(request):
+        def compute():
+            queryset = filter_queryset(model.objects.all(), request.GET).order_by()
+            return queryset.aggregate(latest=Max('updated_at'), count=Count('pk', distinct=True))
+        key = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        stats = caching.cached(f'list-validators:{model._meta.model_name}:{key}', compute)
+        values = [request.get_full_path(), stats['latest'], stats['count'], *(value() for value in extra)]
+        etag = hashlib.md5(repr(values).encode()).hexdigest()
+        return etag, caching.content_changed_at() or stats['latest']
+    return validators
+
 
 # Create your views here.
-class PublicationListView(ListView):
+@method_decorator(caching.conditional_page(_list_validators(
+    # The year filter lists every year, not only those of the listed publications
+    Publication, filter_publications, lambda: caching.cached('publication-years', _publication_years),
+)), name='dispatch')
+@method_decorator(caching.cache_public_page, name='dispatch')
+class PublicationListView(KeysetPaginationMixin, ListView):
     model = Publication
     template_name = 'core/publication_list.html'
     context_object_name = 'publications'
     paginate_by = 10
     ordering = ['-publication_year', 'title']
     
+    def use_keyset_pagination(self):
+        # Search results are ordered by relevance, not by the keyset
+        return super().use_keyset_pagination() and not self.request.GET.get('search')
+    
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = filter_publications(super().get_queryset(), self.request.GET)
         
-        # Filter by year if provided in URL
-        year = self.request.GET.get('year')
-        if year and year.isdigit():
-            queryset = queryset.filter(publication_year=int(year))
-            
-        # Filter by author if provided in URL
-        author_id = self.request.GET.get('author')
-        if author_id and author_id.isdigit():
-            queryset = queryset.filter(authors__id=int(author_id))
-            
-        # Filter by search term if provided
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(title__icontains=search)
-            
+        # Authors are rendered from the cached authors_display, so no join is needed
         return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Add publication years for filtering
-        years = Publication.objects.values_list('publication_year', flat=True).distinct().order_by('-publication_year')
-        context['years'] = [year for year in years if year is not None]
+        context['years'] = caching.cached('publication-years', _publication_years)
         
-        # Add authors for filtering
-        context['authors'] = Person.objects.all().order_by('last_name', 'first_name')
+        # Add the selected author so the filter can show its name
+        context['selected_author'] = _selected_person(self.request.GET.get('author', ''))
         
         # Add current filters
         context['current_year'] = self.request.GET.get('year', '')
         context['current_author'] = self.request.GET.get('author', '')
         context['current_search'] = self.request.GET.get('search', '')
         
+        context['card_cache_timeout'] = caching.FRAGMENT_CACHE_TIMEOUT
         return context
 
 
+@method_decorator(caching.conditional_page(_detail_validators(Publication)), name='dispatch')
+@method_decorator(caching.cache_public_page, name='dispatch')
 class PublicationDetailView(DetailView):
     model = Publication
     template_name = 'core/publication_detail.html'
     context_object_name = 'publication'
     
 
-class DissertationListView(ListView):
+@method_decorator(caching.conditional_page(_list_validators(Dissertation, filter_dissertations)), name='dispatch')
+@method_decorator(caching.cache_public_page, name='dispatch')
+class DissertationListView(KeysetPaginationMixin, ListView):
     model = Dissertation
     template_name = 'core/dissertation_list.html'
     context_object_name = 'dissertations'
     paginate_by = 10
     ordering = ['-defense_date', 'title']
     
+    def use_keyset_pagination(self):
+        # Search results are ordered by relevance, not by the keyset
+        return super().use_keyset_pagination() and not self.request.GET.get('search')
+    
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = filter_dissertations(super().get_queryset(), self.request.GET)
         
-        # Filter by degree if provided in URL
-        degree = self.request.GET.get('degree')
-        if degree:
-            queryset = queryset.filter(degree=degree)
-            
-        # Filter by author if provided in URL
-        author_id = self.request.GET.get('author')
-        if author_id and author_id.isdigit():
-            queryset = queryset.filter(author__id=int(author_id))
-            
-        # Filter by promoter if provided in URL
-        promoter_id = self.request.GET.get('promoter')
-        if promoter_id and promoter_id.isdigit():
-            queryset = queryset.filter(promoter__id=int(promoter_id))
-            
-        # Filter by search term if provided
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(title__icontains=search)
-            
-        return queryset
+        # Load the people shown on each card with the page rather than one by one
+        return queryset.select_related('author', 'promoter').prefetch_related('copromoters')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -93,13 +145,9 @@ class DissertationListView(ListView):
         from .models import Degree
         context['degrees'] = Degree.choices
         
-        # Add authors for filtering
-        context['authors'] = Person.objects.all().order_by('last_name', 'first_name')
-        
-        # Add promoters for filtering
-        context['promoters'] = Person.objects.filter(
-            promoted_dissertations__isnull=False
-        ).distinct().order_by('last_name', 'first_name')
+        # Add the selected author and promoter so the filters can show their names
+        context['selected_author'] = _selected_person(self.request.GET.get('author', ''))
+        context['selected_promoter'] = _selected_person(self.request.GET.get('promoter', ''))
         
         # Add current filters
         context['current_degree'] = self.request.GET.get('degree', '')
@@ -110,25 +158,110 @@ class DissertationListView(ListView):
         return context
 
 
+@method_decorator(caching.conditional_page(_detail_validators(Dissertation)), name='dispatch')
+@method_decorator(caching.cache_public_page, name='dispatch')
 class DissertationDetailView(DetailView):
     model = Dissertation
     template_name = 'core/dissertation_detail.html'
     context_object_name = 'dissertation'
 
 
+@caching.cache_public_page
 def home_view(request):
     recent_publications = Publication.objects.order_by('-publication_year', '-created_at')[:5]
-    recent_dissertations = Dissertation.objects.order_by('-defense_date', '-created_at')[:3]
-    total_publications = Publication.objects.count()
-    total_dissertations = Dissertation.objects.count()
-    total_authors = Person.objects.count()
+    recent_dissertations = Dissertation.objects.select_related('author', 'promoter').order_by('-defense_date', '-created_at')[:3]
     
     context = {
         'recent_publications': recent_publications,
         'recent_dissertations': recent_dissertations,
-        'total_publications': total_publications,
-        'total_dissertations': total_dissertations,
-        'total_authors': total_authors,
+        # Full-table counts are the slowest part of the page on a large database
+        **caching.cached('totals', _totals),
     }
     
-    return render(request, 'core/home.html', context)
+    # A TemplateResponse is rendered after the view returns, so the request
+    # metrics can tell template time (and its lazy queries) from view time
+    return TemplateResponse(request, 'core/home.html', context)
+
+
+def _prefix_q(field, prefix):
+    """
+    Match a field lower-cased with Lower() on a prefix, in a way its index can answer.
+    
+    PostgreSQL compares with LIKE, answered from the text_pattern_ops indexes
+    (0015) whatever the collation. SQLite compares a range on the binary
+    collation, lower-casing the prefix with its own LOWER(), which unlike
+    Python's only folds ASCII letters.
+    """
+    if connection.vendor == 'postgresql':
+        return Q(**{f'{field}__startswith': prefix.lower()})
+    lower = Lower(Value(prefix))
+    return Q(**{f'{field}__gte': lower, f'{field}__lt': Concat(lower, Value(chr(0x10FFFF)))})
+
+
+def author_autocomplete(request):
+    """
+    Return the people whose first or last name starts with the query as JSON.
+    
+    Query parameters:
+        q: search text; "first last" and "last first" are both matched
+        role: "promoter" limits results to people who promoted a dissertation
+        limit: maximum number of results (at most AUTOCOMPLETE_MAX_LIMIT)
+    """
+    # Lower-cased by _prefix_q the way the database does
+    terms = request.GET.get('q', '').split()
+    if not terms or len(' '.join(terms)) < 2:
+        return JsonResponse({'results': []})
+    
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), AUTOCOMPLETE_MAX_LIMIT) if limit.isdigit() else AUTOCOMPLETE_DEFAULT_LIMIT
+    
+    people = Person.objects.annotate(
+        first_lower=Lower('first_name'),
+        last_lower=Lower('last_name'),
+    )
+    
+    if len(terms) == 1:
+        match = _prefix_q('last_lower', terms[0]) | _prefix_q('first_lower', terms[0])
+    else:
+        first, last = ' '.join(terms[:-1]), terms[-1]
+        match = (
+            (_prefix_q('first_lower', first) & _prefix_q('last_lower', last))
+            | (_prefix_q('last_lower', terms[0]) & _prefix_q('first_lower', ' '.join(terms[1:])))
+        )
+    people = people.filter(match)
+    
+    if request.GET.get('role') == 'promoter':
+        people = people.filter(Exists(Dissertation.objects.filter(promoter=OuterRef('pk'))))
+    
+    people = people.order_by('last_name', 'first_name').values('id', 'first_name', 'last_name')[:limit]
+    results = [
+        {'id': person['id'], 'name': f"{person['first_name']} {person['last_name']}"}
+        for person in people
+    ]
+    return JsonResponse({'results': results})
+
+
+def publication_export(request):
+    """
+    Stream the publications of the list, with its filters, as a file.
+    
+    Every matching publication is exported, not just one page, in the order
+    of the list: newest year first then by title, or by relevance when
+    searching.
+    
+    Query parameters:
+        format: bibtex, ris, csl-json or csv (default: bibtex)
+        year, author, search: as in the publication list
+    """
+    name = request.GET.get('format', 'bibtex')
+    if name not in export.FORMATS:
+        raise Http404(f"Unknown export format {name!r}")
+    export_format = export.FORMATS[name]
+    
+    queryset = filter_publications(Publication.objects.all(), request.GET)
+    response = StreamingHttpResponse(
+        export.export_publications(queryset, name),
+        content_type=export_format.content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="publications.{export_format.extension}"'
+    return response